@@ -0,0 +1,72 @@
+# compares evaluating a check once per member against evaluating it over a
+# `MemberSnapshot` of an 80k member guild; run from the repository root
+import sys
+sys.path.append(".")
+from src import dpycheck
+import datetime
+import discord
+import random
+import types
+import time
+
+
+MEMBERS = 80_000
+ROLES = 200
+
+random.seed(0)
+now = datetime.datetime.now(datetime.timezone.utc)
+guild = types.SimpleNamespace(id=1)
+guild.roles = [types.SimpleNamespace(id=1000 + i, name=f"role-{i}")
+               for i in range(ROLES)]
+guild.members = [
+    types.SimpleNamespace(
+        id=i,
+        _roles=random.sample(range(1000, 1000 + ROLES), random.randint(0, 8)),
+        guild_permissions=discord.Permissions(random.getrandbits(45)),
+        joined_at=now - datetime.timedelta(days=random.uniform(0, 365))
+    )
+    for i in range(MEMBERS)
+]
+guild.get_member = {m.id: m for m in guild.members}.get
+client = types.SimpleNamespace()
+
+check = dpycheck.Any(
+    dpycheck.All(
+        dpycheck.user_has_role(["role-3", 1010, "role-42"]),
+        dpycheck.Not(dpycheck.user_has_guild_perms(ban_members=True))
+    ),
+    dpycheck.All(
+        dpycheck.membership("d") >= 30,
+        dpycheck.user_has_guild_perms(manage_messages=True, kick_members=True)
+    ),
+    dpycheck.is_user(range(0, MEMBERS, 100))
+)
+
+
+def per_member() -> list[int]:
+    return [m.id for m in guild.members
+            if check.sync_predicate(types.SimpleNamespace(
+                user=m, guild=guild, client=client)).passed]
+
+
+def bulk() -> list[int]:
+    snapshot = dpycheck.MemberSnapshot.from_guild(guild)
+    return snapshot.select(check).tolist()
+
+
+def bench(name: str, func) -> tuple[float, list[int]]:
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<12}{elapsed * 1000:>10.1f} ms")
+    return elapsed, result
+
+
+before, expected = bench("per member", per_member)
+snapshot = dpycheck.MemberSnapshot.from_guild(guild)
+start = time.perf_counter()
+snapshot.select(check)
+print(f"{'mask only':<12}{(time.perf_counter() - start) * 1000:>10.1f} ms")
+after, result = bench("snapshot", bulk)
+assert result == expected
+print(f"speedup     {before / after:>10.2f}x ({len(result)} members pass)")
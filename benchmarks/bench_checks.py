@@ -0,0 +1,231 @@
+# times every built-in check, the modifiers and the `ctx`/`itx` decorator
+# closures against the stand-ins in `fakes.py`, in nanoseconds and traced
+# bytes per call, and compares the results against a stored baseline; run
+# from the repository root:
+#
+#   python benchmarks/bench_checks.py            compare against the baseline
+#   python benchmarks/bench_checks.py --save     record a new baseline
+#   python benchmarks/bench_checks.py -k role    only cases containing "role"
+#
+# the baseline is only meaningful on the machine that recorded it
+import sys
+sys.path.append(".")
+from benchmarks import fakes
+from src import dpycheck
+import tracemalloc
+import argparse
+import tempfile
+import asyncio
+import typing
+import json
+import time
+import os
+import re
+
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+# the time each case is run for, per repeat
+TARGET = 0.05
+
+
+async def entitled(utx) -> bool:
+    return True
+
+
+def build_cases(tmp: str) -> dict[str, tuple[typing.Any, typing.Any, bool]]:
+    """Case name -> (callable, argument, is coroutine function).
+
+    """
+    client, guild, channel = fakes.make_world(members=1000, roles=200)
+    author = guild.get_member(42)
+    ctx = fakes.FakeContext(client, author, channel, guild)
+    itx = fakes.FakeInteraction(client, author, channel, guild)
+    id_file = os.path.join(tmp, "ids")
+    dpycheck.IdFile.write(id_file, range(0, 10 ** 6, 7))
+
+    checks = {
+        "in_dm": dpycheck.in_dm(),
+        "is_user": dpycheck.is_user([1, 2, 42]),
+        "is_user (200k ids)": dpycheck.is_user(range(0, 400_000, 2)),
+        "in_channel": dpycheck.in_channel(channel.id),
+        "in_guild": dpycheck.in_guild([guild.id, 5]),
+        "in_category": dpycheck.in_category(4000),
+        "is_bot_owner": dpycheck.is_bot_owner(),
+        "channel_is_nsfw": dpycheck.channel_is_nsfw(),
+        "is_guild_owner": dpycheck.is_guild_owner(),
+        "username_contains": dpycheck.username_contains(
+            "spam", "scam", re.compile(r"free\s*nitro")),
+        "membership": 90 >= dpycheck.membership("d") >= 7,
+        "membership (tiers)": dpycheck.membership("d", tiers=(7, 30)) >= 1,
+        "custom": dpycheck.custom(entitled),
+        "user_has_role (name)": dpycheck.user_has_role(["role-3", "role-9"]),
+        "user_has_role (id)": dpycheck.user_has_role([2003, 2009]),
+        "bot_has_role": dpycheck.bot_has_role(2000),
+        "user_has_guild_perms": dpycheck.user_has_guild_perms(
+            send_messages=True, ban_members=False),
+        "bot_has_guild_perms": dpycheck.bot_has_guild_perms(
+            manage_roles=True),
+        "user_has_channel_perms": dpycheck.user_has_channel_perms(
+            send_messages=True),
+        "bot_has_channel_perms": dpycheck.bot_has_channel_perms(
+            embed_links=True),
+        "in_id_file": dpycheck.in_id_file(id_file),
+        "cooldown": dpycheck.cooldown(10 ** 9, 1.0),
+        "cached": dpycheck.cached(dpycheck.custom(entitled),
+                                  dpycheck.ResultCache()),
+        "Not": dpycheck.Not(dpycheck.in_dm()),
+        "Any": dpycheck.Any(dpycheck.in_dm(),
+                            dpycheck.user_has_role(["role-3"]),
+                            dpycheck.is_user(42)),
+        "All": dpycheck.All(dpycheck.in_guild(guild.id),
+                            dpycheck.user_has_channel_perms(
+                                send_messages=True),
+                            dpycheck.membership("d") >= 7),
+    }
+    cases = {}
+    for name, check in checks.items():
+        if check.is_sync:
+            cases[name] = (check.sync_predicate, ctx, False)
+        else:
+            cases[name] = (check.predicate, ctx, True)
+
+    tree = lambda: (dpycheck.in_guild(guild.id),
+                    dpycheck.Any(dpycheck.user_has_role(["role-3"]),
+                                 dpycheck.membership("d") >= 7),
+                    dpycheck.custom(entitled))
+
+    async def command(utx) -> None: ...
+
+    for decorator, utx, attr in (
+        (dpycheck.ctx.Check, ctx, "__commands_checks__"),
+        (dpycheck.itx.Check, itx, "__discord_app_commands_checks__")
+    ):
+        prefix = decorator.__module__.split(".")[-2]
+        for kind in ("all", "any"):
+            for options in ({}, {"adaptive": True}, {"concurrent": True},
+                            {"metrics": dpycheck.Metrics()},
+                            {"metrics": dpycheck.Metrics(enabled=False)}):
+                func = getattr(decorator, kind)(*tree(), **options)(
+                    lambda utx: command(utx))
+                label = ", ".join(options) or "plain"
+                if "metrics" in options and not options["metrics"].enabled:
+                    label += " disabled"
+                cases[f"{prefix}.Check.{kind} ({label})"] = (
+                    getattr(func, attr).pop(), utx, True)
+    return cases
+
+
+async def run(func: typing.Callable, arg: typing.Any, is_async: bool,
+              n: int) -> int:
+    """The nanoseconds taken by `n` calls.
+
+    """
+    start = time.perf_counter_ns()
+    if is_async:
+        for _ in range(n):
+            await func(arg)
+    else:
+        for _ in range(n):
+            func(arg)
+    return time.perf_counter_ns() - start
+
+
+def noop(arg: typing.Any) -> None:
+    pass
+
+
+async def async_noop(arg: typing.Any) -> None:
+    pass
+
+
+async def traced_peak(func: typing.Callable, arg: typing.Any, is_async: bool
+                      ) -> tuple[int, float]:
+    """The traced bytes allocated at the peak of one call over what was
+    already allocated, and the bytes per call that stay allocated.
+
+    """
+    tracemalloc.start()
+    await run(func, arg, is_async, 1)
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    await run(func, arg, is_async, 1)
+    peak = tracemalloc.get_traced_memory()[1] - before
+    await run(func, arg, is_async, 1000)
+    retained = (tracemalloc.get_traced_memory()[0] - before) / 1001
+    tracemalloc.stop()
+    return peak, retained
+
+
+async def measure(func: typing.Callable, arg: typing.Any, is_async: bool,
+                  repeat: int) -> dict[str, float]:
+    # calibrate the number of calls per repeat to about `TARGET` seconds
+    n = 1
+    while (elapsed := await run(func, arg, is_async, n)) < TARGET * 1e8:
+        n *= 10
+    n = max(1, int(n * TARGET * 1e9 / max(elapsed, 1)))
+    ns = min([await run(func, arg, is_async, n) for _ in range(repeat)]) / n
+    peak, retained = await traced_peak(func, arg, is_async)
+    # without what the loop itself allocates
+    overhead, _ = await traced_peak(async_noop if is_async else noop, arg,
+                                    is_async)
+    return {"ns": ns, "peak_bytes": max(peak - overhead, 0),
+            "retained_bytes": retained}
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--save", action="store_true",
+                        help="record the results as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("-k", dest="filter", default="",
+                        help="only run cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="the slowdown reported as a regression")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    print(f"{'case':<36}{'ns/call':>10}{'baseline':>10}{'ratio':>8}"
+          f"{'peak B':>9}{'kept B':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, (func, arg, is_async) in build_cases(tmp).items():
+            if args.filter not in name:
+                continue
+            result = await measure(func, arg, is_async, args.repeat)
+            results[name] = result
+            line = f"{name:<36}{result['ns']:>10.0f}"
+            before = baseline.get(name)
+            if before is None:
+                line += f"{'-':>10}{'-':>8}"
+            else:
+                ratio = result["ns"] / before["ns"]
+                line += f"{before['ns']:>10.0f}{ratio:>7.2f}x"
+                if ratio > args.threshold:
+                    regressions.append(name)
+            line += (f"{result['peak_bytes']:>9.0f}"
+                     f"{result['retained_bytes']:>8.1f}")
+            if name in regressions:
+                line += "  REGRESSION"
+            print(line)
+
+    if args.save:
+        # cases left out with -k keep their previous results
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"saved {len(results)} results to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} cases are more than {args.threshold}x "
+              f"slower than the baseline")
+        return 1
+    return 0
+
+
+sys.exit(asyncio.run(main()))
@@ -0,0 +1,71 @@
+# compares tree-walking evaluation of a deep check tree against the
+# compiled program used by `ctx.Check.all`; run from the repository root
+import sys
+sys.path.append(".")
+from src import dpycheck
+from src.dpycheck import _compiler
+import asyncio
+import types
+import time
+
+
+ITERATIONS = 20_000
+
+utx = types.SimpleNamespace(
+    user=types.SimpleNamespace(id=3),
+    guild=types.SimpleNamespace(id=1),
+    channel=types.SimpleNamespace(id=2, category=types.SimpleNamespace(id=4))
+)
+
+# 4 levels, 12 leaves
+checks = (
+    dpycheck.All(
+        dpycheck.Any(
+            dpycheck.Not(dpycheck.in_guild(10)),
+            dpycheck.All(dpycheck.in_guild(1), dpycheck.in_channel(2))
+        ),
+        dpycheck.Not(dpycheck.Any(
+            dpycheck.is_user(11),
+            dpycheck.in_channel(12),
+            dpycheck.All(dpycheck.in_category(13), dpycheck.in_dm())
+        ))
+    ),
+    dpycheck.Any(
+        dpycheck.All(dpycheck.is_user(14), dpycheck.in_guild(1)),
+        dpycheck.Not(dpycheck.All(
+            dpycheck.in_category(15),
+            dpycheck.Not(dpycheck.is_user(3))
+        )),
+    ),
+    dpycheck.in_category(4)
+)
+
+
+async def walk(utx) -> bool:
+    # the evaluation `ctx.Check.all` performed before compilation
+    for c in checks:
+        if not (await c.predicate(utx)).passed:
+            return False
+    return True
+
+
+async def bench(name: str, func) -> float:
+    for _ in range(1000):
+        await func(utx)
+    start = time.perf_counter_ns()
+    for _ in range(ITERATIONS):
+        await func(utx)
+    per_call = (time.perf_counter_ns() - start) / ITERATIONS
+    print(f"{name:<10}{per_call / 1000:>10.2f} us/call")
+    return per_call
+
+
+async def main() -> None:
+    program = _compiler.compile_all(*checks)
+    assert await walk(utx) is (await program.run(utx)).passed
+    before = await bench("walked", walk)
+    after = await bench("compiled", program.run)
+    print(f"speedup   {before / after:>10.2f}x")
+
+
+asyncio.run(main())
@@ -0,0 +1,187 @@
+# compares the cost of taking a cooldown token from the in-process,
+# SQLite and shared memory backends while several processes contend for the
+# same buckets, and checks that the shared backends enforce one limit across
+# processes; then compares the memory and speed of `BucketTable`, which keeps
+# one float per key, against a table of slotted bucket objects and an
+# array-backed table; run from the repository root
+import sys
+sys.path.append(".")
+from src import dpycheck
+from src.dpycheck._cooldown import BucketTable
+import multiprocessing
+import collections
+import tracemalloc
+import array
+import tempfile
+import random
+import time
+import os
+
+
+PROCESSES = 4
+ACQUISITIONS = 20_000
+KEYS = 1_000
+RATE = 5
+# long enough that no token is refilled during the run
+PER = 3600.0
+# the number of keys the bucket tables are compared with
+TABLE_KEYS = 100_000
+
+
+def open_backend(kind: str, path: str):
+    if kind == "sqlite":
+        return dpycheck.SQLiteBackend(path)
+    if kind == "shared memory":
+        return dpycheck.SharedMemoryBackend("dpycheck-bench", slots=1 << 14)
+    return None
+
+
+def worker(kind: str, path: str, seed: int, start, queue) -> None:
+    backend = open_backend(kind, path)
+    buckets = (BucketTable(RATE, PER) if backend is None
+               else backend.buckets("bench", RATE, PER))
+    rng = random.Random(seed)
+    keys = [rng.randrange(KEYS) for _ in range(ACQUISITIONS)]
+    granted = collections.Counter()
+    start.wait()
+    begin = time.perf_counter_ns()
+    for key in keys:
+        if not buckets.acquire(key):
+            granted[key] += 1
+    elapsed = time.perf_counter_ns() - begin
+    if backend is not None:
+        backend.close()
+    queue.put((elapsed / ACQUISITIONS, granted))
+
+
+def run(kind: str, path: str) -> None:
+    start = multiprocessing.Event()
+    queue = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=worker,
+                                     args=(kind, path, i, start, queue))
+             for i in range(PROCESSES)]
+    for proc in procs:
+        proc.start()
+    start.set()
+    results = [queue.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+    cost = sum(r[0] for r in results) / len(results)
+    granted = sum((r[1] for r in results), collections.Counter())
+    worst = max(granted.values())
+    print(f"{kind:<16}{cost / 1000:>10.2f} us{sum(granted.values()):>10}"
+          f"{worst:>14}")
+    if kind != "in-process":
+        assert worst <= RATE, f"{kind} granted {worst} tokens to one key"
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float) -> None:
+        self.tokens = tokens
+        self.updated = updated
+
+
+class SlottedTable:
+    """A token bucket per key, as a slotted object holding the tokens left
+    and the time they were counted.
+
+    """
+    def __init__(self, rate: int, per: float) -> None:
+        self.rate = rate
+        self.per = per
+        self._buckets: dict[object, _Bucket] = {}
+
+    def acquire(self, key: object, now: float | None = None) -> float:
+        if now is None:
+            now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(self.rate, now)
+        tokens = min(self.rate, bucket.tokens
+                     + (now - bucket.updated) * self.rate / self.per)
+        bucket.updated = now
+        if tokens < 1:
+            bucket.tokens = tokens
+            return (1 - tokens) * self.per / self.rate
+        bucket.tokens = tokens - 1
+        return 0.0
+
+
+class ArrayTable:
+    """Token buckets as the time each is full again (like `BucketTable`),
+    kept in an `array` of doubles indexed through a dict of keys.
+
+    """
+    def __init__(self, rate: int, per: float) -> None:
+        self._interval = per / rate
+        self._tolerance = per - self._interval
+        self._index: dict[object, int] = {}
+        self._full_at = array.array("d")
+
+    def acquire(self, key: object, now: float | None = None) -> float:
+        if now is None:
+            now = time.monotonic()
+        i = self._index.get(key)
+        if i is None:
+            i = self._index[key] = len(self._full_at)
+            self._full_at.append(now)
+        full_at = max(self._full_at[i], now)
+        retry_after = full_at - now - self._tolerance
+        if retry_after > 0:
+            return retry_after
+        self._full_at[i] = full_at + self._interval
+        return 0.0
+
+
+def compare_tables() -> None:
+    # random 64-bit keys, like user IDs, so that every layout holds the same
+    # key objects and only the per-bucket storage differs
+    rng = random.Random(0)
+    keys = [rng.getrandbits(63) for _ in range(TABLE_KEYS)]
+    print(f"\n{TABLE_KEYS} keys with one token taken each")
+    print(f"{'table':<16}{'memory per key':>16}{'acquire':>13}")
+    for name, cls in (("BucketTable", BucketTable),
+                      ("slotted objects", SlottedTable),
+                      ("array-backed", ArrayTable)):
+        # memory is traced and time measured in separate runs, as tracing
+        # slows down every allocation
+        tracemalloc.start()
+        table = cls(RATE, PER)
+        for key in keys:
+            table.acquire(key, 0.0)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del table
+        table = cls(RATE, PER)
+        begin = time.perf_counter_ns()
+        for key in keys:
+            table.acquire(key, 0.0)
+        elapsed = time.perf_counter_ns() - begin
+        del table
+        print(f"{name:<16}{size / TABLE_KEYS:>14.1f} B"
+              f"{elapsed / TABLE_KEYS:>10.0f} ns")
+
+
+def main() -> None:
+    # with fewer CPUs than processes, times include waiting for a CPU
+    print(f"{PROCESSES} processes on {os.cpu_count()} CPUs, {ACQUISITIONS} "
+          f"acquisitions each, {KEYS} keys, {RATE} tokens per key")
+    print(f"{'backend':<16}{'acquire':>13}{'granted':>10}{'most per key':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cooldowns.db")
+        # create the shared state before the workers race to
+        open_backend("sqlite", path).close()
+        shared = open_backend("shared memory", path)
+        try:
+            for kind in ("in-process", "sqlite", "shared memory"):
+                run(kind, path)
+        finally:
+            shared.close()
+            shared.unlink()
+    compare_tables()
+
+
+if __name__ == "__main__":
+    main()
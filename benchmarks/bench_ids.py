@@ -0,0 +1,56 @@
+# compares `is_user` given a list of 10, 10k and 1M IDs against the
+# per-call `isiterable` and list scan it performed before IDs were frozen; run
+# from the repository root
+import sys
+sys.path.append(".")
+from src import dpycheck
+from src.dpycheck import utils
+import tracemalloc
+import random
+import types
+import time
+
+
+SIZES = (10, 10_000, 1_000_000)
+LOOKUPS = 2_000
+
+random.seed(0)
+
+
+def listed(user_id, utx) -> bool:
+    # the lookup `is_user` performed before IDs were frozen
+    if utils.isiterable(user_id):
+        return utils.get_author(utx).id in user_id
+    return utils.get_author(utx).id == user_id
+
+
+def bench(func, utxs) -> float:
+    start = time.perf_counter_ns()
+    for utx in utxs:
+        func(utx)
+    return (time.perf_counter_ns() - start) / len(utxs)
+
+
+def main() -> None:
+    print(f"{'IDs':>9}{'list':>14}{'frozen':>14}{'memory':>12}  container")
+    for size in SIZES:
+        ids = random.sample(range(1 << 40), size)
+        # half of the lookups hit
+        utxs = [types.SimpleNamespace(user=types.SimpleNamespace(
+                    id=random.choice(ids) if i % 2 else random.getrandbits(40)))
+                for i in range(LOOKUPS)]
+        tracemalloc.start()
+        check = dpycheck.is_user(ids)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        # a list scan of 1M IDs takes milliseconds, so sample fewer lookups
+        sample = utxs[:LOOKUPS // size + 20]
+        for utx in sample:
+            assert check.sync_predicate(utx).passed is listed(ids, utx)
+        before = bench(lambda utx: listed(ids, utx), sample)
+        after = bench(check.sync_predicate, utxs)
+        print(f"{size:>9}{before / 1000:>11.2f} us{after / 1000:>11.2f} us"
+              f"{memory / 2 ** 20:>9.1f} MB  {type(check._ids).__name__}")
+
+
+main()
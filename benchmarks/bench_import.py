@@ -0,0 +1,55 @@
+# measures the import time of the package with `python -X importtime`, for a
+# script using one check and for a bot decorating a command with it, against
+# loading every submodule as the package did before its names were loaded
+# lazily; run from the repository root
+import subprocess
+import sys
+
+
+ROUNDS = 7
+SCENARIOS = {
+    "discord.py alone": "import discord.ext.commands",
+    "import only": "from src import dpycheck",
+    "one check": "from src import dpycheck; dpycheck.in_dm",
+    "decorated command": ("from src import dpycheck; "
+                          "dpycheck.ctx.Check.all(dpycheck.in_dm())"
+                          "(lambda ctx: None)"),
+    # what every import cost before names were loaded lazily
+    "every name": "from src.dpycheck import *",
+}
+
+
+def import_time(statement: str) -> float:
+    """The total import time of `statement` in a fresh interpreter, in
+    milliseconds.
+
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c",
+         f"import sys; sys.path.append('.'); {statement}"],
+        capture_output=True, text=True, check=True
+    ).stderr
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # only top-level imports, whose time includes their dependencies
+        if not name[1:].startswith(" "):
+            total += int(cumulative)
+    return total / 1000
+
+
+def main() -> None:
+    times = {name: min(import_time(statement) for _ in range(ROUNDS))
+             for name, statement in SCENARIOS.items()}
+    print(f"{'scenario':<20}{'import time':>14}")
+    for name, elapsed in times.items():
+        print(f"{name:<20}{elapsed:>11.1f} ms")
+    for name in ("one check", "decorated command"):
+        saved = times["every name"] - times[name]
+        print(f"{name} saves {saved:.1f} ms "
+              f"({saved / times['every name']:.0%})")
+
+
+main()
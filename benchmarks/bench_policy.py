@@ -0,0 +1,77 @@
+# compares loading policy documents for 300 commands with and without the
+# compiled policy cache; run from the repository root
+import sys
+sys.path.append(".")
+from src import dpycheck
+import tempfile
+import random
+import time
+import os
+
+
+FILES = 30
+COMMANDS_PER_FILE = 10
+ROUNDS = 5
+
+random.seed(0)
+
+
+def policy(i: int) -> str:
+    roles = ", ".join(repr(f"role-{random.randrange(50)}") for _ in range(3))
+    users = ", ".join(map(str, range(i, i + 5)))
+    return f"""
+[commands."group-{i // COMMANDS_PER_FILE} command-{i}"]
+adaptive = true
+all = [
+    {{ check = "user_has_role", args = [[{roles}, {1000 + i}]] }},
+    {{ any = [
+        {{ check = "membership", args = ["d"], ge = {i % 60} }},
+        {{ check = "user_has_guild_perms", kick_members = true }},
+        {{ check = "is_user", args = [[{users}]] }},
+    ] }},
+    {{ not = {{ check = "in_channel", args = [[{i}, {i + 1}]] }} }},
+    {{ check = "username_contains", args = ["spam-{i}", "scam"] }},
+]
+"""
+
+
+def load_all(loader: dpycheck.PolicyLoader, paths: list[str]) -> list:
+    policies = [loader.load(path) for path in paths]
+    # building the check trees is part of startup either way
+    for p in policies:
+        for name in p.command_names:
+            p.build(name)
+    return policies
+
+
+def bench(loader: dpycheck.PolicyLoader, paths: list[str]) -> float:
+    start = time.perf_counter()
+    load_all(loader, paths)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for f in range(FILES):
+            path = os.path.join(tmp, f"policy-{f}.toml")
+            with open(path, "w") as file:
+                file.write("".join(policy(f * COMMANDS_PER_FILE + c)
+                                   for c in range(COMMANDS_PER_FILE)))
+            paths.append(path)
+        cache_dir = os.path.join(tmp, "cache")
+        uncached = min(bench(dpycheck.PolicyLoader(), paths)
+                       for _ in range(ROUNDS))
+        # the first load fills the cache
+        first = bench(dpycheck.PolicyLoader(cache_dir), paths)
+        cached = min(bench(dpycheck.PolicyLoader(cache_dir), paths)
+                     for _ in range(ROUNDS))
+        print(f"{FILES * COMMANDS_PER_FILE} command policies in {FILES} "
+              f"files")
+        print(f"{'uncached':<16}{uncached * 1000:>10.1f} ms")
+        print(f"{'filling cache':<16}{first * 1000:>10.1f} ms")
+        print(f"{'cached':<16}{cached * 1000:>10.1f} ms")
+        print(f"speedup         {uncached / cached:>10.2f}x")
+
+
+main()
@@ -0,0 +1,93 @@
+# compares looking up cached results in a `ResultCache` and a
+# `SharedResultCache`, and measures how many evaluations of an expensive check
+# several processes save by sharing one cache; run from the repository root
+import sys
+sys.path.append(".")
+from src import dpycheck
+import multiprocessing
+import asyncio
+import random
+import types
+import time
+
+
+PROCESSES = 4
+USERS = 2_000
+INVOCATIONS = 5_000
+LOOKUPS = 100_000
+NAME = "dpycheck-bench-results"
+
+
+async def entitled(utx) -> bool:
+    # stands in for an entitlement lookup over the network
+    await asyncio.sleep(0)
+    return utx.user.id % 3 != 0
+
+
+def invocation(user_id: int):
+    return types.SimpleNamespace(user=types.SimpleNamespace(id=user_id),
+                                 channel=types.SimpleNamespace(id=2),
+                                 guild=types.SimpleNamespace(id=3))
+
+
+def bench_lookup(cache) -> float:
+    check = dpycheck.in_dm()
+    keys = [(check, i % USERS, 2, 3) for i in range(LOOKUPS)]
+    result = check.result(False)
+    for key in keys[:USERS]:
+        cache.put(key, result)
+    start = time.perf_counter_ns()
+    for key in keys:
+        cache.get(key)
+    return (time.perf_counter_ns() - start) / LOOKUPS
+
+
+def worker(seed: int, shared: bool) -> int:
+    cache = (dpycheck.SharedResultCache(NAME, ttl=600) if shared
+             else dpycheck.ResultCache(ttl=600))
+    evaluations = 0
+
+    async def counted(utx) -> bool:
+        nonlocal evaluations
+        evaluations += 1
+        return await entitled(utx)
+
+    # every process builds the same check, so they share its fingerprint
+    check = dpycheck.cached(dpycheck.custom(counted), cache)
+    rng = random.Random(seed)
+
+    async def run() -> None:
+        for _ in range(INVOCATIONS):
+            await check.predicate(invocation(rng.randrange(USERS)))
+
+    asyncio.run(run())
+    if shared:
+        cache.close()
+    return evaluations
+
+
+def main() -> None:
+    shared = dpycheck.SharedResultCache(NAME, ttl=600)
+    try:
+        print(f"{'lookup':<24}{'per call':>12}")
+        local = bench_lookup(dpycheck.ResultCache(maxsize=USERS))
+        print(f"{'ResultCache':<24}{local / 1000:>9.2f} us")
+        remote = bench_lookup(shared)
+        print(f"{'SharedResultCache':<24}{remote / 1000:>9.2f} us")
+        shared.clear()
+        print(f"\n{PROCESSES} processes, {INVOCATIONS} invocations each, "
+              f"{USERS} users")
+        print(f"{'cache':<24}{'evaluations':>12}")
+        with multiprocessing.Pool(PROCESSES) as pool:
+            for name, flag in (("ResultCache", False),
+                               ("SharedResultCache", True)):
+                evaluations = sum(pool.starmap(
+                    worker, [(i, flag) for i in range(PROCESSES)]))
+                print(f"{name:<24}{evaluations:>12}")
+    finally:
+        shared.close()
+        shared.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+# lightweight stand-ins for the discord.py objects checks read, so that checks
+# can be benchmarked without a token or a live guild; `FakeContext`,
+# `FakeInteraction` and `FakeChannel` subclass their discord.py counterparts,
+# so that checks and `ErrorHandler` take the same paths as in a real bot
+from discord.ext import commands
+import datetime
+import discord
+import random
+import array
+
+
+class FakeRole:
+    __slots__ = ("id", "name", "guild")
+
+    def __init__(self, id: int, name: str, guild: "FakeGuild") -> None:
+        self.id = id
+        self.name = name
+        self.guild = guild
+
+
+class FakeCategory:
+    def __init__(self, id: int) -> None:
+        self.id = id
+
+
+class FakeMember:
+    __slots__ = ("id", "guild", "name", "display_name", "bot", "_roles",
+                 "guild_permissions", "joined_at")
+
+    def __init__(self, id: int, guild: "FakeGuild", *, name: str = None,
+                 roles: list[int] = (), permissions: int = 0,
+                 joined_at: datetime.datetime | None = None,
+                 bot: bool = False) -> None:
+        self.id = id
+        self.guild = guild
+        self.name = name or f"user-{id}"
+        self.display_name = self.name
+        self.bot = bot
+        # `discord.Member` keeps its role IDs in a sorted array
+        self._roles = array.array("Q", sorted(roles))
+        self.guild_permissions = discord.Permissions(permissions)
+        self.joined_at = joined_at
+
+
+class FakeGuild:
+    def __init__(self, id: int, *, owner_id: int = 0) -> None:
+        self.id = id
+        self.owner_id = owner_id
+        self.roles: list[FakeRole] = []
+        self.members: list[FakeMember] = []
+        self._members: dict[int, FakeMember] = {}
+        self.me: FakeMember | None = None
+
+    def add_role(self, id: int, name: str) -> FakeRole:
+        role = FakeRole(id, name, self)
+        self.roles.append(role)
+        return role
+
+    def add_member(self, member: FakeMember) -> FakeMember:
+        self.members.append(member)
+        self._members[member.id] = member
+        return member
+
+    def get_member(self, id: int) -> FakeMember | None:
+        return self._members.get(id)
+
+
+class FakeChannel(discord.TextChannel):
+    """A `discord.TextChannel`, for the checks that test the channel type.
+
+    """
+    # properties of `discord.TextChannel`, replaced by plain attributes
+    category = overwrites = None
+
+    def __init__(self, id: int, guild: FakeGuild | None, *,
+                 category: FakeCategory | None = None, nsfw: bool = False,
+                 overwrites: dict[int, tuple[int, int]] | None = None
+                 ) -> None:
+        self.id = id
+        self.guild = guild
+        self.category = category
+        self.nsfw = nsfw
+        # role or member ID -> (allowed, denied) permission values; the
+        # guild's ID is the @everyone role
+        self.overwrites = overwrites or {}
+
+    def permissions_for(self, member: FakeMember) -> discord.Permissions:
+        # the order `discord.abc.GuildChannel.permissions_for` applies
+        # overwrites in: @everyone, then the member's roles, then the member
+        base = member.guild_permissions
+        if not self.overwrites or base.administrator:
+            return base
+        value = base.value
+        everyone = self.overwrites.get(self.guild.id)
+        if everyone is not None:
+            value = (value & ~everyone[1]) | everyone[0]
+        allow = deny = 0
+        for role_id in member._roles:
+            overwrite = self.overwrites.get(role_id)
+            if overwrite is not None:
+                allow |= overwrite[0]
+                deny |= overwrite[1]
+        value = (value & ~deny) | allow
+        own = self.overwrites.get(member.id)
+        if own is not None:
+            value = (value & ~own[1]) | own[0]
+        return discord.Permissions(value)
+
+
+class FakeClient:
+    def __init__(self, *, owner_id: int = 0) -> None:
+        self.owner_id = owner_id
+        self.owner_ids = None
+        self.guilds: dict[int, FakeGuild] = {}
+        self.channels: dict[int, FakeChannel] = {}
+        self.user: FakeMember | None = None
+
+    def is_ready(self) -> bool:
+        return True
+
+    def add_listener(self, func: object, name: str = None) -> None:
+        pass
+
+    def get_guild(self, id: int) -> FakeGuild | None:
+        return self.guilds.get(id)
+
+    def get_channel(self, id: int) -> FakeChannel | None:
+        return self.channels.get(id)
+
+
+class FakeContext(commands.Context):
+    """A `commands.Context` holding only what checks read.
+
+    """
+    command = None
+
+    def __init__(self, client: FakeClient, author: FakeMember,
+                 channel: FakeChannel, guild: FakeGuild | None) -> None:
+        # `author`, `guild`, `channel`, `me` and the permissions are cached
+        # properties of `commands.Context`, so they can be set directly
+        self.bot = client
+        self.author = author
+        self.channel = channel
+        self.guild = guild
+        self.me = guild.me if guild is not None else client.user
+        self.permissions = channel.permissions_for(author)
+        self.bot_permissions = (channel.permissions_for(self.me)
+                                if guild is not None
+                                else discord.Permissions.none())
+
+    async def send(self, *args: object, **kwargs: object) -> None:
+        pass
+
+
+class FakeResponse:
+    def __init__(self) -> None:
+        self.done = False
+
+    def is_done(self) -> bool:
+        return self.done
+
+    async def send_message(self, *args: object, **kwargs: object) -> None:
+        self.done = True
+
+
+class FakeFollowup:
+    async def send(self, *args: object, **kwargs: object) -> None:
+        pass
+
+
+class FakeInteraction(discord.Interaction):
+    """A `discord.Interaction` holding only what checks read.
+
+    """
+    # properties of `discord.Interaction`, replaced by plain attributes
+    client = guild = permissions = app_permissions = None
+    response = followup = command = None
+
+    def __init__(self, client: FakeClient, user: FakeMember,
+                 channel: FakeChannel, guild: FakeGuild | None) -> None:
+        self.client = client
+        self.user = user
+        self.channel = channel
+        self.guild = guild
+        self.permissions = channel.permissions_for(user)
+        self.app_permissions = (channel.permissions_for(guild.me)
+                                if guild is not None
+                                else discord.Permissions.none())
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
+
+
+def make_world(*, members: int = 100, roles: int = 50, seed_roles: int = 5,
+               now: datetime.datetime | None = None
+               ) -> tuple[FakeClient, FakeGuild, FakeChannel]:
+    """A client with one guild of `members` members holding up to
+    `seed_roles` of `roles` roles each, and one text channel in a category.
+    Member `1` owns the guild and the bot.
+
+    """
+    if now is None:
+        now = datetime.datetime.now(datetime.timezone.utc)
+    client = FakeClient(owner_id=1)
+    guild = FakeGuild(1000, owner_id=1)
+    for i in range(roles):
+        guild.add_role(2000 + i, f"role-{i}")
+    for i in range(1, members + 1):
+        guild.add_member(FakeMember(
+            i, guild,
+            roles=[2000 + (i * 7 + k) % roles for k in range(i % seed_roles)],
+            permissions=discord.Permissions.all().value if i % 10 == 1
+                        else discord.Permissions.general().value,
+            joined_at=now - datetime.timedelta(days=i)
+        ))
+    guild.me = guild.add_member(FakeMember(
+        10 ** 6, guild, name="bot", bot=True,
+        roles=[2000], permissions=discord.Permissions.all().value,
+        joined_at=now - datetime.timedelta(days=365)
+    ))
+    client.user = guild.me
+    channel = FakeChannel(3000, guild, category=FakeCategory(4000))
+    client.guilds[guild.id] = guild
+    client.channels[channel.id] = channel
+    return client, guild, channel
+
+
+# the permissions channel overwrites allow or deny in `make_guilds`
+_OVERWRITTEN = tuple(getattr(discord.Permissions, name).flag for name in (
+    "send_messages", "embed_links", "attach_files", "manage_messages",
+    "read_message_history", "use_application_commands"
+))
+
+
+def make_guilds(*, guilds: int = 100, members: int = 10_000,
+                roles: int = 20, channels: int = 10, overwrites: int = 4,
+                seed_roles: int = 3, seed: int = 0,
+                now: datetime.datetime | None = None) -> FakeClient:
+    """A client with `guilds` guilds, each with `roles` roles and `channels`
+    text channels holding up to `overwrites` overwrites each. `members`
+    members are spread over the guilds with a Zipf-like skew, as in real
+    bots, and hold up to `seed_roles` roles each. The same arguments always
+    give the same world.
+
+    """
+    if now is None:
+        now = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+    rng = random.Random(seed)
+    ids = iter(range(10 ** 7, 2 ** 63))
+    client = FakeClient(owner_id=1)
+    client.user = FakeMember(10 ** 6, None, name="bot", bot=True)
+    general = discord.Permissions.general().value
+    admin = discord.Permissions.all().value
+    # guild `i` gets a share of the members proportional to 1 / (i + 1)
+    weights = [1 / (i + 1) for i in range(guilds)]
+    total = sum(weights)
+    for i in range(guilds):
+        guild = FakeGuild(next(ids))
+        role_ids = [guild.add_role(next(ids), f"role-{k}").id
+                    for k in range(roles)]
+        count = max(1, round(members * weights[i] / total))
+        for k in range(count):
+            member = guild.add_member(FakeMember(
+                next(ids), guild,
+                roles=rng.sample(role_ids, min(rng.randrange(seed_roles + 1),
+                                               roles)),
+                permissions=admin if rng.random() < 0.02 else general,
+                joined_at=now - datetime.timedelta(
+                    seconds=rng.randrange(10 ** 8))
+            ))
+            if k == 0:
+                guild.owner_id = member.id
+        guild.me = guild.add_member(FakeMember(
+            client.user.id, guild, name="bot", bot=True,
+            roles=role_ids[:1], permissions=admin, joined_at=now
+        ))
+        for _ in range(channels):
+            channel_overwrites = {}
+            targets = [guild.id, *role_ids]
+            for target in rng.sample(targets, min(overwrites, len(targets))):
+                allow = rng.choice(_OVERWRITTEN) if rng.random() < 0.5 else 0
+                deny = rng.choice(_OVERWRITTEN) & ~allow
+                channel_overwrites[target] = (allow, deny)
+            channel = FakeChannel(next(ids), guild,
+                                  category=FakeCategory(next(ids)),
+                                  nsfw=rng.random() < 0.05,
+                                  overwrites=channel_overwrites)
+            client.channels[channel.id] = channel
+        client.guilds[guild.id] = guild
+    return client
@@ -0,0 +1,275 @@
+# replays a trace of command invocations against a synthetic world of guilds,
+# members, roles and channel overwrites built by `fakes.make_guilds`, through
+# the `ctx.Check`/`itx.Check` decorators of a policy document and, for the
+# invocations that fail, `ErrorHandler.error`; reports the throughput, the
+# latency percentiles and the peak RSS. Nothing touches the network. Run from
+# the repository root:
+#
+#   python benchmarks/load_test.py                     generate and replay
+#   python benchmarks/load_test.py --write trace.jsonl generate only
+#   python benchmarks/load_test.py --trace trace.jsonl replay a stored trace
+#   python benchmarks/load_test.py --speed 0           as fast as possible
+#
+# the first line of a trace holds the arguments of the world it was generated
+# for; every other line is one invocation:
+#
+#   {"t": 0.0123, "command": "ban", "kind": "ctx", "guild": ...,
+#    "author": ..., "channel": ...}
+import sys
+sys.path.append(".")
+from benchmarks import fakes
+from src import dpycheck
+from discord.ext import commands
+from discord import app_commands
+import resource
+import argparse
+import asyncio
+import random
+import typing
+import json
+import time
+
+
+# the policy replayed when none is given; `remote_entitlement` stands in for
+# a check that waits on a database or an HTTP API
+POLICY = """
+[commands.ban]
+adaptive = true
+all = [
+    { not = { check = "in_dm" } },
+    { any = [
+        { check = "user_has_guild_perms", ban_members = true },
+        { check = "user_has_role", args = [["role-0", "role-1"]] },
+    ] },
+    { check = "bot_has_channel_perms", embed_links = true },
+]
+
+[commands.post]
+all = [
+    { check = "user_has_channel_perms", send_messages = true },
+    { check = "membership", args = ["d"], ge = 7 },
+    { not = { check = "username_contains", args = ["spam", "scam"] } },
+]
+
+[commands.daily]
+concurrent = true
+all = [
+    { check = "cooldown", args = [1, 3600.0] },
+    { check = "remote_entitlement", args = [0.002] },
+]
+
+[app_commands.profile]
+any = [
+    { check = "is_guild_owner" },
+    { check = "user_has_role", args = [["role-2", "role-3", "role-4"]] },
+    { check = "user_has_channel_perms", embed_links = true },
+]
+
+[app_commands.report]
+adaptive = true
+all = [
+    { not = { check = "channel_is_nsfw" } },
+    { check = "membership", args = ["h"], ge = 1 },
+    { check = "remote_entitlement", args = [0.005] },
+]
+"""
+
+
+class remote_entitlement(dpycheck.types.Check):
+    """Passes after `latency` seconds for most users, like a check waiting on
+    an external service.
+
+    """
+    def __init__(self, latency: float) -> None:
+        self._exc = dpycheck.exceptions.Generic
+        self._args: tuple = ()
+        self._latency = latency
+
+    async def predicate(self, utx: dpycheck.types.utx, /
+                        ) -> dpycheck.types.CheckResult:
+        await asyncio.sleep(self._latency)
+        author = utx.author if isinstance(utx, commands.Context) else utx.user
+        return self.result(author.id % 10 != 0)
+
+
+def generate(world: dict, policy: dpycheck.Policy, *, rate: int,
+             duration: float, burst: float, seed: int
+             ) -> typing.Iterator[dict]:
+    """The lines of a trace of `rate` invocations per second over
+    `duration` seconds, arriving in bursts of `burst` seconds at the start of
+    each second.
+
+    """
+    rng = random.Random(seed)
+    client = fakes.make_guilds(**world)
+    # authors are picked uniformly from every member, so that large guilds
+    # see most of the traffic
+    members = [m for g in client.guilds.values() for m in g.members
+               if not m.bot]
+    channels: dict[int, list[int]] = {}
+    for channel in client.channels.values():
+        channels.setdefault(channel.guild.id, []).append(channel.id)
+    names = ([(name, "ctx") for name in policy.command_names]
+             + [(name, "itx") for name in policy.app_command_names])
+
+    yield {"world": world}
+    for second in range(int(duration)):
+        times = sorted(second + rng.random() * burst for _ in range(rate))
+        for t in times:
+            author = rng.choice(members)
+            command, kind = rng.choice(names)
+            yield {"t": round(t, 6), "command": command, "kind": kind,
+                   "guild": author.guild.id, "author": author.id,
+                   "channel": rng.choice(channels[author.guild.id])}
+
+
+def predicates(policy: dpycheck.Policy) -> dict[tuple[str, str],
+                                                  typing.Callable]:
+    """The check of each command, as the decorators add them to commands.
+
+    """
+    async def callback(utx) -> None: ...
+
+    result = {}
+    for name in policy.command_names:
+        func = policy.decorator(name)(lambda ctx: callback(ctx))
+        result[name, "ctx"] = func.__commands_checks__.pop()
+    for name in policy.app_command_names:
+        func = policy.decorator(name, app=True)(lambda itx: callback(itx))
+        result[name, "itx"] = func.__discord_app_commands_checks__.pop()
+    return result
+
+
+def percentile(data: list[float], p: float) -> float:
+    ordered = sorted(data)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def peak_rss() -> float:
+    """The peak resident set size of this process so far, in MiB.
+
+    """
+    # kibibytes on Linux, bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 ** 2 if sys.platform == "darwin" else 1024)
+
+
+async def replay(lines: list[dict], policy: dpycheck.Policy, speed: float
+                 ) -> None:
+    start = time.perf_counter()
+    client = fakes.make_guilds(**lines[0]["world"])
+    events = lines[1:]
+    print(f"built {len(client.guilds)} guilds, "
+          f"{sum(len(g.members) for g in client.guilds.values())} members "
+          f"and {len(client.channels)} channels in "
+          f"{time.perf_counter() - start:.1f} s "
+          f"(peak RSS {peak_rss():.0f} MiB)")
+
+    checks = predicates(policy)
+    handler = dpycheck.ErrorHandler([])
+    service: list[float] = []
+    delay: list[float] = []
+    failed = 0
+
+    async def invoke(event: dict, due: float) -> None:
+        nonlocal failed
+        guild = client.guilds[event["guild"]]
+        author = guild.get_member(event["author"])
+        channel = client.channels[event["channel"]]
+        if event["kind"] == "ctx":
+            utx = fakes.FakeContext(client, author, channel, guild)
+        else:
+            utx = fakes.FakeInteraction(client, author, channel, guild)
+        began = time.perf_counter()
+        try:
+            await checks[event["command"], event["kind"]](utx)
+        except (commands.CheckFailure, app_commands.CheckFailure) as exc:
+            failed += 1
+            await handler.error(utx, exc)
+        done = time.perf_counter()
+        service.append(done - began)
+        delay.append(done - due)
+
+    tasks = set()
+    start = time.perf_counter()
+    for event in events:
+        due = start + (event["t"] / speed if speed else 0.0)
+        wait = due - time.perf_counter()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        task = asyncio.create_task(invoke(event, max(due, start)))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    while tasks:
+        await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    def ms(data: list[float], p: float) -> str:
+        return f"{percentile(data, p) * 1000:>9.3f} ms"
+
+    print(f"replayed {len(events)} invocations ({failed} failed checks) in "
+          f"{elapsed:.2f} s: {len(events) / elapsed:,.0f} per second")
+    print(f"{'':<22}{'p50':>12}{'p99':>12}{'max':>12}")
+    print(f"{'check + error':<22}{ms(service, 50)}{ms(service, 99)}"
+          f"{ms(service, 100)}")
+    print(f"{'arrival to done':<22}{ms(delay, 50)}{ms(delay, 99)}"
+          f"{ms(delay, 100)}")
+    print(f"peak RSS {peak_rss():.0f} MiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--policy", help="a TOML or JSON policy document; "
+                        "defaults to a built-in one")
+    parser.add_argument("--trace", help="replay this trace instead of "
+                        "generating one")
+    parser.add_argument("--write", metavar="PATH",
+                        help="write the generated trace here and exit")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="replay speed relative to the trace's "
+                        "timestamps; 0 replays as fast as possible")
+    world = parser.add_argument_group("generated traces")
+    world.add_argument("--guilds", type=int, default=5000)
+    world.add_argument("--members", type=int, default=100_000)
+    world.add_argument("--roles", type=int, default=20,
+                       help="roles per guild")
+    world.add_argument("--channels", type=int, default=10,
+                       help="channels per guild")
+    world.add_argument("--overwrites", type=int, default=4,
+                       help="overwrites per channel")
+    world.add_argument("--rate", type=int, default=2000,
+                       help="invocations per second")
+    world.add_argument("--duration", type=float, default=10.0,
+                       help="seconds of invocations")
+    world.add_argument("--burst", type=float, default=0.25,
+                       help="the part of each second invocations arrive in")
+    world.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # the built-in checks and `remote_entitlement`
+    checks = dpycheck.PolicyLoader().checks
+    checks["remote_entitlement"] = remote_entitlement
+    loader = dpycheck.PolicyLoader(checks=checks)
+    policy = (loader.load(args.policy) if args.policy
+              else loader.loads(POLICY, source="<built-in policy>"))
+
+    if args.trace:
+        with open(args.trace) as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+    else:
+        world = {"guilds": args.guilds, "members": args.members,
+                 "roles": args.roles, "channels": args.channels,
+                 "overwrites": args.overwrites, "seed": args.seed}
+        lines = generate(world, policy, rate=args.rate,
+                         duration=args.duration, burst=args.burst,
+                         seed=args.seed)
+        if args.write:
+            with open(args.write, "w") as f:
+                for line in lines:
+                    f.write(json.dumps(line, separators=(",", ":")) + "\n")
+            return
+        lines = list(lines)
+    asyncio.run(replay(lines, policy, args.speed))
+
+
+main()
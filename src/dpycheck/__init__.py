@@ -33,6 +33,7 @@ __all__ = (
     "in_guild",
     "in_category",
     "is_bot_owner",
+    "OwnerCache",
     "channel_is_nsfw",
     "is_guild_owner",
     "username_contains",
@@ -44,48 +45,176 @@ __all__ = (
     "All",
     "And",
     "user_has_role",
-    "bot_has_role"
+    "bot_has_role",
+    "RoleIndex",
+    "ResultCache",
+    "cached",
+    "MemberSnapshot",
+    "IdFile",
+    "in_id_file",
+    "cooldown",
+    "BucketTable",
+    "CooldownBackend",
+    "SQLiteBackend",
+    "SharedMemoryBackend",
+    "SharedResultCache",
+    "Policy",
+    "PolicyLoader",
+    "PolicyError",
+    "Metrics",
+    "timed",
+    "Tracer",
+    "Trace",
+    "explain"
 )
 
-from . import ctx
-from . import itx
-from . import types
-from . import exceptions
-from . import constants
-from . import utils
-from ._channel_perms import (
-    user_has_channel_perms,
-    bot_has_channel_perms
-)
-from ._error_handler import (
-    ErrorHandler,
-    Formatter
-)
-from ._guild_perms import (
-    user_has_guild_perms,
-    bot_has_guild_perms
-)
-from ._misc import (
-    in_dm,
-    is_user,
-    in_channel,
-    in_guild,
-    in_category,
-    is_bot_owner,
-    channel_is_nsfw,
-    is_guild_owner,
-    username_contains,
-    membership,
-    custom
-)
-from ._modifiers import (
-    Not,
-    Any,
-    Or,
-    All,
-    And
-)
-from ._role import (
-    user_has_role,
-    bot_has_role
-)
+import importlib
+import typing
+
+# public name -> the module defining it, imported on first access
+_LAZY = {
+    "ctx": ".ctx",
+    "itx": ".itx",
+    "types": ".types",
+    "exceptions": ".exceptions",
+    "constants": ".constants",
+    "utils": ".utils",
+    "user_has_channel_perms": "._channel_perms",
+    "bot_has_channel_perms": "._channel_perms",
+    "ErrorHandler": "._error_handler",
+    "Formatter": "._error_handler",
+    "user_has_guild_perms": "._guild_perms",
+    "bot_has_guild_perms": "._guild_perms",
+    "in_dm": "._misc",
+    "is_user": "._misc",
+    "in_channel": "._misc",
+    "in_guild": "._misc",
+    "in_category": "._misc",
+    "is_bot_owner": "._misc",
+    "OwnerCache": "._misc",
+    "channel_is_nsfw": "._misc",
+    "is_guild_owner": "._misc",
+    "username_contains": "._misc",
+    "membership": "._misc",
+    "custom": "._misc",
+    "Not": "._modifiers",
+    "Any": "._modifiers",
+    "Or": "._modifiers",
+    "All": "._modifiers",
+    "And": "._modifiers",
+    "user_has_role": "._role",
+    "bot_has_role": "._role",
+    "RoleIndex": "._role",
+    "ResultCache": "._cache",
+    "cached": "._cache",
+    "MemberSnapshot": "._bulk",
+    "IdFile": "._id_file",
+    "in_id_file": "._id_file",
+    "cooldown": "._cooldown",
+    "BucketTable": "._cooldown",
+    "CooldownBackend": "._cooldown",
+    "SQLiteBackend": "._cooldown",
+    "SharedMemoryBackend": "._cooldown",
+    "SharedResultCache": "._shared_cache",
+    "Policy": "._policy",
+    "PolicyLoader": "._policy",
+    "PolicyError": "._policy",
+    "Metrics": "._metrics",
+    "timed": "._metrics",
+    "Tracer": "._trace",
+    "Trace": "._trace",
+    "explain": "._trace"
+}
+
+
+def __getattr__(name: str) -> typing.Any:
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = importlib.import_module(module, __name__)
+    if module != f".{name}":
+        value = getattr(value, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
+
+
+if typing.TYPE_CHECKING:
+    from . import ctx
+    from . import itx
+    from . import types
+    from . import exceptions
+    from . import constants
+    from . import utils
+    from ._channel_perms import (
+        user_has_channel_perms,
+        bot_has_channel_perms
+    )
+    from ._error_handler import (
+        ErrorHandler,
+        Formatter
+    )
+    from ._guild_perms import (
+        user_has_guild_perms,
+        bot_has_guild_perms
+    )
+    from ._misc import (
+        in_dm,
+        is_user,
+        in_channel,
+        in_guild,
+        in_category,
+        is_bot_owner,
+        OwnerCache,
+        channel_is_nsfw,
+        is_guild_owner,
+        username_contains,
+        membership,
+        custom
+    )
+    from ._modifiers import (
+        Not,
+        Any,
+        Or,
+        All,
+        And
+    )
+    from ._role import (
+        user_has_role,
+        bot_has_role,
+        RoleIndex
+    )
+    from ._cache import (
+        ResultCache,
+        cached
+    )
+    from ._bulk import MemberSnapshot
+    from ._id_file import (
+        IdFile,
+        in_id_file
+    )
+    from ._cooldown import (
+        cooldown,
+        BucketTable,
+        CooldownBackend,
+        SQLiteBackend,
+        SharedMemoryBackend
+    )
+    from ._shared_cache import SharedResultCache
+    from ._policy import (
+        Policy,
+        PolicyLoader,
+        PolicyError
+    )
+    from ._metrics import (
+        Metrics,
+        timed
+    )
+    from ._trace import (
+        Tracer,
+        Trace,
+        explain
+    )
@@ -0,0 +1,198 @@
+"""Evaluation of checks against many members at once.
+
+:copyright: (c) 2022-present Tanner B. Corcoran
+:license: MIT, see LICENSE for more details.
+"""
+
+__author__ = "Tanner B. Corcoran"
+__license__ = "MIT License"
+__copyright__ = "Copyright (c) 2022-present Tanner B. Corcoran"
+
+
+from . import types
+import discord
+import typing
+import time
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# the join time of members whose join time is unknown
+NOT_JOINED = numpy.iinfo(numpy.int64).min if numpy is not None else None
+
+
+class MemberSnapshot:
+    """The members of a guild as arrays, so that checks can be evaluated
+    against all of them at once through `Check.bulk_predicate`, which returns
+    a boolean mask over `ids`. Requires numpy (`pip install dpy-check[bulk]`).
+
+    Supported by `user_has_role`, `user_has_guild_perms`,
+    `user_has_channel_perms`, `is_user`, `membership`, `Not`, `Any`, `All` and
+    `cached`.
+
+    """
+    def __init__(self, ids: typing.Sequence[int],
+                 permissions: typing.Sequence[int],
+                 role_ids: typing.Sequence[int], roles: typing.Any,
+                 joined_at: typing.Sequence[int], /, *,
+                 guild_id: int | None = None,
+                 role_names: dict[str, int] | None = None,
+                 channel_id: int | None = None,
+                 channel_permissions: typing.Sequence[int] | None = None
+                 ) -> None:
+        """
+        Arguments
+        ---------
+        ids : Sequence[int]
+            The member IDs.
+        permissions : Sequence[int]
+            The guild permission value of each member.
+        role_ids : Sequence[int]
+            The IDs of the guild's roles, one per column of `roles`.
+        roles : array_like
+            A boolean matrix of shape `(len(ids), len(role_ids))`, True where
+            a member has a role.
+        joined_at : Sequence[int]
+            The UNIX time (in seconds) each member joined at, or `NOT_JOINED`.
+        guild_id : int, default=None
+            The ID of the guild. Checks given another guild ID will raise
+            ValueError.
+        role_names : dict[str, int], default=None
+            Role names and the ID they resolve to, for checks given role names.
+        channel_id : int, default=None
+            The ID of the channel `channel_permissions` were resolved in.
+        channel_permissions : Sequence[int], default=None
+            The channel permission value of each member.
+
+        """
+        if numpy is None:
+            raise ImportError("bulk evaluation requires numpy; install "
+                              "dpy-check[bulk]")
+        self.ids = numpy.asarray(ids, dtype=numpy.uint64)
+        self.permissions = numpy.asarray(permissions, dtype=numpy.uint64)
+        self.role_ids = numpy.asarray(role_ids, dtype=numpy.uint64)
+        self.roles = numpy.asarray(roles, dtype=bool).reshape(
+            len(self.ids), len(self.role_ids))
+        self.joined_at = numpy.asarray(joined_at, dtype=numpy.int64)
+        self.guild_id = guild_id
+        self.role_names = role_names or {}
+        self.channel_id = channel_id
+        self.channel_permissions = (
+            None if channel_permissions is None
+            else numpy.asarray(channel_permissions, dtype=numpy.uint64))
+        self._columns = {int(id): i for i, id in enumerate(self.role_ids)}
+
+    @classmethod
+    def from_guild(cls, guild: discord.Guild,
+                   channel: discord.abc.GuildChannel | None = None, /
+                   ) -> "MemberSnapshot":
+        """Take a snapshot of the cached members of `guild`, including their
+        permissions in `channel` if given.
+
+        """
+        roles = guild.roles
+        columns = {role.id: i for i, role in enumerate(roles)}
+        role_names = {}
+        for role in roles:
+            role_names.setdefault(role.name, role.id)
+        members = guild.members
+        ids, permissions, joined_at, rows, cols = [], [], [], [], []
+        channel_permissions = [] if channel is not None else None
+        for row, member in enumerate(members):
+            ids.append(member.id)
+            permissions.append(member.guild_permissions.value)
+            joined_at.append(int(member.joined_at.timestamp())
+                             if member.joined_at else NOT_JOINED)
+            for role_id in member._roles:
+                col = columns.get(role_id)
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+            if channel is not None:
+                channel_permissions.append(
+                    channel.permissions_for(member).value)
+        matrix = numpy.zeros((len(members), len(roles)), dtype=bool)
+        matrix[rows, cols] = True
+        # every member has the @everyone role, which `_roles` leaves out
+        everyone = columns.get(guild.id)
+        if everyone is not None:
+            matrix[:, everyone] = True
+        return cls(ids, permissions, [r.id for r in roles], matrix, joined_at,
+                   guild_id=guild.id, role_names=role_names,
+                   channel_id=channel.id if channel is not None else None,
+                   channel_permissions=channel_permissions)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def select(self, check: types.Check, /) -> typing.Any:
+        """The IDs of the members that pass `check`.
+
+        """
+        return self.ids[check.bulk_predicate(self)]
+
+    def everyone(self) -> typing.Any:
+        return numpy.ones(len(self.ids), dtype=bool)
+
+    def no_one(self) -> typing.Any:
+        return numpy.zeros(len(self.ids), dtype=bool)
+
+    def check_guild(self, guild_id: int | None, /) -> None:
+        if guild_id and self.guild_id and guild_id != self.guild_id:
+            raise ValueError(f"snapshot is of guild {self.guild_id}, not "
+                             f"{guild_id}")
+
+    def has_any_role(self, role_ids: typing.Iterable[int],
+                     role_names: typing.Iterable[str] = (), /) -> typing.Any:
+        role_ids = set(role_ids)
+        role_ids.update(self.role_names[n] for n in role_names
+                        if n in self.role_names)
+        if self.guild_id is not None and self.guild_id in role_ids:
+            # the @everyone role
+            return self.everyone()
+        cols = [self._columns[id] for id in role_ids if id in self._columns]
+        if not cols:
+            return self.no_one()
+        return self.roles[:, cols].any(axis=1)
+
+    def has_guild_perms(self, mask: int, expected: int, /) -> typing.Any:
+        """Which members' guild permission values `v` satisfy
+        `v & mask == expected`.
+
+        """
+        return self._has_perms(self.permissions, mask, expected)
+
+    def has_channel_perms(self, mask: int, expected: int,
+                          channel_id: int | None = None, /) -> typing.Any:
+        """Which members' permission values `v` in the snapshot's channel
+        satisfy `v & mask == expected`.
+
+        """
+        if self.channel_permissions is None:
+            raise ValueError("snapshot has no channel permissions")
+        if channel_id and channel_id != self.channel_id:
+            raise ValueError(f"snapshot is of channel {self.channel_id}, not "
+                             f"{channel_id}")
+        return self._has_perms(self.channel_permissions, mask, expected)
+
+    def _has_perms(self, values: typing.Any, mask: int, expected: int
+                   ) -> typing.Any:
+        if expected < 0:
+            return self.no_one()
+        return (values & numpy.uint64(mask)) == numpy.uint64(expected)
+
+    def is_any(self, ids: typing.Iterable[int], /) -> typing.Any:
+        return numpy.isin(self.ids, numpy.fromiter(ids, dtype=numpy.uint64))
+
+    def joined_for(self, unit: float, now: float | None = None, /
+                   ) -> typing.Any:
+        """How long each member has been a member for, in `unit` seconds. NaN
+        if unknown, so that every comparison fails.
+
+        """
+        now = time.time() if now is None else now
+        delta = (now - self.joined_at) / unit
+        delta[self.joined_at == NOT_JOINED] = numpy.nan
+        return delta
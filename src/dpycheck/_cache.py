@@ -0,0 +1,286 @@
+"""Caching of check results between invocations.
+
+:copyright: (c) 2022-present Tanner B. Corcoran
+:license: MIT, see LICENSE for more details.
+"""
+
+__author__ = "Tanner B. Corcoran"
+__license__ = "MIT License"
+__copyright__ = "Copyright (c) 2022-present Tanner B. Corcoran"
+
+
+from discord.ext import commands
+from . import types
+from . import utils
+from . import _compiler
+import collections
+import discord
+import typing
+import time
+if typing.TYPE_CHECKING:
+    from . import _shared_cache
+
+
+Key = tuple[object, int, int | None, int | None]
+
+
+def get_key(obj: object, utx: types.utx) -> Key:
+    channel = utx.channel
+    guild = utx.guild
+    return (obj, utils.get_author(utx).id,
+            channel.id if channel is not None else None,
+            guild.id if guild is not None else None)
+
+
+class ResultCache:
+    """A bounded LRU cache of check results, keyed by the check and the
+    invoking author, channel and guild.
+
+    Entries expire after `ttl` seconds. Once attached to a bot with `attach`,
+    entries are also dropped as soon as a gateway event may have changed their
+    result (member, role, channel or guild updates). The `hits`, `misses`,
+    `evictions`, `expirations` and `invalidations` counters are cumulative.
+
+    """
+    def __init__(self, maxsize: int = 4096, ttl: float = 30.0) -> None:
+        """
+        Arguments
+        ---------
+        maxsize : int, default=4096
+            The maximum number of results to keep. The least recently used
+            result is evicted first.
+        ttl : float, default=30.0
+            The number of seconds a result is kept for.
+
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._entries: collections.OrderedDict[Key, tuple[float,
+                                                          types.CheckResult]
+                                               ] = collections.OrderedDict()
+        # user, channel and guild ID -> keys, so that events do not have to
+        # scan every entry
+        self._by_user: dict[int, set[Key]] = {}
+        self._by_channel: dict[int, set[Key]] = {}
+        self._by_guild: dict[int, set[Key]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
+
+    def get(self, key: Key) -> types.CheckResult | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires, result = entry
+        if expires <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key: Key, result: types.CheckResult) -> None:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        else:
+            _, user_id, channel_id, guild_id = key
+            self._by_user.setdefault(user_id, set()).add(key)
+            if channel_id is not None:
+                self._by_channel.setdefault(channel_id, set()).add(key)
+            if guild_id is not None:
+                self._by_guild.setdefault(guild_id, set()).add(key)
+        self._entries[key] = (time.monotonic() + self.ttl, result)
+        while len(self._entries) > self.maxsize:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: Key) -> None:
+        del self._entries[key]
+        _, user_id, channel_id, guild_id = key
+        for index, id in ((self._by_user, user_id),
+                          (self._by_channel, channel_id),
+                          (self._by_guild, guild_id)):
+            keys = index.get(id)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del index[id]
+
+    def invalidate(self, *, user_id: int = None, channel_id: int = None,
+                   guild_id: int = None) -> None:
+        """Drop every result matching all of the given IDs.
+
+        """
+        candidates = []
+        for index, id in ((self._by_user, user_id),
+                          (self._by_channel, channel_id),
+                          (self._by_guild, guild_id)):
+            if id is not None:
+                candidates.append(index.get(id, ()))
+        if not candidates:
+            return
+        for key in list(min(candidates, key=len)):
+            _, u, c, g = key
+            if ((user_id is None or u == user_id)
+                    and (channel_id is None or c == channel_id)
+                    and (guild_id is None or g == guild_id)):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_user.clear()
+        self._by_channel.clear()
+        self._by_guild.clear()
+
+    def attach(self, bot: commands.Bot) -> None:
+        """Register the event listeners that invalidate this cache. Without a
+        `commands.Bot`, call the `on_...` methods from your own events.
+
+        """
+        for name in dir(self):
+            if name.startswith("on_"):
+                bot.add_listener(getattr(self, name), name)
+
+    async def on_member_update(self, before: discord.Member,
+                               after: discord.Member) -> None:
+        self.invalidate(user_id=after.id, guild_id=after.guild.id)
+
+    async def on_member_remove(self, member: discord.Member) -> None:
+        self.invalidate(user_id=member.id, guild_id=member.guild.id)
+
+    async def on_user_update(self, before: discord.User, after: discord.User
+                             ) -> None:
+        self.invalidate(user_id=after.id)
+
+    async def on_guild_role_create(self, role: discord.Role) -> None:
+        self.invalidate(guild_id=role.guild.id)
+
+    async def on_guild_role_delete(self, role: discord.Role) -> None:
+        self.invalidate(guild_id=role.guild.id)
+
+    async def on_guild_role_update(self, before: discord.Role,
+                                   after: discord.Role) -> None:
+        self.invalidate(guild_id=after.guild.id)
+
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel
+                                      ) -> None:
+        self.invalidate(channel_id=channel.id)
+
+    async def on_guild_channel_update(self, before: discord.abc.GuildChannel,
+                                      after: discord.abc.GuildChannel
+                                      ) -> None:
+        # synced channels take their overwrites from their category
+        if isinstance(after, discord.CategoryChannel):
+            self.invalidate(guild_id=after.guild.id)
+        else:
+            self.invalidate(channel_id=after.id)
+
+    async def on_guild_update(self, before: discord.Guild, after: discord.Guild
+                              ) -> None:
+        self.invalidate(guild_id=after.id)
+
+    async def on_guild_remove(self, guild: discord.Guild) -> None:
+        self.invalidate(guild_id=guild.id)
+
+
+class cached(types.Check):
+    def __init__(self, check: types.Check,
+                 cache: "ResultCache | _shared_cache.SharedResultCache", *,
+                 name: str | None = None) -> None:
+        """
+        Arguments
+        ---------
+        check : Check
+            The check whose results will be cached.
+        cache : ResultCache | SharedResultCache
+            The cache to keep the results in. One cache can be shared by many
+            checks.
+        name : str, default=None
+            The name identifying the check's results in `cache`. Checks with
+            the same name share results. By default, a `ResultCache`
+            identifies the check itself, and a `SharedResultCache` its
+            fingerprint.
+
+        """
+        if _compiler.compile_all(check).is_stateful:
+            raise ValueError("the results of stateful checks cannot be cached")
+        self._exc = check._exc
+        self._args = check._args
+        self._check = check
+        self._fingerprint = (check,)
+        self._cache = cache
+        self._id = check if name is None else name
+        self.is_sync = check.is_sync
+        # a `SharedResultCache` fingerprints the check now, so that one that
+        # cannot be fingerprinted fails here rather than when invoked
+        if hasattr(cache, "register"):
+            cache.register(self._id)
+
+    def sync_predicate(self, utx: types.utx, /) -> types.CheckResult:
+        key = get_key(self._id, utx)
+        result = self._cache.get(key)
+        if result is None:
+            result = self._check.sync_predicate(utx)
+            self._cache.put(key, result)
+        return result
+
+    async def predicate(self, utx: types.utx, /) -> types.CheckResult:
+        key = get_key(self._id, utx)
+        result = self._cache.get(key)
+        if result is None:
+            if self.is_sync:
+                result = self._check.sync_predicate(utx)
+            else:
+                result = await self._check.predicate(utx)
+            self._cache.put(key, result)
+        return result
+
+    def bulk_predicate(self, members: typing.Any) -> typing.Any:
+        return self._check.bulk_predicate(members)
+
+
+class CachedProgram:
+    """A compiled program whose results are kept in a `ResultCache`.
+
+    """
+    __slots__ = ("program", "cache")
+    # stateful programs are refused
+    is_stateful = False
+
+    def __init__(self, program: typing.Any,
+                 cache: "ResultCache | _shared_cache.SharedResultCache"
+                 ) -> None:
+        if program.is_stateful:
+            raise ValueError("the results of stateful checks cannot be cached")
+        self.program = program
+        self.cache = cache
+        if hasattr(cache, "register"):
+            cache.register(program)
+
+    async def run(self, utx: types.utx, /) -> types.CheckResult:
+        key = get_key(self.program, utx)
+        result = self.cache.get(key)
+        if result is None:
+            result = await self.program.run(utx)
+            self.cache.put(key, result)
+        return result
@@ -13,33 +13,35 @@ from . import types
 from . import exceptions
 from . import utils
 import discord
+import typing
 
 
 def _predicate(self: types.Check, utx: types.utx, channel_id: int | None,
-               user_id: int, perms: dict[str, discord.Permissions]
-               ) -> bool:
+               user_id: int) -> types.CheckResult:
     if channel_id:
         client = utils.get_client(utx)
         channel = client.get_channel(channel_id)
         if not channel:
-            return False
+            return self.result(False)
         member = channel.guild.get_member(user_id)
         if not member:
-            return False
+            return self.result(False)
         _perms = channel.permissions_for(member)
     else:
         _perms = utx.permissions
-    missing = [p for p, v in perms.items() if getattr(_perms, p) != v]
-    if not missing:
-        return True
-    self._args = tuple([channel_id] + missing)
-    return False
+    value = _perms.value
+    if value & self._mask == self._expected:
+        return self.result(True)
+    missing = utils.missing_perms(self._perms, value)
+    return types.CheckResult(False, self._exc, tuple([channel_id] + missing))
 
 
 class user_has_channel_perms(types.Check):
     """A check for user channel perms.
     
     """
+    is_sync = True
+
     def __init__(self, channel_id: int = None, **perms: bool) -> None:
         """
         Arguments
@@ -57,19 +59,27 @@ class user_has_channel_perms(types.Check):
         if invalid:
             raise TypeError(f"Invalid permission(s): {', '.join(invalid)}")
         self._exc = exceptions.UserMissingChannelPerms
-        self._args: tuple[int | None | discord.Permissions, ...] = ()
+        self._args: tuple[int | None | discord.Permissions, ...] = (channel_id,)
         self._channel_id = channel_id
         self._perms = perms
+        self._mask, self._expected = utils.compile_perms(perms)
+        self._fingerprint = (self._mask, self._expected)
     
-    async def predicate(self, utx: types.utx, /) -> bool:
+    def sync_predicate(self, utx: types.utx, /) -> types.CheckResult:
         return _predicate(self, utx, self._channel_id,
-                          utils.get_author(utx).id, self._perms)
+                          utils.get_author(utx).id)
+
+    def bulk_predicate(self, members: typing.Any) -> typing.Any:
+        return members.has_channel_perms(self._mask, self._expected,
+                                         self._channel_id)
 
 
 class bot_has_channel_perms(types.Check):
     """A check for bot channel perms.
     
     """
+    is_sync = True
+
     def __init__(self, channel_id: int = None, **perms: bool) -> None:
         """
         Arguments
@@ -87,10 +97,12 @@ class bot_has_channel_perms(types.Check):
         if invalid:
             raise TypeError(f"Invalid permission(s): {', '.join(invalid)}")
         self._exc = exceptions.BotMissingChannelPerms
-        self._args: tuple[int | None | discord.Permissions, ...] = ()
+        self._args: tuple[int | None | discord.Permissions, ...] = (channel_id,)
         self._channel_id = channel_id
         self._perms: dict[str, bool] = perms
+        self._mask, self._expected = utils.compile_perms(perms)
+        self._fingerprint = (self._mask, self._expected)
 
-    async def predicate(self, utx: types.utx, /) -> bool:
+    def sync_predicate(self, utx: types.utx, /) -> types.CheckResult:
         return _predicate(self, utx, self._channel_id,
-                          utils.get_me(utx).id, self._perms)
+                          utils.get_me(utx).id)
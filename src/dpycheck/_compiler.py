@@ -0,0 +1,483 @@
+"""Compilation of check trees into flat evaluators.
+
+:copyright: (c) 2022-present Tanner B. Corcoran
+:license: MIT, see LICENSE for more details.
+"""
+
+__author__ = "Tanner B. Corcoran"
+__license__ = "MIT License"
+__copyright__ = "Copyright (c) 2022-present Tanner B. Corcoran"
+
+
+from . import _modifiers
+from . import exceptions
+from . import types
+import asyncio
+import typing
+import time
+
+
+# jump targets below zero are terminal; targets below `FAIL` index into
+# `Program.reports` (`FAIL - 1 - n` reports the n-th entry)
+PASS = -1
+FAIL = -2
+PASSED = types.CheckResult(True, exceptions.Generic)
+FAILED = types.CheckResult(False, exceptions.Generic)
+
+
+class _Leaf:
+    __slots__ = ("check", "negated", "origin")
+
+    def __init__(self, check: types.Check, negated: bool,
+                 origin: types.Check | None) -> None:
+        self.check = check
+        self.negated = negated
+        self.origin = origin
+
+
+class _Node:
+    __slots__ = ("is_any", "children", "origin")
+
+    def __init__(self, is_any: bool, children: list,
+                 origin: types.Check | None) -> None:
+        self.is_any = is_any
+        self.children = children
+        self.origin = origin
+
+
+class _Const:
+    __slots__ = ("value", "origin")
+
+    def __init__(self, value: bool, origin: types.Check | None) -> None:
+        self.value = value
+        self.origin = origin
+
+
+def _identity(node: _Leaf | _Node | _Const) -> tuple | None:
+    # stateful leaves are never merged, as each evaluation has an effect
+    if isinstance(node, _Leaf) and not node.check.is_stateful:
+        return (id(node.check), node.negated)
+    return None
+
+
+def _is_stateful(node: _Leaf | _Node | _Const) -> bool:
+    if isinstance(node, _Leaf):
+        return node.check.is_stateful
+    if isinstance(node, _Node):
+        return any(_is_stateful(c) for c in node.children)
+    return False
+
+
+def _simplify(is_any: bool, children: list, origin: types.Check | None
+              ) -> _Leaf | _Node | _Const:
+    flat = []
+    seen = set()
+    for child in children:
+        if isinstance(child, _Const):
+            # `True` is neutral in All and `False` is neutral in Any; the
+            # other value decides the node, so later children are dead
+            if child.value is not is_any:
+                continue
+            if not flat:
+                return _Const(is_any, origin if origin is not None
+                                      else child.origin)
+            flat.append(child)
+            break
+        # All(All(a), b) -> All(a, b) only if the inner node reports the
+        # failing child, as otherwise the inner report would be lost
+        if (isinstance(child, _Node) and child.is_any is is_any
+                and (is_any or origin is not None or child.origin is None)):
+            grandchildren = child.children
+        else:
+            grandchildren = (child,)
+        for node in grandchildren:
+            identity = _identity(node)
+            if identity is not None:
+                if identity in seen:
+                    continue
+                seen.add(identity)
+            flat.append(node)
+    if not flat:
+        return _Const(not is_any, origin)
+    if len(flat) == 1:
+        (child,) = flat
+        if origin is not None:
+            child.origin = origin
+        return child
+    return _Node(is_any, flat, origin)
+
+
+def _normalize(check: types.Check, negated: bool,
+               origin: types.Check | None) -> _Leaf | _Node | _Const:
+    if isinstance(check, _modifiers.Not):
+        return _normalize(check._check, not negated,
+                          origin if origin is not None else check)
+    if isinstance(check, (_modifiers.All, _modifiers.Any)):
+        is_any = isinstance(check, _modifiers.Any)
+        if is_any and origin is None:
+            origin = check
+        # De Morgan: Not(All(a, b)) -> Any(Not(a), Not(b)) and vice versa
+        children = [_normalize(c, negated, None) for c in check._checks]
+        return _simplify(is_any is not negated, children, origin)
+    return _Leaf(check, negated, origin)
+
+
+class Program:
+    """A check tree flattened into a sequence of leaf tests and jumps.
+
+    Each instruction is a tuple of `(check, sync, on_true, on_false)`. Nested
+    `Not` modifiers are pushed down to the leaves, where they only swap the
+    jump targets, so evaluating the tree never recurses and the
+    `sync_predicate` of synchronous leaves is called inline.
+
+    A failure is reported either as the failing leaf's own result, as a fixed
+    result (such as that of an `Any`), or, for a leaf directly under `Not`, as
+    the reversed exception with the arguments of the leaf's passing result.
+
+    `is_stateful` is True if any leaf is stateful, in which case results of
+    the program must not be cached.
+
+    """
+    __slots__ = ("root", "entry", "code", "reports", "is_stateful")
+
+    def __init__(self, root: _Leaf | _Node | _Const) -> None:
+        self.root = root
+        self.reports: list[types.CheckResult | type[Exception]] = []
+        code: list[tuple] = []
+        entry = self._emit(code, root, PASS, FAIL)
+
+        # instructions were emitted last-to-first; flip them into
+        # evaluation order
+        last = len(code) - 1
+        def flip(target: int) -> int:
+            return last - target if target >= 0 else target
+        self.code = [(c, s, flip(t), flip(f)) for c, s, t, f in reversed(code)]
+        self.entry = flip(entry)
+        self.is_stateful = any(c.is_stateful for c, *_ in self.code)
+
+    def _report(self, report: types.CheckResult | type[Exception]) -> int:
+        self.reports.append(report)
+        return FAIL - len(self.reports)
+
+    def _finish(self, pc: int, result: types.CheckResult | None
+                ) -> types.CheckResult:
+        if pc == PASS:
+            return PASSED
+        if pc == FAIL:
+            return result if result is not None else FAILED
+        report = self.reports[FAIL - 1 - pc]
+        if report.__class__ is types.CheckResult:
+            return report
+        return types.CheckResult(False, report, result.args)
+
+    def _emit(self, code: list[tuple], node: _Leaf | _Node | _Const,
+              on_true: int, on_false: int) -> int:
+        # a node with an origin reports the origin instead of the failing
+        # leaf, unless an enclosing node already chose what to report
+        if on_false == FAIL and node.origin is not None:
+            if (isinstance(node, _Leaf) and node.negated
+                    and isinstance(node.origin, _modifiers.Not)
+                    and node.origin._check is node.check):
+                on_false = self._report(node.origin._exc)
+            else:
+                on_false = self._report(node.origin.result(False))
+
+        if isinstance(node, _Const):
+            return on_true if node.value else on_false
+
+        if isinstance(node, _Leaf):
+            check = node.check
+            if node.negated:
+                if on_false == FAIL:
+                    on_false = self._report(exceptions.get_reverse(check._exc))
+                on_true, on_false = on_false, on_true
+            code.append((check, check.is_sync, on_true, on_false))
+            return len(code) - 1
+
+        # children are emitted right-to-left so that each one can jump to
+        # the entry of the sibling that follows it
+        target = on_true
+        for child in reversed(node.children):
+            if node.is_any:
+                on_false = self._emit(code, child, on_true, on_false)
+                target = on_false
+            else:
+                target = self._emit(code, child, target, on_false)
+        return target
+
+    async def run(self, utx: types.utx, /) -> types.CheckResult:
+        """Evaluate the program, returning the result that describes the
+        failure, or a passing result.
+
+        """
+        code = self.code
+        pc = self.entry
+        result = None
+        while pc >= 0:
+            check, sync, on_true, on_false = code[pc]
+            if sync:
+                result = check.sync_predicate(utx)
+            else:
+                result = await check.predicate(utx)
+            if result.__class__ is bool:
+                # checks written before `CheckResult` existed
+                result = check.result(result)
+            pc = on_true if result.passed else on_false
+        return self._finish(pc, result)
+
+
+class AdaptiveProgram(Program):
+    """A program that reorders the children of each `All` and `Any` by their
+    observed latency and pass rate.
+
+    Every `interval` runs, children are sorted so that the cheapest and most
+    decisive ones are evaluated first (by expected cost over the chance of
+    short-circuiting the node). Failures are still reported as they would be in
+    declaration order: if the reordered program fails, the declared program is
+    replayed over the results already computed, evaluating only the leaves that
+    the reordered program skipped. The children of nodes containing stateful
+    leaves keep their order, so stateful leaves are reached exactly as they
+    would be in declaration order.
+
+    """
+    __slots__ = ("interval", "ordered", "_counters", "_runs")
+
+    def __init__(self, root: _Leaf | _Node | _Const, interval: int = 64
+                 ) -> None:
+        super().__init__(root)
+        self.interval = interval
+        self.ordered: Program = self
+        self._counters: dict[types.Check, list[int]] = {
+            c: [0, 0, 0] for c, *_ in self.code}
+        self._runs = 0
+
+    def _estimate(self, node: _Leaf | _Node | _Const
+                  ) -> tuple[_Leaf | _Node | _Const, float, float, bool]:
+        # returns the reordered node, its expected cost, its chance of
+        # passing, and whether any of its children moved
+        if isinstance(node, _Const):
+            return node, 0.0, float(node.value), False
+        if isinstance(node, _Leaf):
+            calls, passes, elapsed = self._counters[node.check]
+            if not calls:
+                # unobserved leaves are tried first so that they get observed
+                return node, 0.0, 0.5, False
+            chance = passes / calls
+            return (node, elapsed / calls, 1 - chance if node.negated
+                    else chance, False)
+
+        estimates = [self._estimate(c) for c in node.children]
+        changed = any(e[3] for e in estimates)
+        def rank(estimate: tuple) -> float:
+            decisive = estimate[2] if node.is_any else 1 - estimate[2]
+            return estimate[1] / max(decisive, 1e-9)
+        if _is_stateful(node):
+            ordered = estimates
+        else:
+            ordered = sorted(estimates, key=rank)
+        changed = changed or any(a is not b for a, b in zip(ordered,
+                                                             estimates))
+
+        # expected cost: each child only runs if none before it decided
+        cost = 0.0
+        reach = 1.0
+        for _, child_cost, chance, _ in ordered:
+            cost += reach * child_cost
+            reach *= chance if not node.is_any else 1 - chance
+        chance = 1 - reach if node.is_any else reach
+        return (_Node(node.is_any, [e[0] for e in ordered], node.origin), cost,
+                chance, changed)
+
+    def reorder(self) -> None:
+        """Rebuild `ordered` from the counters collected so far.
+
+        """
+        root, _, _, changed = self._estimate(self.root)
+        self.ordered = Program(root) if changed else self
+
+    def stats(self) -> list[dict[str, typing.Any]]:
+        """The counters of each leaf, in the order they are currently
+        evaluated.
+
+        """
+        stats = []
+        for check, *_ in self.ordered.code:
+            calls, passes, elapsed = self._counters[check]
+            stats.append({
+                "check": check,
+                "calls": calls,
+                "passes": passes,
+                "mean_ns": elapsed / calls if calls else None
+            })
+        return stats
+
+    async def _evaluate(self, program: Program, utx: types.utx,
+                        results: dict[types.Check, types.CheckResult]
+                        ) -> types.CheckResult:
+        counters = self._counters
+        code = program.code
+        pc = program.entry
+        result = None
+        while pc >= 0:
+            check, sync, on_true, on_false = code[pc]
+            result = results.get(check)
+            if result is None:
+                start = time.perf_counter_ns()
+                if sync:
+                    result = check.sync_predicate(utx)
+                else:
+                    result = await check.predicate(utx)
+                if result.__class__ is bool:
+                    result = check.result(result)
+                c = counters[check]
+                c[0] += 1
+                c[1] += result.passed
+                c[2] += time.perf_counter_ns() - start
+                results[check] = result
+            pc = on_true if result.passed else on_false
+        return program._finish(pc, result)
+
+    async def run(self, utx: types.utx, /) -> types.CheckResult:
+        self._runs += 1
+        if self._runs % self.interval == 0:
+            self.reorder()
+        results = {}
+        result = await self._evaluate(self.ordered, utx, results)
+        if result.passed or self.ordered is self:
+            return result
+        return await self._evaluate(self, utx, results)
+
+
+class ConcurrentProgram(Program):
+    """A program that awaits asynchronous leaves concurrently.
+
+    Every asynchronous leaf that may affect the result is started as a task as
+    soon as it is reached, and the tree is re-evaluated each time one
+    finishes. Once the result is decided, the remaining tasks are cancelled.
+    An `Any` is decided by its first passing child; an `All` waits only for the
+    children declared before its first failing child, so that the reported
+    failure is the one sequential evaluation would report. Stateful leaves are
+    only evaluated once every child declared before them is known.
+
+    """
+    __slots__ = ()
+
+    def _leaf(self, node: _Leaf, utx: types.utx,
+              results: dict[types.Check, types.CheckResult | BaseException],
+              tasks: dict[types.Check, asyncio.Task]
+              ) -> types.CheckResult | None:
+        check = node.check
+        result = results.get(check)
+        if result is None:
+            if not check.is_sync:
+                if check not in tasks:
+                    tasks[check] = asyncio.ensure_future(check.predicate(utx))
+                return None
+            result = results[check] = check.sync_predicate(utx)
+        if isinstance(result, BaseException):
+            # only raised once sequential evaluation would have reached it
+            raise result
+        if result.__class__ is bool:
+            result = results[check] = check.result(result)
+        if result.passed is not node.negated:
+            return PASSED
+        if node.origin is None:
+            if not node.negated:
+                return result
+            return types.CheckResult(False, exceptions.get_reverse(check._exc),
+                                     result.args)
+        if (node.negated and isinstance(node.origin, _modifiers.Not)
+                and node.origin._check is check):
+            return types.CheckResult(False, node.origin._exc, result.args)
+        return node.origin.result(False)
+
+    def _resolve(self, node: _Leaf | _Node | _Const, utx: types.utx,
+                 results: dict[types.Check, types.CheckResult | BaseException],
+                 tasks: dict[types.Check, asyncio.Task]
+                 ) -> types.CheckResult | None:
+        # returns `None` while the result (or the failure to report) is not
+        # yet known
+        if isinstance(node, _Leaf):
+            return self._leaf(node, utx, results, tasks)
+        if isinstance(node, _Const):
+            if node.value:
+                return PASSED
+            if node.origin is None:
+                # an enclosing node will report in its place
+                return FAILED
+            return node.origin.result(False)
+
+        unknown = False
+        failed = None
+        for child in node.children:
+            if unknown and _is_stateful(child):
+                # sequential evaluation may never reach it
+                continue
+            result = self._resolve(child, utx, results, tasks)
+            if result is None:
+                unknown = True
+            elif result.passed:
+                if node.is_any:
+                    return PASSED
+            else:
+                failed = result
+                if not node.is_any:
+                    break
+        if unknown:
+            return None
+        if failed is None:
+            return PASSED
+        if node.origin is not None:
+            return node.origin.result(False)
+        return failed
+
+    async def run(self, utx: types.utx, /) -> types.CheckResult:
+        results = {}
+        tasks = {}
+        try:
+            while True:
+                result = self._resolve(self.root, utx, results, tasks)
+                if result is not None:
+                    return result
+                pending = [t for c, t in tasks.items() if c not in results]
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                for check, task in tasks.items():
+                    if task in done:
+                        exc = task.exception()
+                        results[check] = exc if exc is not None else task.result()
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+
+def _compile(root: _Leaf | _Node | _Const, adaptive: bool, concurrent: bool
+             ) -> Program:
+    if adaptive and concurrent:
+        raise ValueError("adaptive and concurrent evaluation cannot be "
+                         "combined")
+    if adaptive:
+        return AdaptiveProgram(root)
+    if concurrent:
+        return ConcurrentProgram(root)
+    return Program(root)
+
+
+def compile_all(*checks: types.Check, adaptive: bool = False,
+                concurrent: bool = False) -> Program:
+    """Compile `checks` into a program that passes if all of them pass.
+
+    """
+    return _compile(_simplify(False, [_normalize(c, False, None)
+                                      for c in checks], None),
+                    adaptive, concurrent)
+
+
+def compile_any(*checks: types.Check, adaptive: bool = False,
+                concurrent: bool = False) -> Program:
+    """Compile `checks` into a program that passes if any of them pass.
+
+    """
+    return _compile(_simplify(True, [_normalize(c, False, None)
+                                     for c in checks],
+                              _modifiers.Any(*checks)), adaptive, concurrent)
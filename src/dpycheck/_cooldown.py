@@ -0,0 +1,451 @@
+"""Cooldown checks.
+
+:copyright: (c) 2022-present Tanner B. Corcoran
+:license: MIT, see LICENSE for more details.
+"""
+
+__author__ = "Tanner B. Corcoran"
+__license__ = "MIT License"
+__copyright__ = "Copyright (c) 2022-present Tanner B. Corcoran"
+
+
+from . import types
+from . import exceptions
+from . import utils
+from . import _shm
+import concurrent.futures
+import asyncio
+import hashlib
+import sqlite3
+import typing
+import math
+import time
+import os
+
+
+class BucketTable:
+    """Token buckets of `rate` tokens refilling over `per` seconds, one per
+    key.
+
+    Each bucket is stored as a single float, the time at which it will be
+    full again (the generic cell rate algorithm), so a table holds one dict
+    entry per key. This takes less memory per key, and is faster, than
+    slotted bucket objects or an array of floats indexed through a dict (see
+    `benchmarks/bench_cooldown.py`). Full buckets are indistinguishable from missing ones, so
+    they are dropped by a sweep whenever the table has doubled in size since
+    the last one.
+
+    """
+    __slots__ = ("rate", "per", "_interval", "_tolerance", "_full_at",
+                 "_sweep_at")
+
+    def __init__(self, rate: int, per: float) -> None:
+        if rate < 1 or per <= 0:
+            raise ValueError("rate must be at least 1 and per positive")
+        self.rate = rate
+        self.per = per
+        # the time one token takes to refill, and how far ahead of now a
+        # bucket may be full again while still holding a token
+        self._interval = per / rate
+        self._tolerance = per - self._interval
+        self._full_at: dict[typing.Hashable, float] = {}
+        self._sweep_at = 1024
+
+    def __len__(self) -> int:
+        return len(self._full_at)
+
+    def acquire(self, key: typing.Hashable, now: float | None = None
+                ) -> float:
+        """Take a token from the bucket of `key`. Returns 0.0 if one was
+        taken, otherwise the number of seconds until one can be.
+
+        """
+        if now is None:
+            now = time.monotonic()
+        full_at = self._full_at.get(key, now)
+        if full_at < now:
+            full_at = now
+        retry_after = full_at - now - self._tolerance
+        if retry_after > 0:
+            return retry_after
+        self._full_at[key] = full_at + self._interval
+        if len(self._full_at) >= self._sweep_at:
+            self.sweep(now)
+        return 0.0
+
+    def sweep(self, now: float | None = None) -> int:
+        """Drop the buckets that are full. Returns the number dropped.
+
+        """
+        if now is None:
+            now = time.monotonic()
+        size = len(self._full_at)
+        self._full_at = {k: t for k, t in self._full_at.items() if t > now}
+        self._sweep_at = max(1024, 2 * len(self._full_at))
+        return size - len(self._full_at)
+
+    def reset(self, key: typing.Hashable | None = None) -> None:
+        """Refill the bucket of `key`, or every bucket if `key` is None.
+
+        """
+        if key is None:
+            self._full_at.clear()
+        else:
+            self._full_at.pop(key, None)
+
+
+class CooldownBackend:
+    """Where the buckets of `cooldown` checks are kept, so that they can be
+    shared between processes.
+
+    `buckets` returns an object with the `acquire` and `reset` methods of
+    `BucketTable` for the cooldown called `name`. Buckets whose `acquire` may
+    block set `is_sync` to False and also provide an awaitable
+    `acquire_async`, which `cooldown` uses instead. Bucket keys are
+    identified by their `repr`, so custom keys must have one that is the same
+    in every process.
+
+    """
+    def buckets(self, name: str, rate: int, per: float) -> typing.Any:
+        raise NotImplementedError
+
+
+class SQLiteBackend(CooldownBackend):
+    """Buckets kept in an SQLite database in WAL mode, shared by every process
+    opening the same file.
+
+    Each acquisition is a single upsert, committed on its own. With
+    `synchronous=NORMAL`, a commit is appended to the write-ahead log without
+    waiting for the disk; the log is only synced when it is checkpointed.
+    Every use of the database runs on a thread of the backend's own, so that
+    `cooldown` can wait for an acquisition blocked by another process's write
+    without blocking the event loop. The other methods wait for that thread.
+
+    """
+    def __init__(self, path: str | os.PathLike, /, *, timeout: float = 0.5,
+                 sweep_every: int = 4096) -> None:
+        """
+        Arguments
+        ---------
+        path : str | PathLike
+            The path of the database file.
+        timeout : float, default=0.5
+            The number of seconds to wait for another process to finish
+            writing, after which the acquisition raises
+            `sqlite3.OperationalError`.
+        sweep_every : int, default=4096
+            The number of acquisitions between deletions of full buckets.
+
+        """
+        self.sweep_every = sweep_every
+        self._acquisitions = 0
+        # one thread, the only one using the connection, so that
+        # acquisitions are written in the order they were made
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            1, thread_name_prefix="dpycheck-sqlite")
+        self._db = self._run(self._connect, os.fspath(path), timeout)
+
+    @staticmethod
+    def _connect(path: str, timeout: float) -> sqlite3.Connection:
+        db = sqlite3.connect(path, timeout=timeout, isolation_level=None,
+                             check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("CREATE TABLE IF NOT EXISTS cooldowns (name TEXT NOT NULL, "
+                   "key TEXT NOT NULL, full_at REAL NOT NULL, "
+                   "PRIMARY KEY (name, key)) WITHOUT ROWID")
+        return db
+
+    def _run(self, func: typing.Callable[..., typing.Any], *args: typing.Any
+             ) -> typing.Any:
+        # run `func` on the backend's thread and wait for it; must not be
+        # called from that thread
+        return self._executor.submit(func, *args).result()
+
+    def buckets(self, name: str, rate: int, per: float) -> "_SQLiteBuckets":
+        return _SQLiteBuckets(self, name, rate, per)
+
+    def sweep(self, now: float | None = None) -> int:
+        """Delete the buckets that are full. Returns the number deleted.
+
+        """
+        return self._run(self._sweep, time.time() if now is None else now)
+
+    def _sweep(self, now: float) -> int:
+        return self._db.execute("DELETE FROM cooldowns WHERE full_at <= ?",
+                                (now,)).rowcount
+
+    def close(self) -> None:
+        self._run(self._db.close)
+        self._executor.shutdown()
+
+
+class _SQLiteBuckets:
+    __slots__ = ("_backend", "_name", "_interval", "_tolerance")
+    is_sync = False
+
+    # take a token if the bucket is not empty, returning nothing otherwise
+    _ACQUIRE = ("INSERT INTO cooldowns (name, key, full_at) "
+                "VALUES (:name, :key, :now + :interval) "
+                "ON CONFLICT (name, key) DO UPDATE "
+                "SET full_at = max(full_at, :now) + :interval "
+                "WHERE max(full_at, :now) - :now <= :tolerance "
+                "RETURNING full_at")
+
+    def __init__(self, backend: SQLiteBackend, name: str, rate: int,
+                 per: float) -> None:
+        self._backend = backend
+        self._name = name
+        self._interval = per / rate
+        self._tolerance = per - self._interval
+
+    def acquire(self, key: typing.Hashable, now: float | None = None
+                ) -> float:
+        return self._backend._run(self._acquire, key, now)
+
+    async def acquire_async(self, key: typing.Hashable,
+                            now: float | None = None) -> float:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._backend._executor, self._acquire, key, now)
+
+    def _acquire(self, key: typing.Hashable, now: float | None) -> float:
+        if now is None:
+            now = time.time()
+        backend = self._backend
+        params = {"name": self._name, "key": repr(key), "now": now,
+                  "interval": self._interval, "tolerance": self._tolerance}
+        while True:
+            if backend._db.execute(self._ACQUIRE,
+                                   params).fetchone() is not None:
+                backend._acquisitions += 1
+                if backend._acquisitions % backend.sweep_every == 0:
+                    backend._sweep(now)
+                return 0.0
+            row = backend._db.execute(
+                "SELECT full_at FROM cooldowns WHERE name = ? AND key = ?",
+                (self._name, params["key"])).fetchone()
+            if row is not None:
+                # the bucket may have changed since; it is still empty for at
+                # least as long as it was a moment ago
+                return (max(row[0] - now - self._tolerance, 0.0)
+                        or math.ulp(now))
+            # another process deleted the bucket since the upsert; the next
+            # one creates it
+
+    def reset(self, key: typing.Hashable | None = None) -> None:
+        self._backend._run(self._reset, key)
+
+    def _reset(self, key: typing.Hashable | None) -> None:
+        if key is None:
+            self._backend._db.execute("DELETE FROM cooldowns WHERE name = ?",
+                                      (self._name,))
+        else:
+            self._backend._db.execute(
+                "DELETE FROM cooldowns WHERE name = ? AND key = ?",
+                (self._name, repr(key)))
+
+
+class SharedMemoryBackend(CooldownBackend):
+    """Buckets kept in a fixed-size hash table in shared memory, shared by
+    every process on the host opening the same `name`. Requires a POSIX
+    system.
+
+    Each slot holds a 64-bit hash of a cooldown name and bucket key, and the
+    time the bucket will be full. Slots of full buckets are reused. If all
+    `probes` slots a key may occupy are in use, the bucket closest to full is
+    evicted. The segment outlives the processes using it until `unlink` is
+    called.
+
+    """
+    def __init__(self, name: str = "dpycheck-cooldowns", /, *,
+                 slots: int = 1 << 20, probes: int = 32) -> None:
+        """
+        Arguments
+        ---------
+        name : str, default="dpycheck-cooldowns"
+            The name of the shared memory segment.
+        slots : int, default=1 << 20
+            The number of buckets the table can hold, at 16 bytes each. Must
+            be the same in every process.
+        probes : int, default=32
+            The number of slots searched for a key.
+
+        """
+        self._lock = _shm.HostLock(name)
+        self.name = name
+        self.slots = slots
+        self.probes = min(probes, slots)
+        self._shm = _shm.open_segment(name, slots * 16)
+        if self._shm.size < slots * 16:
+            raise ValueError(f"shared memory {name!r} already exists with "
+                             f"fewer than {slots} slots")
+        # slot i is hashes[2 * i] and times[2 * i + 1]
+        self._hashes = self._shm.buf.cast("Q")
+        self._times = self._shm.buf.cast("d")
+
+    def buckets(self, name: str, rate: int, per: float) -> "_SharedBuckets":
+        return _SharedBuckets(self, name, rate, per)
+
+    def _find(self, hash: int, now: float) -> tuple[int, float]:
+        # returns the slot of `hash` and the time its bucket is full; must be
+        # called with the lock held
+        hashes = self._hashes
+        times = self._times
+        slot = hash % self.slots
+        reusable = -1
+        evict = slot
+        for _ in range(self.probes):
+            h = hashes[2 * slot]
+            if h == hash:
+                return slot, times[2 * slot + 1]
+            if h == 0:
+                return (slot if reusable < 0 else reusable), now
+            t = times[2 * slot + 1]
+            if t <= now:
+                if reusable < 0:
+                    reusable = slot
+            elif t < times[2 * evict + 1]:
+                evict = slot
+            slot = (slot + 1) % self.slots
+        return (evict if reusable < 0 else reusable), now
+
+    def close(self) -> None:
+        self._hashes.release()
+        self._times.release()
+        self._shm.close()
+        self._lock.close()
+
+    def unlink(self) -> None:
+        """Remove the shared memory segment once every process has closed
+        it.
+
+        """
+        _shm.unlink_segment(self._shm)
+        self._lock.unlink()
+
+
+class _SharedBuckets:
+    __slots__ = ("_backend", "_name", "_interval", "_tolerance")
+
+    def __init__(self, backend: SharedMemoryBackend, name: str, rate: int,
+                 per: float) -> None:
+        self._backend = backend
+        self._name = name
+        self._interval = per / rate
+        self._tolerance = per - self._interval
+
+    def _hash(self, key: typing.Hashable) -> int:
+        digest = hashlib.blake2b(repr((self._name, key)).encode(),
+                                 digest_size=8).digest()
+        # 0 marks an empty slot
+        return int.from_bytes(digest, "little") or 1
+
+    def acquire(self, key: typing.Hashable, now: float | None = None
+                ) -> float:
+        hash = self._hash(key)
+        backend = self._backend
+        with backend._lock:
+            if now is None:
+                now = time.time()
+            slot, full_at = backend._find(hash, now)
+            if full_at < now:
+                full_at = now
+            retry_after = full_at - now - self._tolerance
+            if retry_after > 0:
+                return retry_after
+            backend._hashes[2 * slot] = hash
+            backend._times[2 * slot + 1] = full_at + self._interval
+            return 0.0
+
+    def reset(self, key: typing.Hashable | None = None) -> None:
+        if key is None:
+            raise ValueError("buckets in shared memory can only be reset by "
+                             "key")
+        hash = self._hash(key)
+        backend = self._backend
+        with backend._lock:
+            slot, _ = backend._find(hash, time.time())
+            if backend._hashes[2 * slot] == hash:
+                backend._times[2 * slot + 1] = 0.0
+
+
+def _user_key(utx: types.utx) -> int:
+    return utils.get_author(utx).id
+
+def _member_key(utx: types.utx) -> tuple[int | None, int]:
+    guild = utx.guild
+    return (guild.id if guild is not None else None,
+            utils.get_author(utx).id)
+
+def _channel_key(utx: types.utx) -> int:
+    return utx.channel.id
+
+def _guild_key(utx: types.utx) -> int:
+    # outside of guilds, each user has their own bucket
+    guild = utx.guild
+    return guild.id if guild is not None else utils.get_author(utx).id
+
+_KEYS = {
+    "user": _user_key,
+    "member": _member_key,
+    "channel": _channel_key,
+    "guild": _guild_key
+}
+
+
+class cooldown(types.Check):
+    is_sync = True
+    is_stateful = True
+
+    def __init__(self, rate: int, per: float, /,
+                 key: typing.Literal["user", "member", "channel", "guild"]
+                      | typing.Callable[[types.utx], typing.Hashable] = "user",
+                 *, backend: CooldownBackend | None = None,
+                 name: str | None = None) -> None:
+        """
+        Arguments
+        ---------
+        rate : int
+            The number of times the check may pass within `per` seconds.
+        per : float
+            The number of seconds it takes for all `rate` uses to recover.
+        key : str | Callable, default="user"
+            What each bucket is shared by: "user", "member" (a user within a
+            guild), "channel" or "guild", or a function returning the bucket
+            key of an invocation.
+        backend : CooldownBackend, default=None
+            Where to keep the buckets. By default, they are kept in this
+            process.
+        name : str, default=None
+            The name identifying this cooldown's buckets in `backend`, which
+            must be the same in every process. Required with `backend`.
+
+        Every evaluation that passes uses up a token, so place the check after
+        the checks it should only count invocations of.
+
+        """
+        self._exc = exceptions.RateLimited
+        self._args: tuple[float, int, float] = (0.0, rate, per)
+        self._key = _KEYS[key] if isinstance(key, str) else key
+        if backend is None:
+            self.buckets = BucketTable(rate, per)
+        elif name is None:
+            raise TypeError("cooldowns with a backend require a name")
+        else:
+            self.buckets = backend.buckets(name, rate, per)
+        self.is_sync = getattr(self.buckets, "is_sync", True)
+
+    def _result(self, retry_after: float) -> types.CheckResult:
+        if not retry_after:
+            return self.result(True)
+        return types.CheckResult(False, self._exc, (retry_after,)
+                                 + self._args[1:])
+
+    def sync_predicate(self, utx: types.utx, /) -> types.CheckResult:
+        return self._result(self.buckets.acquire(self._key(utx)))
+
+    async def predicate(self, utx: types.utx, /) -> types.CheckResult:
+        if self.is_sync:
+            return self._result(self.buckets.acquire(self._key(utx)))
+        return self._result(
+            await self.buckets.acquire_async(self._key(utx)))
@@ -15,12 +15,24 @@ from . import types
 from . import exceptions
 from . import constants
 from . import utils
+from . import _trace
+import collections
 import traceback
+import functools
 import datetime
 import textwrap
+import hashlib
+import logging
 import discord
 import asyncio
 import typing
+import time
+import sys
+import io
+import os
+
+
+_log = logging.getLogger(__name__)
 
 
 class Formatter:
@@ -160,12 +172,33 @@ class Formatter:
     def IsGuildOwner(self, guild_id: int | None) -> str:
         return "This command may not be used by the guild owner."
     
-    def UsernameDoesNotContain(self, substr: str | None) -> str:
+    def UsernameDoesNotContain(self, substr: str | None, *substrs: str) -> str:
+        if substrs:
+            return f"Your username must contain one of: {', '.join(repr(s) for s in (substr,) + substrs)}."
         return f"Your username must contain '{substr}'."
     
-    def UsernameContains(self, substr: str | None) -> str:
+    def UsernameContains(self, substr: str | None, *substrs: str) -> str:
+        if substrs:
+            return f"Your username must not contain any of: {', '.join(repr(s) for s in (substr,) + substrs)}."
         return f"Your username must not contain '{substr}'."
     
+    def NotInIdFile(self, path: str, target: str) -> str:
+        if target == "user":
+            return "You are not in this command's whitelist."
+        if target == "guild":
+            return "This command may not be used within this guild."
+        return "This command may not be used within this channel."
+    
+    def InIdFile(self, path: str, target: str) -> str:
+        if target == "user":
+            return "You are in this command's blacklist."
+        if target == "guild":
+            return "This command may not be used within this guild."
+        return "This command may not be used within this channel."
+    
+    def RateLimited(self, retry_after: float, rate: int, per: float) -> str:
+        return f"You are using this command too often. Try again in {retry_after:.1f} seconds."
+    
     def MembershipLT(self, seconds: int,
                      alt_exc: commands.CheckFailure = None,
                      alt_seconds: int = None) -> str:
@@ -193,26 +226,8 @@ class Formatter:
     def __missing__(self, utx: types.utx, exc: Exception
                     ) -> tuple[discord.Embed, discord.Embed, list[discord.Attachment
                                                                   | discord.Embed]]:
-        error_embed = discord.Embed(description="**An unknown error has occured. The developers "
-                                                "have been notified and will attempt to fix the "
-                                                "issue as soon as possible. Thank you for your "
-                                                "patience.**", color=constants.EMBED_COLOR__NEG)
-
-        # get exc info
-        author = utils.get_author(utx)
-        info = textwrap.dedent(f"""
-            - ctx.author.id
-            + {author.id}
-            - ctx.author.name
-            + {author.name}
-            - ctx.author.display_name
-            + {author.display_name}
-            - ctx.command.callback.__name__
-            + {utx.command.callback.__name__}
-            - ctx.command.qualified_name
-            + {utx.command.qualified_name}
-            - invokation timestamp
-            + {datetime.datetime.utcnow().isoformat(timespec='seconds')}"""[1:])
+        error_embed = self.unknown_error()
+        info = self._get_info(utx)
         tb = "".join(traceback.format_exception(exc))
 
         # ensure we don't break the 4096 character limit, and sacrifice
@@ -225,6 +240,11 @@ class Formatter:
         info_embed = discord.Embed(description=content, color=constants.EMBED_COLOR__NEG)
         data = []
 
+        # add the trace of the check tree, if the invocation was traced
+        trace = _trace.get_trace(exc)
+        if trace is not None:
+            data.append(self.trace(trace))
+
         # add additional information
         addl: list = getattr(exc, "__dpy_check_additional_arguments__", None)
         if addl is not None:
@@ -243,13 +263,141 @@ class Formatter:
 
         return error_embed, info_embed, data
 
+    def unknown_error(self) -> discord.Embed:
+        """The embed sent to the user when an unknown error occurs. Also sent in place of
+        `__missing__` for repeats of an error that are folded into a digest.
+
+        """
+        return discord.Embed(description="**An unknown error has occured. The developers "
+                                         "have been notified and will attempt to fix the "
+                                         "issue as soon as possible. Thank you for your "
+                                         "patience.**", color=constants.EMBED_COLOR__NEG)
+
+    def __digest__(self, incidents: list["Incident"], window: float) -> list[discord.Embed]:
+        """The embeds of a digest of repeated errors, one per incident.
+
+        """
+        embeds = []
+        for incident in incidents:
+            commands_ = sorted(incident.commands.items(), key=lambda item: -item[1])
+            lines = [f"- {name}: {count}" for name, count in commands_[:10]]
+            if len(commands_) > 10:
+                lines.append(f"- ... and {len(commands_) - 10} more")
+            description = (f"Occurred **{incident.count}** times from **{len(incident.users)}** "
+                           f"users since the last digest, each within {window:g} seconds of "
+                           f"the one before ({incident.total} times since "
+                           f"<t:{int(incident.first_seen.timestamp())}:R>).\n"
+                           f"```\n{incident.message[:1000]}```")
+            embed = discord.Embed(title=f"{incident.exc_name} ({incident.fingerprint})",
+                                  description=description, color=constants.EMBED_COLOR__NEG)
+            embed.add_field(name="Commands", value="\n".join(lines) or "-")
+            embeds.append(embed)
+        return embeds
+
+    def _get_info(self, utx: types.utx) -> str:
+        author = utils.get_author(utx)
+        return textwrap.dedent(f"""
+            - ctx.author.id
+            + {author.id}
+            - ctx.author.name
+            + {author.name}
+            - ctx.author.display_name
+            + {author.display_name}
+            - ctx.command.callback.__name__
+            + {utx.command.callback.__name__}
+            - ctx.command.qualified_name
+            + {utx.command.qualified_name}
+            - invokation timestamp
+            + {datetime.datetime.utcnow().isoformat(timespec='seconds')}"""[1:])
+
+    def trace(self, trace: _trace.Trace) -> discord.Embed:
+        """An embed showing the trace of a check tree, for developer reports.
+
+        """
+        text = trace.format()
+        # the trace loses its last lines if it is too long; `12` is the
+        # number of characters in "```\n```" and "\n..."
+        if len(text) + 12 > 4096:
+            text = f"{text[:4096 - 12]}\n..."
+        return discord.Embed(title="Check trace", description=f"```\n{text}```",
+                             color=constants.EMBED_COLOR__NEG)
+
+    def __traced__(self, utx: types.utx, exc: commands.CheckFailure
+                   | app_commands.CheckFailure, trace: _trace.Trace
+                   ) -> tuple[discord.Embed, list[discord.Embed]]:
+        """The developer report of a traced check failure: an info embed and
+        the embed of the trace.
+
+        """
+        info = (f"{self._get_info(utx)}\n- check failure\n"
+                f"+ {exceptions.get_exc_name(exc)}")
+        info_embed = discord.Embed(description=f"```diff\n{info}```",
+                                   color=constants.EMBED_COLOR__NEG)
+        return info_embed, [self.trace(trace)]
+
+
+@functools.lru_cache(maxsize=4096)
+def _normalize_path(path: str) -> str:
+    # absolute paths differ between hosts and deployments, so frames are
+    # located relative to the import root that contains them
+    root = ""
+    for entry in sys.path:
+        entry = os.path.join(os.path.abspath(entry or "."), "")
+        if path.startswith(entry) and len(entry) > len(root):
+            root = entry
+    return path[len(root):] if root else os.path.basename(path)
+
+
+class Incident:
+    """The occurrences of one error fingerprint since it was last reported or
+    included in a digest.
+
+    """
+    __slots__ = ("fingerprint", "exc_name", "message", "first_seen", "last_seen",
+                 "count", "repeats", "total", "commands", "users")
+
+    def __init__(self, fingerprint: str, exc: BaseException, utx: types.utx) -> None:
+        self.fingerprint = fingerprint
+        self.exc_name = exc.__class__.__name__
+        self.message = str(exc)
+        self.first_seen = datetime.datetime.now(datetime.timezone.utc)
+        # occurrences not yet in a digest, including the first, which was reported on its own
+        self.count = 0
+        # the repeats among them; a digest is only sent for incidents that repeated
+        self.repeats = 0
+        self.total = 0
+        self.commands: collections.Counter[str] = collections.Counter()
+        self.users: set[int] = set()
+        self._record(utx)
+
+    def _record(self, utx: types.utx) -> None:
+        # monotonic
+        self.last_seen = time.monotonic()
+        self.count += 1
+        self.total += 1
+        command = utx.command
+        self.commands[command.qualified_name if command is not None else "<unknown>"] += 1
+        self.users.add(utils.get_author(utx).id)
+
+    def add(self, utx: types.utx) -> None:
+        self._record(utx)
+        self.repeats += 1
+
+    def reset(self) -> None:
+        self.count = 0
+        self.repeats = 0
+        self.commands.clear()
+        self.users.clear()
+
 
 class ErrorHandler:
     """A class used to handle errors raised by `...Check`.
     
     """
     def __init__(self, ids: typing.Iterable[typing.Iterable[int]],
-                 attach_to: object = None, formatter: Formatter = ...) -> None:
+                 attach_to: object = None, formatter: Formatter = ..., *,
+                 report_traces: bool = False, dedup_window: float | None = None,
+                 max_fingerprints: int = 1024) -> None:
         """
         Arguments
         ---------
@@ -263,12 +411,31 @@ class ErrorHandler:
         formatter : Formatter
             If defined, the given formatter instance will be used. Otherwise, a new instance will
             be created.
+        report_traces : bool, default=False
+            If True, check failures of invocations traced by a `Tracer` are also reported to the
+            channels in `ids`, with the trace of the check tree. Traces of unknown errors are
+            always included in their report.
+        dedup_window : float, default=None
+            If defined, unknown errors are fingerprinted by their type and the locations of their
+            traceback. The first occurrence of an error is reported immediately, and repeats
+            within `dedup_window` seconds of the previous occurrence are counted instead, and
+            reported every `dedup_window` seconds in a digest of their count, commands and users.
+        max_fingerprints : int, default=1024
+            The number of recent fingerprints to remember. The least recently seen is forgotten
+            first, and its repeats are still included in the next digest.
         
         """
         if attach_to:
             setattr(attach_to, "__dpy_check__", self)
         self.ids = ids
         self.formatter = formatter if formatter != ... else Formatter()
+        self.report_traces = report_traces
+        self.dedup_window = dedup_window
+        self.max_fingerprints = max_fingerprints
+        self._incidents: collections.OrderedDict[str, Incident] = collections.OrderedDict()
+        # forgotten incidents whose repeats are not yet in a digest
+        self._evicted: list[Incident] = []
+        self._digest_task: asyncio.Task | None = None
 
     @staticmethod
     def set_additional(exc: Exception,
@@ -291,6 +458,20 @@ class ErrorHandler:
             return setattr(exc, "__dpy_check_additional_arguments__", list(additional))
         addl.extend(additional)
 
+    @staticmethod
+    def fingerprint(exc: BaseException) -> str:
+        """A fingerprint of `exc` made of its type and the locations (file, function and line)
+        of its traceback, with paths relative to their import root, so that it is the same for
+        every occurrence of an error and on every host.
+
+        """
+        cls = exc.__class__
+        parts = [f"{cls.__module__}.{cls.__qualname__}"]
+        for frame, lineno in traceback.walk_tb(exc.__traceback__):
+            code = frame.f_code
+            parts.append(f"{_normalize_path(code.co_filename)}:{code.co_name}:{lineno}")
+        return hashlib.blake2b("\n".join(parts).encode(), digest_size=8).hexdigest()
+
     @staticmethod
     def get(obj: object, /, ignore: bool = False) -> "ErrorHandler":
         """Acquire the ErrorHandler attached to `obj`.
@@ -378,42 +559,181 @@ class ErrorHandler:
         
         # non-check exception
         if not isinstance(exc, (commands.CheckFailure, app_commands.CheckFailure)):
+            # repeats of a recently reported error are only counted for the next digest
+            if self.dedup_window is not None and self._fold(utx, exc.original):
+                return await sender(embed=self.formatter.unknown_error())
+
             error_embed, info_embed, addl = self.formatter.__missing__(utx, exc.original)
-            num_addl = len(addl)
             
             # error embed (sent to user)
             await sender(embed=error_embed)
 
             # info (sent to error channel)
-            client = utils.get_client(utx)
-            for channel_id, *mention_ids in self.ids:
-                channel = client.get_channel(channel_id)
-
-                # mentions (if included)
-                if mention_ids:
-                    await channel.send(f"<@{'> <@'.join(str(id) for id in mention_ids)}>")
-
-                # main info embed
-                await channel.send(embed=info_embed)
-
-                # additional information
-                for i, value in enumerate(addl):
-                    if isinstance(value, discord.Embed):
-                        value.title = f"Additional information {i+1} of {num_addl}"
-                        await channel.send(embed=value)
-                    elif isinstance(value, discord.Attachment):
-                        await channel.send(f"**Additional information {i+1} of {num_addl}**",
-                                           file=await value.to_file())
-                    await asyncio.sleep(0.1) # so as to not overload the API
-            return
+            return await self._report(utils.get_client(utx), info_embed, addl)
         
         # check exception with content func present in formatter
+        sent = False
         content_func = getattr(self.formatter, exc_name, None)
         if content_func:
             try:
-                return await send(content_func(*exc.args[0]))
+                await send(content_func(*exc.args[0]))
+                sent = True
             except Exception:
                 pass
         
         # check exception with no content func present in formatter
-        return await send(self.formatter.Generic())
+        if not sent:
+            await send(self.formatter.Generic())
+
+        # traced check failure (sent to error channel)
+        trace = _trace.get_trace(exc)
+        if self.report_traces and trace is not None:
+            info_embed, addl = self.formatter.__traced__(utx, exc, trace)
+            await self._report(utils.get_client(utx), info_embed, addl)
+
+    async def _report(self, client: commands.Bot | discord.Client,
+                      info_embed: discord.Embed,
+                      addl: list[discord.Embed | discord.Attachment]) -> None:
+        """Send a developer report to every channel in `ids`, concurrently.
+        Each report is packed into as few messages as possible; messages to
+        the same channel are sent in order, paced by discord.py's rate limit
+        handling.
+
+        """
+        num_addl = len(addl)
+        embeds = [info_embed]
+        attachments = []
+        labels = []
+        for i, value in enumerate(addl):
+            title = f"Additional information {i+1} of {num_addl}"
+            if isinstance(value, discord.Embed):
+                value.title = _truncate(f"{title}: {value.title}" if value.title else title,
+                                        constants.EMBED_TITLE_CHARS)
+                embeds.append(value)
+            elif isinstance(value, discord.Attachment):
+                attachments.append(value)
+                labels.append(f"{title}: {value.filename}")
+        await self._deliver(client, embeds, attachments, labels)
+
+    async def _deliver(self, client: commands.Bot | discord.Client,
+                       embeds: list[discord.Embed],
+                       attachments: list[discord.Attachment] = (),
+                       labels: list[str] = (), *, mention: bool = True) -> None:
+        # attachments are downloaded once; each channel gets its own files,
+        # as a file is consumed when sent
+        data = await asyncio.gather(*(a.read() for a in attachments))
+
+        async def send(channel_id: int, *mention_ids: int) -> None:
+            channel = client.get_channel(channel_id)
+            files = [discord.File(io.BytesIO(d), filename=a.filename)
+                     for a, d in zip(attachments, data)]
+            content = (f"<@{'> <@'.join(str(id) for id in mention_ids)}>"
+                       if mention and mention_ids else None)
+            for message in _pack(content, embeds, files, labels):
+                await channel.send(**message)
+
+        results = await asyncio.gather(*(send(*ids) for ids in self.ids),
+                                       return_exceptions=True)
+        # one failing channel does not stop the reports to the others
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    def _fold(self, utx: types.utx, exc: BaseException) -> bool:
+        """Record an occurrence of `exc`, returning True if it repeats an error seen within
+        `dedup_window` seconds, which is then left for the next digest.
+
+        """
+        fingerprint = self.fingerprint(exc)
+        incidents = self._incidents
+        incident = incidents.get(fingerprint)
+        if (incident is None
+                or time.monotonic() - incident.last_seen > self.dedup_window):
+            incidents[fingerprint] = Incident(fingerprint, exc, utx)
+            incidents.move_to_end(fingerprint)
+            while len(incidents) > self.max_fingerprints:
+                _, evicted = incidents.popitem(last=False)
+                if evicted.repeats:
+                    self._evicted.append(evicted)
+            return False
+        incident.add(utx)
+        incidents.move_to_end(fingerprint)
+        if self._digest_task is None or self._digest_task.done():
+            self._digest_task = asyncio.get_running_loop().create_task(
+                self._digest(utils.get_client(utx)))
+        return True
+
+    async def _digest(self, client: commands.Bot | discord.Client) -> None:
+        # runs while errors keep repeating, sending a digest every window
+        while True:
+            await asyncio.sleep(self.dedup_window)
+            if not self._evicted and not any(i.repeats for i in self._incidents.values()):
+                return
+            # a failing digest must not stop the next ones
+            try:
+                await self.send_digest(client)
+            except Exception:
+                _log.exception("Failed to send the error digest")
+
+    async def send_digest(self, client: commands.Bot | discord.Client) -> None:
+        """Send the digest of the errors that repeated since the last one now, if there are
+        any. Digests are otherwise sent every `dedup_window` seconds while errors repeat.
+
+        """
+        pending = self._evicted + [i for i in self._incidents.values() if i.repeats]
+        self._evicted = []
+        if not pending:
+            return
+        # the counts are lost rather than retried, so that a failing formatter or channel
+        # cannot keep the digest growing
+        try:
+            embeds = self.formatter.__digest__(pending, self.dedup_window)
+        finally:
+            for incident in pending:
+                incident.reset()
+        try:
+            await self._deliver(client, embeds, mention=False)
+        except discord.HTTPException:
+            pass
+
+
+def _truncate(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def _pack(content: str | None, embeds: list[discord.Embed],
+          files: list[discord.File], labels: list[str] = ()
+          ) -> list[dict[str, typing.Any]]:
+    """The keyword arguments of the fewest messages that hold `content`,
+    `embeds` and `files` in order, within Discord's per-message limits. The
+    label of each file, if given, is a line of its message's content.
+
+    """
+    messages = [{"content": content, "embeds": [], "files": []}]
+    size = 0
+    for embed in embeds:
+        message = messages[-1]
+        if message["embeds"] and (
+                len(message["embeds"]) == constants.MESSAGE_EMBEDS
+                or size + len(embed) > constants.MESSAGE_EMBED_CHARS):
+            message = {"content": None, "embeds": [], "files": []}
+            messages.append(message)
+            size = 0
+        message["embeds"].append(embed)
+        size += len(embed)
+    for i, file in enumerate(files):
+        message = messages[-1]
+        label = _truncate(labels[i], constants.MESSAGE_CHARS) if labels else None
+        text = message["content"]
+        if label is not None:
+            text = f"{text}\n{label}" if text else label
+        # a label only starts a new message if it does not fit in this one's
+        # content, which may already hold the mentions
+        if (len(message["files"]) == constants.MESSAGE_FILES
+                or len(text or "") > constants.MESSAGE_CHARS):
+            message = {"content": None, "embeds": [], "files": []}
+            messages.append(message)
+            text = label
+        message["content"] = text
+        message["files"].append(file)
+    return messages
@@ -13,57 +13,68 @@ from . import types
 from . import exceptions
 from . import utils
 import discord
+import typing
 
 
 def _predicate(self: types.Check, utx: types.utx, guild_id: int | None,
-               user_id: int, perms: dict[str, discord.Permissions]
-               ) -> bool:
+               user_id: int) -> types.CheckResult:
     client = utils.get_client(utx)
     if guild_id:
         guild = client.get_guild(guild_id)
         if not guild:
-            return False
+            return self.result(False)
         member = guild.get_member(user_id)
         if not member:
-            return False
+            return self.result(False)
         _perms = member.guild_permissions
     else:
         if not utx.guild:
-            self._args = (guild_id,)
-            return False
+            return self.result(False)
         _perms = utx.guild.get_member(user_id).guild_permissions
-    missing = [p for p, v in perms.items() if getattr(_perms, p) != v]
-    if not missing:
-        return True
-    self._args = tuple([guild_id] + missing)
-    return False
+    value = _perms.value
+    if value & self._mask == self._expected:
+        return self.result(True)
+    missing = utils.missing_perms(self._perms, value)
+    return types.CheckResult(False, self._exc, tuple([guild_id] + missing))
 
 
 class user_has_guild_perms(types.Check):
+    is_sync = True
+
     def __init__(self, guild_id: int = None, **perms: bool) -> None:
         invalid = set(perms) - set(discord.Permissions.VALID_FLAGS)
         if invalid:
             raise TypeError(f"Invalid permission(s): {', '.join(invalid)}")
         self._exc = exceptions.UserMissingGuildPerms
-        self._args: tuple[int | None | discord.Permissions, ...] = ()
+        self._args: tuple[int | None | discord.Permissions, ...] = (guild_id,)
         self._guild_id = guild_id
         self._perms = perms
+        self._mask, self._expected = utils.compile_perms(perms)
+        self._fingerprint = (self._mask, self._expected)
     
-    async def predicate(self, utx: types.utx, /) -> bool:
+    def sync_predicate(self, utx: types.utx, /) -> types.CheckResult:
         return _predicate(self, utx, self._guild_id,
-                          utils.get_author(utx).id, self._perms)
+                          utils.get_author(utx).id)
+
+    def bulk_predicate(self, members: typing.Any) -> typing.Any:
+        members.check_guild(self._guild_id)
+        return members.has_guild_perms(self._mask, self._expected)
 
 
 class bot_has_guild_perms(types.Check):
+    is_sync = True
+
     def __init__(self, guild_id: int = None, **perms: bool) -> None:
         invalid = set(perms) - set(discord.Permissions.VALID_FLAGS)
         if invalid:
             raise TypeError(f"Invalid permission(s): {', '.join(invalid)}")
         self._exc = exceptions.BotMissingGuildPerms
-        self._args: tuple[int | None | discord.Permissions, ...] = ()
+        self._args: tuple[int | None | discord.Permissions, ...] = (guild_id,)
         self._guild_id = guild_id
         self._perms: dict[str, bool] = perms
+        self._mask, self._expected = utils.compile_perms(perms)
+        self._fingerprint = (self._mask, self._expected)
     
-    async def predicate(self, utx: types.utx, /) -> bool:
+    def sync_predicate(self, utx: types.utx, /) -> types.CheckResult:
         return _predicate(self, utx, self._guild_id,
-                          utils.get_me(utx).id, self._perms)
+                          utils.get_me(utx).id)
@@ -0,0 +1,426 @@
+"""Latency histograms and outcome counters of checks and commands.
+
+:copyright: (c) 2022-present Tanner B. Corcoran
+:license: MIT, see LICENSE for more details.
+"""
+
+__author__ = "Tanner B. Corcoran"
+__license__ = "MIT License"
+__copyright__ = "Copyright (c) 2022-present Tanner B. Corcoran"
+
+
+from . import types
+from . import exceptions
+from . import _modifiers
+from . import _compiler
+import asyncio
+import typing
+import time
+
+
+# the upper bounds of the histogram buckets in seconds, doubling from 1µs to
+# about 4s; a last bucket holds everything slower
+BUCKETS: tuple[float, ...] = tuple(2 ** i / 1e6 for i in range(23))
+_LAST = len(BUCKETS)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Hook = typing.Callable[[str, str, float, str, type[BaseException] | None],
+                       None]
+
+
+class Series:
+    """The latency histogram and outcome counters of one check or command.
+
+    Series are only updated from the event loop, between awaits, so they need
+    no locks.
+
+    """
+    __slots__ = ("buckets", "total_ns", "count", "passed", "failed",
+                 "errors", "exceptions")
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (_LAST + 1)
+        self.total_ns = 0
+        self.count = 0
+        self.passed = 0
+        self.failed = 0
+        self.errors = 0
+        # the failure (or raised) exception class name -> count
+        self.exceptions: dict[str, int] = {}
+
+    def observe(self, ns: int, result: types.CheckResult | None,
+                error: BaseException | None) -> None:
+        # bucket `i` holds durations in (2 ** (i - 1), 2 ** i] µs
+        self.buckets[min(((max(ns, 1) - 1) // 1000).bit_length(), _LAST)] += 1
+        self.total_ns += ns
+        self.count += 1
+        if error is not None:
+            self.errors += 1
+            name = type(error).__name__
+        elif result.passed:
+            self.passed += 1
+            return
+        else:
+            self.failed += 1
+            name = result.exc.__name__
+        self.exceptions[name] = self.exceptions.get(name, 0) + 1
+
+    def quantile(self, q: float, /) -> float:
+        """The upper bound, in seconds, of the bucket holding the `q`
+        quantile, or `inf` if it is in the last bucket.
+
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                break
+        return BUCKETS[i] if i < _LAST else float("inf")
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {
+            "count": self.count,
+            "sum": self.total_ns / 1e9,
+            "buckets": list(self.buckets),
+            "passed": self.passed,
+            "failed": self.failed,
+            "errors": self.errors,
+            "exceptions": dict(self.exceptions),
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99)
+        }
+
+
+def _get_command_name(utx: types.utx) -> str:
+    command = getattr(utx, "command", None)
+    return command.qualified_name if command is not None else "<unknown>"
+
+
+def _escape(value: str) -> str:
+    return (value.replace("\\", "\\\\").replace("\"", "\\\"")
+            .replace("\n", "\\n"))
+
+
+class Metrics:
+    """Per-check and per-command latency histograms, pass/fail/error counters
+    and failure exception classes.
+
+    Checks are measured once instrumented, either with the `metrics` option
+    of the `ctx.Check`/`itx.Check` decorators (which also measure the whole
+    command), with `instrument` or `instrument_program`, or with `timed`. A
+    check evaluated under `Not` is measured as `Not(<name>)`, by the outcome
+    of the `Not`. The results can be read
+    with `snapshot`, exported in the Prometheus text format with
+    `prometheus` or over HTTP with `serve`, or received as they happen
+    through `hook`.
+
+    """
+    def __init__(self, *, hook: Hook | None = None, enabled: bool = True
+                 ) -> None:
+        """
+        Arguments
+        ---------
+        hook : callable, default=None
+            Called after every measured evaluation with the kind (`"check"`
+            or `"command"`), the check or command name, the duration in
+            seconds, the outcome (`"passed"`, `"failed"` or `"error"`) and the
+            exception class of a failure or error (or None). It is called
+            inline, so it should be fast.
+        enabled : bool, default=True
+            Whether to measure anything. Can be changed at any time;
+            instrumented checks and commands cost a single attribute lookup
+            each while disabled.
+
+        """
+        self.hook = hook
+        self.enabled = enabled
+        self.checks: dict[str, Series] = {}
+        self.commands: dict[str, Series] = {}
+
+    def _observe(self, kind: str, series: dict[str, Series], name: str,
+                 ns: int, result: types.CheckResult | None,
+                 error: BaseException | None) -> None:
+        s = series.get(name)
+        if s is None:
+            s = series[name] = Series()
+        s.observe(ns, result, error)
+        if self.hook is not None:
+            if error is not None:
+                self.hook(kind, name, ns / 1e9, "error", type(error))
+            elif result.passed:
+                self.hook(kind, name, ns / 1e9, "passed", None)
+            else:
+                self.hook(kind, name, ns / 1e9, "failed", result.exc)
+
+    def instrument(self, check: types.Check, /) -> types.Check:
+        """A copy of `check` with every leaf check wrapped in `timed`, and
+        `Not`, `Any` and `All` rebuilt around them, so that the tree still
+        compiles to the same program.
+
+        """
+        if isinstance(check, timed):
+            return check
+        if isinstance(check, _modifiers.Not):
+            inner = check._check
+            if not isinstance(inner, (timed, _modifiers.Not, _modifiers.All,
+                                      _modifiers.Any)):
+                return _modifiers.Not(timed(inner, self, negated=True))
+            return _modifiers.Not(self.instrument(inner))
+        if isinstance(check, (_modifiers.All, _modifiers.Any)):
+            program = check._program
+            return type(check)(
+                *(self.instrument(c) for c in check._checks),
+                adaptive=isinstance(program, _compiler.AdaptiveProgram),
+                concurrent=isinstance(program, _compiler.ConcurrentProgram))
+        return timed(check, self)
+
+    def instrument_program(self, program: _compiler.Program, /
+                           ) -> _compiler.Program:
+        """A copy of the compiled `program`, of the same class, with the check
+        of every leaf wrapped in `timed`. The leaves keep their place, their
+        negation and the failure they report, so the copy evaluates exactly
+        the checks the original would.
+
+        """
+        wrapped: dict[tuple[int, bool], timed] = {}
+
+        def copy(node: _compiler._Leaf | _compiler._Node | _compiler._Const
+                 ) -> _compiler._Leaf | _compiler._Node | _compiler._Const:
+            if isinstance(node, _compiler._Node):
+                return _compiler._Node(node.is_any,
+                                       [copy(c) for c in node.children],
+                                       node.origin)
+            if not isinstance(node, _compiler._Leaf):
+                return node
+            key = (id(node.check), node.negated)
+            check = wrapped.get(key)
+            if check is None:
+                check = wrapped[key] = timed(node.check, self,
+                                             negated=node.negated)
+            origin = node.origin
+            if (isinstance(origin, _modifiers.Not)
+                    and origin._check is node.check):
+                # a leaf directly under `Not` reports the `Not`'s failure
+                origin = _modifiers.Not(check)
+            return _compiler._Leaf(check, node.negated, origin)
+
+        result = type(program)(copy(program.root))
+        if isinstance(program, _compiler.AdaptiveProgram):
+            result.interval = program.interval
+        return result
+
+    def reset(self) -> None:
+        """Forget everything measured so far.
+
+        """
+        self.checks.clear()
+        self.commands.clear()
+
+    def snapshot(self) -> dict[str, dict[str, dict[str, typing.Any]]]:
+        """Every series, by check and command name, as plain dictionaries.
+        Bucket counts are not cumulative and follow `BUCKETS`.
+
+        """
+        return {
+            "checks": {k: v.to_dict() for k, v in self.checks.items()},
+            "commands": {k: v.to_dict() for k, v in self.commands.items()}
+        }
+
+    def prometheus(self, prefix: str = "dpycheck") -> str:
+        """Every series in the Prometheus text exposition format.
+
+        """
+        lines = []
+        for kind, series in (("check", self.checks),
+                             ("command", self.commands)):
+            name = f"{prefix}_{kind}"
+            lines.append(f"# HELP {name}_duration_seconds Time taken to "
+                         f"evaluate each {kind}.")
+            lines.append(f"# TYPE {name}_duration_seconds histogram")
+            for label, s in series.items():
+                label = f"{kind}=\"{_escape(label)}\""
+                cumulative = 0
+                for bound, n in zip(BUCKETS, s.buckets):
+                    cumulative += n
+                    lines.append(f"{name}_duration_seconds_bucket{{{label},"
+                                 f"le=\"{bound!r}\"}} {cumulative}")
+                lines.append(f"{name}_duration_seconds_bucket{{{label},"
+                             f"le=\"+Inf\"}} {s.count}")
+                lines.append(f"{name}_duration_seconds_sum{{{label}}} "
+                             f"{s.total_ns / 1e9!r}")
+                lines.append(f"{name}_duration_seconds_count{{{label}}} "
+                             f"{s.count}")
+            lines.append(f"# HELP {name}_results_total Evaluations of each "
+                         f"{kind} by outcome.")
+            lines.append(f"# TYPE {name}_results_total counter")
+            for label, s in series.items():
+                label = f"{kind}=\"{_escape(label)}\""
+                for outcome, n in (("passed", s.passed), ("failed", s.failed),
+                                   ("error", s.errors)):
+                    lines.append(f"{name}_results_total{{{label},"
+                                 f"outcome=\"{outcome}\"}} {n}")
+            lines.append(f"# HELP {name}_exceptions_total Failures and "
+                         f"errors of each {kind} by exception class.")
+            lines.append(f"# TYPE {name}_exceptions_total counter")
+            for label, s in series.items():
+                label = f"{kind}=\"{_escape(label)}\""
+                for exc, n in s.exceptions.items():
+                    lines.append(f"{name}_exceptions_total{{{label},"
+                                 f"exception=\"{_escape(exc)}\"}} {n}")
+        return "\n".join(lines) + "\n"
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 9464, *,
+                    prefix: str = "dpycheck") -> asyncio.Server:
+        """Serve `prometheus` over HTTP at `/metrics` from the running event
+        loop, so that every scrape sees a consistent snapshot. Close the
+        returned server to stop.
+
+        """
+        async def handle(reader: asyncio.StreamReader,
+                         writer: asyncio.StreamWriter) -> None:
+            try:
+                request = await reader.readline()
+                while (await reader.readline()).strip():
+                    # headers are ignored
+                    pass
+                parts = request.split()
+                if len(parts) >= 2 and parts[1] in (b"/metrics", b"/"):
+                    status = b"200 OK"
+                    body = self.prometheus(prefix).encode()
+                else:
+                    status = b"404 Not Found"
+                    body = b""
+                writer.write(b"HTTP/1.1 " + status + b"\r\nContent-Type: "
+                             + CONTENT_TYPE.encode() + b"\r\nContent-Length: "
+                             + str(len(body)).encode()
+                             + b"\r\nConnection: close\r\n\r\n" + body)
+                await writer.drain()
+            except ConnectionError:
+                pass
+            finally:
+                writer.close()
+
+        return await asyncio.start_server(handle, host, port)
+
+
+class timed(types.Check):
+    def __init__(self, check: types.Check, metrics: Metrics, *,
+                 name: str | None = None, negated: bool = False) -> None:
+        """
+        Arguments
+        ---------
+        check : Check
+            The check to measure.
+        metrics : Metrics
+            The metrics to record the check's latency and outcomes in.
+        name : str, default=None
+            The name to record the check under. Defaults to the name of its
+            class, so that every instance of a check shares a series.
+        negated : bool, default=False
+            Whether the check is evaluated under `Not`, in which case the
+            outcome of the `Not` is recorded, by default as `Not(<name>)`.
+            The result returned is still that of `check`.
+
+        """
+        self._exc = check._exc
+        self._args = check._args
+        self._check = check
+        self._fingerprint = (check, negated)
+        self._metrics = metrics
+        if name is None:
+            name = type(check).__name__
+            if negated:
+                name = f"Not({name})"
+        self._name = name
+        self._negated = negated
+        self.is_sync = check.is_sync
+        self.is_stateful = check.is_stateful
+
+    def _outcome(self, result: types.CheckResult) -> types.CheckResult:
+        # the result the outcome is recorded from
+        if not self._negated:
+            return result
+        if not result.passed:
+            return _compiler.PASSED
+        return types.CheckResult(False, exceptions.get_reverse(self._exc),
+                                 result.args)
+
+    def sync_predicate(self, utx: types.utx, /) -> types.CheckResult:
+        metrics = self._metrics
+        if not metrics.enabled:
+            return self._check.sync_predicate(utx)
+        start = time.perf_counter_ns()
+        try:
+            result = self._check.sync_predicate(utx)
+        except Exception as exc:
+            metrics._observe("check", metrics.checks, self._name,
+                             time.perf_counter_ns() - start, None, exc)
+            raise
+        if result.__class__ is bool:
+            result = self._check.result(result)
+        metrics._observe("check", metrics.checks, self._name,
+                         time.perf_counter_ns() - start,
+                         self._outcome(result), None)
+        return result
+
+    async def predicate(self, utx: types.utx, /) -> types.CheckResult:
+        if self.is_sync:
+            return self.sync_predicate(utx)
+        metrics = self._metrics
+        if not metrics.enabled:
+            return await self._check.predicate(utx)
+        start = time.perf_counter_ns()
+        try:
+            result = await self._check.predicate(utx)
+        except Exception as exc:
+            metrics._observe("check", metrics.checks, self._name,
+                             time.perf_counter_ns() - start, None, exc)
+            raise
+        if result.__class__ is bool:
+            result = self._check.result(result)
+        metrics._observe("check", metrics.checks, self._name,
+                         time.perf_counter_ns() - start,
+                         self._outcome(result), None)
+        return result
+
+    def bulk_predicate(self, members: typing.Any) -> typing.Any:
+        return self._check.bulk_predicate(members)
+
+
+class MeteredProgram:
+    """A compiled program whose evaluations are recorded, by the name of the
+    invoked command, in a `Metrics`. The leaves of `program` are usually
+    instrumented with `Metrics.instrument_program`, so that a single program
+    (and a single set of adaptive counters) serves with metrics enabled or
+    disabled.
+
+    """
+    __slots__ = ("program", "metrics", "is_stateful")
+
+    def __init__(self, program: typing.Any, metrics: Metrics) -> None:
+        self.program = program
+        self.metrics = metrics
+        self.is_stateful = program.is_stateful
+
+    def run(self, utx: types.utx, /) -> typing.Awaitable[types.CheckResult]:
+        if not self.metrics.enabled:
+            return self.program.run(utx)
+        return self._run(utx)
+
+    async def _run(self, utx: types.utx, /) -> types.CheckResult:
+        metrics = self.metrics
+        start = time.perf_counter_ns()
+        try:
+            result = await self.program.run(utx)
+        except Exception as exc:
+            metrics._observe("command", metrics.commands,
+                             _get_command_name(utx),
+                             time.perf_counter_ns() - start, None, exc)
+            raise
+        metrics._observe("command", metrics.commands, _get_command_name(utx),
+                         time.perf_counter_ns() - start, result, None)
+        return result
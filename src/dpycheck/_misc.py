@@ -13,73 +13,196 @@ from discord.ext import commands
 from . import exceptions
 from . import types
 from . import utils
+from . import _patterns
 import functools
-import datetime
+import logging
+import asyncio
+import bisect
+import time
 import discord
 import typing
+import re
+
+
+_log = logging.getLogger(__name__)
 
 
 class in_dm(types.Check):
+    is_sync = True
+
     def __init__(self) -> None:
         self._exc = exceptions.NotInDM
         self._args: tuple[discord.Permissions, ...] = ()
     
-    async def predicate(self, utx: types.utx, /) -> bool:
-        return utx.guild is None
+    def sync_predicate(self, utx: types.utx, /) -> types.CheckResult:
+        return self.result(utx.guild is None)
 
 
 class is_user(types.Check):
+    is_sync = True
+
     def __init__(self, user_id: int | typing.Iterable[int], /) -> None:
         self._exc = exceptions.IsNotUser
-        self._args: tuple[int] = (user_id,)
-        self._user_id: int = user_id
+        self._user_id = utils.freeze_ids(user_id)
+        self._args: tuple[int | tuple[int, ...] | utils.SortedIds] = (
+            self._user_id,)
+        self._ids = utils.id_lookup(self._user_id)
     
-    async def predicate(self, utx: types.utx, /) -> bool:
-        if utils.isiterable(self._user_id):
-            return utils.get_author(utx).id in self._user_id
-        return utils.get_author(utx).id == self._user_id
+    def sync_predicate(self, utx: types.utx, /) -> types.CheckResult:
+        return self.result(utils.get_author(utx).id in self._ids)
+
+    def bulk_predicate(self, members: typing.Any) -> typing.Any:
+        return members.is_any(self._ids)
 
 
 class in_channel(types.Check):
+    is_sync = True
+
     def __init__(self, channel_id: int | typing.Iterable[int], /) -> None:
         self._exc = exceptions.NotInChannel
-        self._args: tuple[int] = (channel_id,)
-        self._channel_id = channel_id
+        self._channel_id = utils.freeze_ids(channel_id)
+        self._args: tuple[int | tuple[int, ...] | utils.SortedIds] = (
+            self._channel_id,)
+        self._ids = utils.id_lookup(self._channel_id)
     
-    async def predicate(self, utx: types.utx, /) -> bool:
-        if utils.isiterable(self._channel_id):
-            return utx.channel.id in self._channel_id
-        return utx.channel.id == self._channel_id
+    def sync_predicate(self, utx: types.utx, /) -> types.CheckResult:
+        return self.result(utx.channel.id in self._ids)
 
 
 class in_guild(types.Check):
+    is_sync = True
+
     def __init__(self, guild_id: int | typing.Iterable[int]) -> None:
         self._exc = exceptions.NotInGuild
-        self._args: tuple[int] = (guild_id,)
-        self._guild_id = guild_id
+        self._guild_id = utils.freeze_ids(guild_id)
+        self._args: tuple[int | tuple[int, ...] | utils.SortedIds] = (
+            self._guild_id,)
+        self._ids = utils.id_lookup(self._guild_id)
     
-    async def predicate(self, utx: types.utx, /) -> bool:
+    def sync_predicate(self, utx: types.utx, /) -> types.CheckResult:
         if utx.guild is None:
-            return False
-        if utils.isiterable(self._guild_id):
-            return utx.guild.id in self._guild_id
-        return utx.guild.id == self._guild_id
+            return self.result(False)
+        return self.result(utx.guild.id in self._ids)
 
 
 class in_category(types.Check):
+    is_sync = True
+
     def __init__(self, category_id: int | typing.Iterable[int]) -> None:
         self._exc = exceptions.NotInCategory
-        self._args: tuple[int] = (category_id,)
-        self._category_id = category_id
+        self._category_id = utils.freeze_ids(category_id)
+        self._args: tuple[int | tuple[int, ...] | utils.SortedIds] = (
+            self._category_id,)
+        self._ids = utils.id_lookup(self._category_id)
 
-    async def predicate(self, utx: types.utx, /) -> bool:
+    def sync_predicate(self, utx: types.utx, /) -> types.CheckResult:
         if utx.channel is None:
-            return False
+            return self.result(False)
         if utx.channel.category is None:
-            return False
-        if utils.isiterable(self._category_id):
-            return utx.channel.category.id in self._category_id
-        return utx.channel.category.id == self._category_id
+            return self.result(False)
+        return self.result(utx.channel.category.id in self._ids)
+
+
+class OwnerCache:
+    """The IDs of a bot's owner, or of its team's admins and developers, as
+    `commands.Bot.is_owner` would resolve them.
+
+    The IDs are fetched when the bot becomes ready (or on first use, for
+    clients that cannot register listeners), and refreshed in the background
+    every `interval` seconds. A failed refresh keeps the previous IDs, is
+    logged, and is stored in `last_error` until one succeeds. `is_bot_owner`
+    attaches a cache with the default interval to its bot on first use;
+    attach one yourself before running the bot to warm it up or change the
+    interval.
+
+    """
+    def __init__(self, interval: float = 3600.0) -> None:
+        """
+        Arguments
+        ---------
+        interval : float, default=3600.0
+            The number of seconds between refreshes.
+
+        """
+        self.interval = interval
+        self.ids: frozenset[int] | None = None
+        self.last_error: Exception | None = None
+        self._client: commands.Bot | discord.Client | None = None
+        self._pending: asyncio.Future[frozenset[int]] | None = None
+        self._task: asyncio.Task | None = None
+
+    @staticmethod
+    def get(client: commands.Bot | discord.Client) -> "OwnerCache":
+        """Acquire the cache attached to `client`, attaching a new one if
+        needed.
+
+        """
+        cache = getattr(client, "__dpy_check_owner_cache__", None)
+        if cache is None:
+            cache = OwnerCache()
+            cache.attach(client)
+        return cache
+
+    def attach(self, client: commands.Bot | discord.Client) -> None:
+        setattr(client, "__dpy_check_owner_cache__", self)
+        self._client = client
+        if hasattr(client, "add_listener"):
+            client.add_listener(self.on_ready, "on_ready")
+        if client.is_ready():
+            self._start()
+
+    async def on_ready(self) -> None:
+        self._start()
+
+    def _start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as exc:
+                # keep the previous IDs until the next refresh
+                self.last_error = exc
+                _log.exception("Failed to refresh the bot owner IDs")
+            else:
+                self.last_error = None
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self) -> frozenset[int]:
+        """Fetch the owner IDs now. Concurrent calls share one fetch.
+
+        """
+        if self._pending is None or self._pending.done():
+            self._pending = asyncio.ensure_future(self._fetch())
+        return await asyncio.shield(self._pending)
+
+    async def _fetch(self) -> frozenset[int]:
+        client = self._client
+        owner_id = getattr(client, "owner_id", None)
+        owner_ids = getattr(client, "owner_ids", None)
+        if owner_id:
+            ids = frozenset((owner_id,))
+        elif owner_ids:
+            ids = frozenset(owner_ids)
+        else:
+            app = await client.application_info()
+            role = getattr(discord, "TeamMemberRole", None)
+            if app.team and role is not None:
+                roles = (role.admin, role.developer)
+                ids = frozenset(m.id for m in app.team.members
+                                if m.role in roles)
+            elif app.team:
+                # discord.py before 2.4 has no team member roles; every
+                # member who accepted the invitation owns the bot
+                accepted = discord.TeamMembershipState.accepted
+                ids = frozenset(m.id for m in app.team.members
+                                if m.membership_state == accepted)
+            else:
+                ids = frozenset((app.owner.id,))
+        self.ids = ids
+        return ids
 
 
 class is_bot_owner(types.Check):
@@ -87,74 +210,133 @@ class is_bot_owner(types.Check):
         self._exc = exceptions.IsNotBotOwner
         self._args: tuple = ()
 
-    async def predicate(self, utx: types.utx, /) -> bool:
-        client = utils.get_client(utx)
-        author = utils.get_author(utx)
-        return client.is_owner(author)
+    async def predicate(self, utx: types.utx, /) -> types.CheckResult:
+        cache = OwnerCache.get(utils.get_client(utx))
+        cache._start()
+        ids = cache.ids
+        if ids is None:
+            ids = await cache.refresh()
+        return self.result(utils.get_author(utx).id in ids)
 
 
 class channel_is_nsfw(types.Check):
+    is_sync = True
+
     def __init__(self, channel_id: int = None, /) -> None:
         self._exc = exceptions.ChannelIsNotNSFW
         self._args: tuple[int] = (channel_id,)
         self._channel_id = channel_id
 
-    async def predicate(self, utx: types.utx, /) -> bool:
+    def sync_predicate(self, utx: types.utx, /) -> types.CheckResult:
         # guild=None means were inside a dm, which is always nsfw
         if utx.guild is None:
-            return True
+            return self.result(True)
         if self._channel_id:
             client = utils.get_client(utx)
             channel = client.get_channel(self._channel_id)
         else:
             channel = utx.channel
-        return isinstance(channel, (discord.TextChannel,
-                                    discord.Thread,
-                                    discord.VoiceChannel)) and channel.is_nsfw()
+        return self.result(isinstance(channel, (discord.TextChannel,
+                                                discord.Thread,
+                                                discord.VoiceChannel))
+                           and channel.is_nsfw())
 
 
 class is_guild_owner(types.Check):
+    is_sync = True
+
     def __init__(self, guild_id: int = None) -> None:
         self._exc = exceptions.IsNotGuildOwner
         self._args: tuple[int | None] = (guild_id,)
         self._guild_id = guild_id
 
-    async def predicate(self, utx: types.utx, /) -> bool:
+    def sync_predicate(self, utx: types.utx, /) -> types.CheckResult:
         if self._guild_id:
             client = utils.get_client(utx)
             guild = client.get_guild(self._guild_id)
         else:
             guild = utx.guild
         if not guild:
-            return False
+            return self.result(False)
         author = utils.get_author(utx)
-        return author.id == guild.owner_id
+        return self.result(author.id == guild.owner_id)
 
 
 class username_contains(types.Check):
+    is_sync = True
+
     def __init__(self,
-                 substr: str | typing.Callable[[commands.Context |
-                                                  discord.Interaction],
-                                                 tuple[str, bool]], /) -> None:
+                 *substr: str | re.Pattern[str] | typing.Callable[
+                     [commands.Context | discord.Interaction],
+                     tuple[str, bool]]) -> None:
+        """
+        Arguments
+        ---------
+        *substr : str | re.Pattern | Callable
+            The substrings and regular expressions, any of which the author's
+            display name must contain. Substrings are matched against the
+            casefolded display name, and regular expressions against the
+            display name itself, with their own flags. A passing result
+            reports the pattern matching earliest, so that `Not` can name it.
+            Alternatively, a single callable returning the substring to report
+            and whether the check passed.
+
+        """
         self._exc = exceptions.UsernameDoesNotContain
-        self._args: tuple[str | None] = (substr,)
-        self._substr = substr
+        if not substr:
+            raise TypeError("username_contains requires at least one pattern")
+        if len(substr) == 1 and callable(substr[0]):
+            self._args: tuple[str | None, ...] = substr
+            self._substr = substr[0]
+            return
+        self._substr = None
+        # the patterns with their flags
+        self._fingerprint = substr
+        self._args = tuple(s.pattern if isinstance(s, re.Pattern) else s
+                           for s in substr)
+        # the result reporting each pattern when it matches
+        self._matched = tuple(types.CheckResult(True, self._exc, (arg,))
+                              for arg in self._args)
+        patterns = _patterns.PatternSet(substr)
+
+        @functools.lru_cache(maxsize=4096)
+        def search(user_id: int, display_name: str) -> int | None:
+            return patterns.search(display_name)
+        self._search = search
     
-    async def predicate(self, utx: types.utx, /) -> bool:
-        if isinstance(self._substr, str):
+    def sync_predicate(self, utx: types.utx, /) -> types.CheckResult:
+        if self._substr is None:
             author = utils.get_author(utx)
-            return self._substr.lower() in author.display_name.lower()
+            index = self._search(author.id, author.display_name)
+            if index is None:
+                return self.result(False)
+            return self._matched[index]
         arg, passed = self._substr(utx)
-        self._args = (arg,)
-        return passed
+        return types.CheckResult(bool(passed), self._exc, (arg,))
 
 
 class membership(types.Check):
+    is_sync = True
+
     def __init__(self, timespec: typing.Literal["s", "m", "h", "d", "w",
-                                                "y"] = "s") -> None:
+                                                "y"] = "s",
+                 tiers: typing.Iterable[float] = ()) -> None:
+        """
+        Arguments
+        ---------
+        timespec : Literal["s", "m", "h", "d", "w", "y"], default="s"
+            The unit of the bounds the check is compared against.
+        tiers : Iterable[float], default=()
+            The membership lengths (in `timespec` units) at which each tier
+            starts. If given, the check is compared against tier numbers
+            instead, where tier 0 is below the first threshold, so that
+            `membership("d", tiers=(7, 30, 90)) >= 2` requires 30 days.
+            Comparing against a tier outside of 0 to `len(tiers)`, or one no
+            tier can satisfy, raises ValueError.
+
+        """
         self._exc = exceptions.Generic
         self._args = ()
-        self._predicate_set: bool = False
         timespec_multipliers = {
             "s": 1,
             "m": 60,
@@ -164,88 +346,115 @@ class membership(types.Check):
             "y": 60 * 60 * 24 * 7 * 52
         }
         self._tsmul = timespec_multipliers[timespec]
-    
-    async def predicate(self, utx: types.utx, /) -> bool:
-        return True
-    
-    def _get_delta(self, utx: types.utx, /) -> float:
-        now = datetime.datetime.utcnow()
-        now = now.replace(tzinfo=datetime.timezone.utc)
-        author = utils.get_author(utx)
-        delta: datetime.timedelta = now - author.joined_at
-        return delta.total_seconds() / self._tsmul
-
-    def __lt__(self, other: float) -> "membership":
-        if self._predicate_set:
-            self._args = (self._args[0], exceptions.MembershipGE, other * self._tsmul)
-            _predicate = self.predicate
-            async def predicate(self: "membership", utx: types.utx, /) -> bool:
-                return await _predicate(utx) and (self._get_delta(utx) < other)
+        self._tiers = tuple(sorted(t * self._tsmul for t in tiers))
+        # (seconds, inclusive) of the bounds applied so far
+        self._lower: tuple[float, bool] | None = None
+        self._upper: tuple[float, bool] | None = None
+
+    def _get_age(self, utx: types.utx, /) -> float | None:
+        joined_at = utils.get_author(utx).joined_at
+        if joined_at is None:
+            return None
+        return time.time() - joined_at.timestamp()
+
+    def tier(self, utx: types.utx, /) -> int:
+        """The tier of the author: the number of `tiers` thresholds their
+        membership length has reached.
+
+        """
+        age = self._get_age(utx)
+        if age is None:
+            return 0
+        return bisect.bisect_right(self._tiers, age)
+
+    def sync_predicate(self, utx: types.utx, /) -> types.CheckResult:
+        if self._lower is None and self._upper is None:
+            return self.result(True)
+        age = self._get_age(utx)
+        if age is None:
+            return self.result(False)
+        if self._lower is not None:
+            seconds, inclusive = self._lower
+            if age < seconds or (age == seconds and not inclusive):
+                return self.result(False)
+        if self._upper is not None:
+            seconds, inclusive = self._upper
+            if age > seconds or (age == seconds and not inclusive):
+                return self.result(False)
+        return self.result(True)
+
+    def bulk_predicate(self, members: typing.Any) -> typing.Any:
+        age = members.joined_for(1)
+        mask = members.everyone()
+        if self._lower is not None:
+            seconds, inclusive = self._lower
+            mask &= age >= seconds if inclusive else age > seconds
+        if self._upper is not None:
+            seconds, inclusive = self._upper
+            mask &= age <= seconds if inclusive else age < seconds
+        return mask
+
+    def _bound(self, op: str, other: float) -> "membership":
+        if self._tiers:
+            if (not isinstance(other, int)
+                    or not 0 <= other <= len(self._tiers)):
+                raise ValueError(f"tier must be an integer between 0 and "
+                                 f"{len(self._tiers)}, not {other!r}")
+            # tier > n is tier >= n + 1, and tier <= n is tier < n + 1, which
+            # are lengths of at least and less than the start of a tier
+            if op in (">", "<="):
+                other += 1
+            op = ">=" if op in (">", ">=") else "<"
+            if other > len(self._tiers):
+                if op == ">=":
+                    raise ValueError(f"no tier is above {other - 1}")
+                # every tier is below it
+                return self
+            if other <= 0:
+                if op == "<":
+                    raise ValueError("no tier is below 0")
+                # every tier is at least 0
+                return self
+            seconds = self._tiers[other - 1]
         else:
-            self._exc = exceptions.MembershipGE
-            self._args = (other * self._tsmul,)
-            async def predicate(self: "membership", utx: types.utx, /) -> bool:
-                return self._get_delta(utx) < other
-        self._predicate_set = True
-        self.predicate = functools.partial(predicate, self)
+            seconds = other * self._tsmul
+        lower = op in (">", ">=")
+        inclusive = op in (">=", "<=")
+        exc = {
+            (True, True): exceptions.MembershipLT,
+            (True, False): exceptions.MembershipLE,
+            (False, True): exceptions.MembershipGT,
+            (False, False): exceptions.MembershipGE
+        }[lower, inclusive]
+
+        if self._lower is None and self._upper is None:
+            self._exc = exc
+            self._args = (seconds,)
+        else:
+            self._args = (self._args[0], exc, seconds)
+
+        # keep the tighter of the existing and new bound
+        if lower:
+            if (self._lower is None or seconds > self._lower[0]
+                    or (seconds == self._lower[0] and not inclusive)):
+                self._lower = (seconds, inclusive)
+        elif (self._upper is None or seconds < self._upper[0]
+                or (seconds == self._upper[0] and not inclusive)):
+            self._upper = (seconds, inclusive)
+        self._fingerprint = (self._tsmul, self._lower, self._upper)
         return self
 
+    def __lt__(self, other: float) -> "membership":
+        return self._bound("<", other)
+
     def __gt__(self, other: float) -> "membership":
-        if self._predicate_set:
-            self._args = (self._args[0], exceptions.MembershipLE,
-                          other * self._tsmul)
-            _predicate = self.predicate
-            async def predicate(self: "membership", utx: types.utx, /
-                                ) -> bool:
-                return await _predicate(utx) and (self._get_delta(utx)
-                                                    > other)
-        else:
-            self._exc = exceptions.MembershipLE
-            self._args = (other * self._tsmul,)
-            async def predicate(self: "membership", utx: types.utx, /
-                                ) -> bool:
-                return self._get_delta(utx) > other
-        self._predicate_set = True
-        self.predicate = functools.partial(predicate, self)
-        return self
+        return self._bound(">", other)
 
     def __le__(self, other: float) -> "membership":
-        if self._predicate_set:
-            self._args = (self._args[0], exceptions.MembershipGT,
-                          other * self._tsmul)
-            _predicate = self.predicate
-            async def predicate(self: "membership", utx: types.utx, /
-                                ) -> bool:
-                return await _predicate(utx) and (self._get_delta(utx)
-                                                    <= other)
-        else:
-            self._exc = exceptions.MembershipGT
-            self._args = (other * self._tsmul,)
-            async def predicate(self: "membership", utx: types.utx, /
-                                ) -> bool:
-                return self._get_delta(utx) <= other
-        self._predicate_set = True
-        self.predicate = functools.partial(predicate, self)
-        return self
+        return self._bound("<=", other)
 
     def __ge__(self, other: float) -> "membership":
-        if self._predicate_set:
-            self._args = (self._args[0], exceptions.MembershipLT,
-                          other * self._tsmul)
-            _predicate = self.predicate
-            async def predicate(self: "membership", utx: types.utx, /
-                                ) -> bool:
-                return await _predicate(utx) and (self._get_delta(utx)
-                                                    >= other)
-        else:
-            self._exc = exceptions.MembershipLT
-            self._args = (other * self._tsmul,)
-            async def predicate(self: "membership", utx: types.utx, /
-                                ) -> bool:
-                return self._get_delta(utx) >= other
-        self._predicate_set = True
-        self.predicate = functools.partial(predicate, self)
-        return self
+        return self._bound(">=", other)
 
 
 class custom(types.Check):
@@ -255,7 +464,8 @@ class custom(types.Check):
                                               typing.Awaitable[bool]]) -> None:
         self._exc = exceptions.Generic
         self._args: tuple = ()
+        self._fingerprint = (predicate,)
         self._predicate = predicate
     
-    async def predicate(self, utx: types.utx, /) -> bool:
-        return await self._predicate(utx)
+    async def predicate(self, utx: types.utx, /) -> types.CheckResult:
+        return self.result(bool(await self._predicate(utx)))
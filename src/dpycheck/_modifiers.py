@@ -12,6 +12,7 @@ __copyright__ = "Copyright (c) 2022-present Tanner B. Corcoran"
 import typing
 from . import types
 from . import exceptions
+from . import _compiler
 
 
 class Not(types.Check):
@@ -19,36 +20,135 @@ class Not(types.Check):
         self._exc = exceptions.get_reverse(check._exc)
         self._args = check._args
         self._check = check
+        self.is_sync = check.is_sync
+
+    def _invert(self, result: types.CheckResult) -> types.CheckResult:
+        if not result.passed:
+            return self.result(True)
+        return types.CheckResult(False, self._exc, result.args)
+
+    def sync_predicate(self, utx: types.utx, /) -> types.CheckResult:
+        return self._invert(self._check.sync_predicate(utx))
     
-    async def predicate(self, utx: types.utx, /) -> bool:
-        return not await self._check.predicate(utx)
+    async def predicate(self, utx: types.utx, /) -> types.CheckResult:
+        if self.is_sync:
+            return self._invert(self._check.sync_predicate(utx))
+        return self._invert(await self._check.predicate(utx))
+
+    def bulk_predicate(self, members: typing.Any) -> typing.Any:
+        return ~self._check.bulk_predicate(members)
 
 
 class Any(types.Check):
-    def __init__(self, *checks: types.Check) -> None:
+    def __init__(self, *checks: types.Check, adaptive: bool = False,
+                 concurrent: bool = False) -> None:
+        """
+        Arguments
+        ---------
+        *checks : Check
+            The checks, any of which must pass.
+        adaptive : bool, default=False
+            If True, the checks will be reordered by their observed latency and
+            pass rate when this check is evaluated on its own. When nested in
+            another tree, the outermost `Any`, `All` or decorator decides.
+        concurrent : bool, default=False
+            If True, asynchronous checks will be awaited concurrently when this
+            check is evaluated on its own, and the rest will be cancelled once
+            one of them passes. Cannot be combined with `adaptive`.
+        
+        """
         self._exc = exceptions.Generic
         self._args: tuple = ()
         self._checks = checks
+        self._program = None
+        if adaptive or concurrent:
+            self._program = _compiler.compile_all(self, adaptive=adaptive,
+                                                  concurrent=concurrent)
+        self.is_sync = self._program is None and all(c.is_sync for c in checks)
+
+    def sync_predicate(self, utx: types.utx, /) -> types.CheckResult:
+        for c in self._checks:
+            if c.sync_predicate(utx).passed:
+                return self.result(True)
+        return self.result(False)
     
-    async def predicate(self, utx: types.utx, /) -> bool:
+    async def predicate(self, utx: types.utx, /) -> types.CheckResult:
+        if self._program is not None:
+            return await self._program.run(utx)
         for c in self._checks:
-            if await c.predicate(utx) is True:
-                return True
-        return False
+            if c.is_sync:
+                result = c.sync_predicate(utx)
+            else:
+                result = await c.predicate(utx)
+            if result.passed:
+                return self.result(True)
+        return self.result(False)
+
+    def bulk_predicate(self, members: typing.Any) -> typing.Any:
+        mask = members.no_one()
+        for c in self._checks:
+            mask |= c.bulk_predicate(members)
+            if mask.all():
+                break
+        return mask
 Or = Any
 
 
 class All(types.Check):
-    def __init__(self, *checks: types.Check) -> None:
+    def __init__(self, *checks: types.Check, adaptive: bool = False,
+                 concurrent: bool = False) -> None:
+        """
+        Arguments
+        ---------
+        *checks : Check
+            The checks, all of which must pass.
+        adaptive : bool, default=False
+            If True, the checks will be reordered by their observed latency and
+            pass rate when this check is evaluated on its own. When nested in
+            another tree, the outermost `Any`, `All` or decorator decides. The
+            reported failure is always the first failing check in the given
+            order.
+        concurrent : bool, default=False
+            If True, asynchronous checks will be awaited concurrently when this
+            check is evaluated on its own, and the rest will be cancelled once
+            the first failing check (in the given order) is known. Cannot be
+            combined with `adaptive`.
+        
+        """
         self._exc = exceptions.Generic
         self._args: tuple[typing.Any, ...] = ()
         self._checks = checks
+        self._program = None
+        if adaptive or concurrent:
+            self._program = _compiler.compile_all(self, adaptive=adaptive,
+                                                  concurrent=concurrent)
+        self.is_sync = self._program is None and all(c.is_sync for c in checks)
+
+    def sync_predicate(self, utx: types.utx, /) -> types.CheckResult:
+        # a failing All reports the result of the first failing check
+        for c in self._checks:
+            result = c.sync_predicate(utx)
+            if not result.passed:
+                return result
+        return self.result(True)
+
+    async def predicate(self, utx: types.utx, /) -> types.CheckResult:
+        if self._program is not None:
+            return await self._program.run(utx)
+        for c in self._checks:
+            if c.is_sync:
+                result = c.sync_predicate(utx)
+            else:
+                result = await c.predicate(utx)
+            if not result.passed:
+                return result
+        return self.result(True)
 
-    async def predicate(self, utx: types.utx, /) -> bool:
+    def bulk_predicate(self, members: typing.Any) -> typing.Any:
+        mask = members.everyone()
         for c in self._checks:
-            if await c.predicate(utx) is not True:
-                self._exc = c._exc
-                self._args = c._args
-                return False
-        return True
+            mask &= c.bulk_predicate(members)
+            if not mask.any():
+                break
+        return mask
 And = All
@@ -0,0 +1,116 @@
+"""Matching many substrings and regular expressions at once.
+
+:copyright: (c) 2022-present Tanner B. Corcoran
+:license: MIT, see LICENSE for more details.
+"""
+
+__author__ = "Tanner B. Corcoran"
+__license__ = "MIT License"
+__copyright__ = "Copyright (c) 2022-present Tanner B. Corcoran"
+
+
+import collections
+import itertools
+import bisect
+import typing
+import re
+
+
+class PatternSet:
+    """Literal substrings and regular expressions, with the literals compiled
+    into one Aho–Corasick automaton.
+
+    Literals are casefolded when compiled and matched against the casefolded
+    text. Expressions are matched against the text itself, each on its own,
+    so that their groups, backreferences and flags mean what they do in
+    `re.search`.
+
+    """
+    def __init__(self, patterns: typing.Iterable[str | re.Pattern[str]]
+                 ) -> None:
+        self.patterns = tuple(patterns)
+        literals: dict[str, int] = {}
+        self._regexes: list[tuple[int, re.Pattern[str]]] = []
+        for i, pattern in enumerate(self.patterns):
+            if isinstance(pattern, re.Pattern):
+                self._regexes.append((i, pattern))
+            else:
+                literals.setdefault(pattern.casefold(), i)
+        self._build(literals)
+
+    def _build(self, literals: dict[str, int]) -> None:
+        # a trie of the literals, with the index and length of the literals
+        # ending at each state
+        goto: list[dict[str, int]] = [{}]
+        out: list[list[tuple[int, int]]] = [[]]
+        for literal, index in literals.items():
+            state = 0
+            for char in literal:
+                if char not in goto[state]:
+                    goto.append({})
+                    out.append([])
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            out[state].append((index, len(literal)))
+
+        # resolve failure links breadth-first, merging each state's
+        # transitions and outputs with those of its failure state, so that
+        # matching never has to follow a failure link
+        fail = [0] * len(goto)
+        queue = collections.deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            # the failure state is shallower, so it has been merged already
+            fallback = goto[fail[state]]
+            for char, child in goto[state].items():
+                queue.append(child)
+                fail[child] = fallback.get(char, 0)
+            goto[state] = {**fallback, **goto[state]}
+            out[state] = out[state] + out[fail[state]]
+        # the empty literal matches at the start of any text
+        self._empty = literals.get("")
+        self._goto = goto
+        self._out = [tuple(o) for o in out]
+        self._longest = max(map(len, literals), default=0)
+
+    def search(self, text: str) -> int | None:
+        """The index of the pattern matching earliest in `text`, with ties
+        going to the pattern given first, or None if no pattern matches.
+
+        """
+        best: tuple[int, int] | None = None
+        if self._empty is not None:
+            best = (0, self._empty)
+        if self._longest:
+            best = self._search_literals(text, best)
+        for index, regex in self._regexes:
+            m = regex.search(text)
+            if m is not None:
+                match = (m.start(), index)
+                if best is None or match < best:
+                    best = match
+        return None if best is None else best[1]
+
+    def _search_literals(self, text: str, best: tuple[int, int] | None
+                         ) -> tuple[int, int] | None:
+        folded = text.casefold()
+        goto = self._goto
+        out = self._out
+        state = 0
+        found = best
+        for end, char in enumerate(folded, 1):
+            if found is not None and end - self._longest > found[0]:
+                # no literal can start before the best match any more
+                break
+            state = goto[state].get(char, 0)
+            for index, length in out[state]:
+                match = (end - length, index)
+                if found is None or match < found:
+                    found = match
+        if found is best or len(folded) == len(text):
+            return found
+        # casefolding expanded some characters, so map the start of the match
+        # back to the character of `text` it was folded from
+        starts = list(itertools.accumulate(
+            (len(c.casefold()) for c in text), initial=0))
+        return (bisect.bisect_right(starts, found[0]) - 1, found[1])
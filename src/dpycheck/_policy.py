@@ -0,0 +1,424 @@
+"""Check trees declared in TOML or JSON policy documents.
+
+:copyright: (c) 2022-present Tanner B. Corcoran
+:license: MIT, see LICENSE for more details.
+"""
+
+__author__ = "Tanner B. Corcoran"
+__license__ = "MIT License"
+__copyright__ = "Copyright (c) 2022-present Tanner B. Corcoran"
+
+
+from discord.ext import commands
+from . import types
+from . import _channel_perms
+from . import _guild_perms
+from . import _modifiers
+from . import _cooldown
+from . import _id_file
+from . import _role
+from . import _misc
+from . import ctx
+from . import itx
+import tempfile
+import operator
+import hashlib
+import inspect
+import marshal
+import tomllib
+import typing
+import json
+import os
+
+
+# bumped whenever the compiled form changes, so that old caches are ignored
+FORMAT_VERSION = 1
+
+# the checks a policy can refer to, by name
+CHECKS: dict[str, type[types.Check]] = {
+    cls.__name__: cls for cls in (
+        _misc.in_dm,
+        _misc.is_user,
+        _misc.in_channel,
+        _misc.in_guild,
+        _misc.in_category,
+        _misc.is_bot_owner,
+        _misc.channel_is_nsfw,
+        _misc.is_guild_owner,
+        _misc.username_contains,
+        _misc.membership,
+        _role.user_has_role,
+        _role.bot_has_role,
+        _guild_perms.user_has_guild_perms,
+        _guild_perms.bot_has_guild_perms,
+        _channel_perms.user_has_channel_perms,
+        _channel_perms.bot_has_channel_perms,
+        _id_file.in_id_file,
+        _cooldown.cooldown
+    )
+}
+
+# comparisons applied to checks that support them, such as `membership`
+COMPARISONS: dict[str, typing.Callable[[typing.Any, typing.Any],
+                                       typing.Any]] = {
+    "gt": operator.gt,
+    "ge": operator.ge,
+    "lt": operator.lt,
+    "le": operator.le
+}
+
+# the options of a command's policy, besides its check tree
+_OPTIONS = {"adaptive": bool, "concurrent": bool}
+_SECTIONS = ("commands", "app_commands")
+
+
+class PolicyError(ValueError):
+    """A policy document that is malformed or refers to unknown checks or
+    commands.
+
+    """
+
+
+def _fail(where: str, message: str) -> typing.NoReturn:
+    raise PolicyError(f"{where}: {message}")
+
+
+class _Compiler:
+    # validates parsed documents into nested tuples of builtins, which are
+    # cheap to `marshal` and to build checks from:
+    #   ("all" | "any", (node, ...)), ("not", node),
+    #   ("check", name, args, kwargs, ((comparison, value), ...))
+    def __init__(self, checks: dict[str, type[types.Check]],
+                 files: dict[str, _id_file.IdFile]) -> None:
+        self.checks = checks
+        self.files = files
+
+    def document(self, data: typing.Any, where: str) -> dict:
+        if not isinstance(data, dict):
+            _fail(where, "expected a table")
+        for key in data:
+            if key not in _SECTIONS:
+                _fail(where, f"unknown section {key!r}")
+        compiled = {}
+        for section in _SECTIONS:
+            policies = data.get(section, {})
+            if not isinstance(policies, dict):
+                _fail(f"{where}.{section}", "expected a table")
+            compiled[section] = {
+                name: self.command(policy, f"{where}.{section}.{name!r}")
+                for name, policy in policies.items()
+            }
+        return compiled
+
+    def command(self, policy: typing.Any, where: str) -> tuple[dict, tuple]:
+        if not isinstance(policy, dict):
+            _fail(where, "expected a table")
+        options = {}
+        tree = {}
+        for key, value in policy.items():
+            if key in _OPTIONS:
+                if not isinstance(value, _OPTIONS[key]):
+                    _fail(f"{where}.{key}",
+                          f"expected {_OPTIONS[key].__name__}")
+                options[key] = value
+            else:
+                tree[key] = value
+        return options, self.node(tree, where)
+
+    def node(self, node: typing.Any, where: str) -> tuple:
+        if not isinstance(node, dict):
+            _fail(where, "expected a table")
+        kinds = [k for k in ("all", "any", "not", "check") if k in node]
+        if len(kinds) != 1:
+            _fail(where, "expected exactly one of 'all', 'any', 'not' and "
+                         "'check'")
+        kind = kinds[0]
+        if kind == "check":
+            return self.leaf(node, where)
+        if len(node) != 1:
+            extra = ", ".join(repr(k) for k in node if k != kind)
+            _fail(where, f"unexpected {extra} next to {kind!r}")
+        if kind == "not":
+            return ("not", self.node(node["not"], f"{where}.not"))
+        children = node[kind]
+        if not isinstance(children, list) or not children:
+            _fail(f"{where}.{kind}", "expected a non-empty array")
+        return (kind, tuple(self.node(child, f"{where}.{kind}[{i}]")
+                            for i, child in enumerate(children)))
+
+    def leaf(self, node: dict, where: str) -> tuple:
+        name = node["check"]
+        cls = self.checks.get(name)
+        if cls is None:
+            _fail(f"{where}.check", f"unknown check {name!r}")
+        args = node.get("args", [])
+        if not isinstance(args, list):
+            _fail(f"{where}.args", "expected an array")
+        kwargs = {}
+        comparisons = []
+        for key, value in node.items():
+            if key in ("check", "args"):
+                continue
+            if key in COMPARISONS:
+                comparisons.append((key, value))
+            else:
+                kwargs[key] = value
+        try:
+            inspect.signature(cls).bind(*args, **kwargs)
+        except TypeError as exc:
+            _fail(where, f"invalid arguments for {name!r}: {exc}")
+        compiled = ("check", name, _freeze(args), _freeze(kwargs),
+                    tuple(comparisons))
+        # constructing the check catches invalid values, such as unknown
+        # permissions
+        try:
+            _build(compiled, self.checks, self.files)
+        except (TypeError, ValueError, KeyError, OSError) as exc:
+            _fail(where, f"{type(exc).__name__}: {exc}")
+        return compiled
+
+
+def _freeze(value: typing.Any) -> typing.Any:
+    # arrays become tuples so that compiled policies are hashable and
+    # `marshal` them the same way every time
+    if isinstance(value, list):
+        return tuple(map(_freeze, value))
+    if isinstance(value, dict):
+        return {k: _freeze(v) for k, v in value.items()}
+    return value
+
+
+def _build(node: tuple, checks: dict[str, type[types.Check]],
+           files: dict[str, _id_file.IdFile]) -> types.Check:
+    kind = node[0]
+    if kind == "check":
+        _, name, args, kwargs, comparisons = node
+        cls = checks[name]
+        if (isinstance(cls, type) and issubclass(cls, _id_file.in_id_file)
+                and args and isinstance(args[0], str)):
+            # one `IdFile` per file, however many checks name it
+            path = os.path.realpath(args[0])
+            file = files.get(path)
+            if file is None:
+                file = files[path] = _id_file.IdFile(args[0])
+            args = (file, *args[1:])
+        check = cls(*args, **kwargs)
+        for comparison, value in comparisons:
+            check = COMPARISONS[comparison](check, value)
+            if not isinstance(check, types.Check):
+                raise TypeError(f"{name!r} does not support {comparison!r}")
+        return check
+    if kind == "not":
+        return _modifiers.Not(_build(node[1], checks, files))
+    children = [_build(child, checks, files) for child in node[1]]
+    return (_modifiers.All if kind == "all" else _modifiers.Any)(*children)
+
+
+class Policy:
+    """The check trees of a policy document, by command qualified name.
+
+    """
+    def __init__(self, compiled: dict[str, dict[str, tuple[dict, tuple]]],
+                 checks: dict[str, type[types.Check]], source: str = "<policy>",
+                 files: dict[str, _id_file.IdFile] | None = None) -> None:
+        self.source = source
+        self._compiled = compiled
+        self._checks = checks
+        # the `IdFile` of each file named by an `in_id_file` check, by real
+        # path
+        self._files = {} if files is None else files
+
+    def __repr__(self) -> str:
+        return (f"Policy({self.source!r}, <{len(self._compiled['commands'])} "
+                f"commands, {len(self._compiled['app_commands'])} app "
+                f"commands>)")
+
+    @property
+    def command_names(self) -> list[str]:
+        return list(self._compiled["commands"])
+
+    @property
+    def app_command_names(self) -> list[str]:
+        return list(self._compiled["app_commands"])
+
+    def build(self, name: str, *, app: bool = False) -> types.Check:
+        """A new check tree for the command `name`.
+
+        """
+        _, root = self._compiled["app_commands" if app else "commands"][name]
+        return _build(root, self._checks, self._files)
+
+    def decorator(self, name: str, *, app: bool = False) -> typing.Callable:
+        """A `ctx.Check` (or, with `app`, an `itx.Check`) decorator applying
+        the policy of the command `name`.
+
+        """
+        options, root = self._compiled["app_commands" if app
+                                       else "commands"][name]
+        Check = itx.Check if app else ctx.Check
+        if root[0] == "any":
+            return Check.any(*(_build(child, self._checks, self._files)
+                               for child in root[1]), **options)
+        if root[0] == "all":
+            return Check.all(*(_build(child, self._checks, self._files)
+                               for child in root[1]), **options)
+        return Check.all(_build(root, self._checks, self._files), **options)
+
+    def attach(self, bot: commands.Bot, *, strict: bool = True) -> list[str]:
+        """Add each policy's check to the command with its qualified name, in
+        `bot` or its command tree. Returns the names of the commands that were
+        not found, which raise PolicyError if `strict`.
+
+        """
+        missing = []
+        for name in self._compiled["commands"]:
+            command = bot.get_command(name)
+            if command is None:
+                missing.append(name)
+            else:
+                self.decorator(name)(command)
+        for name in self._compiled["app_commands"]:
+            command = _get_app_command(bot.tree, name)
+            if command is None:
+                missing.append(name)
+            else:
+                self.decorator(name, app=True)(command)
+        if missing and strict:
+            raise PolicyError(f"{self.source}: no commands named "
+                              f"{', '.join(map(repr, missing))}")
+        return missing
+
+
+def _get_app_command(tree: typing.Any, name: str) -> typing.Any:
+    command = tree
+    for part in name.split():
+        get = getattr(command, "get_command", None)
+        command = get(part) if get is not None else None
+        if command is None:
+            return None
+    return command
+
+
+class PolicyLoader:
+    """Reads and validates policy documents, keeping the validated form of
+    each in `cache_dir` under the hash of its content, so that unchanged
+    documents are not parsed and validated again.
+
+    A document has a `commands` table for prefix and hybrid commands and an
+    `app_commands` table for application commands, each mapping a qualified
+    command name to a check tree::
+
+        [commands."mod ban"]
+        adaptive = true
+        all = [
+            { check = "user_has_role", args = [["Moderator", "Admin"]] },
+            { any = [
+                { check = "membership", args = ["d"], ge = 30 },
+                { check = "user_has_guild_perms", ban_members = true },
+            ] },
+            { not = { check = "in_dm" } },
+        ]
+
+    A tree node holds exactly one of `all`, `any` (arrays of nodes), `not`
+    (a node) or `check` (the name of a check in `checks`). A `check` node
+    passes `args` positionally and its other keys as keyword arguments,
+    except `gt`, `ge`, `lt` and `le`, which are applied as comparisons. The
+    root of a command's tree may also set the `adaptive` and `concurrent`
+    options of `ctx.Check`/`itx.Check`.
+
+    """
+    def __init__(self, cache_dir: str | os.PathLike | None = None, *,
+                 checks: dict[str, type[types.Check]] | None = None) -> None:
+        """
+        Arguments
+        ---------
+        cache_dir : str | PathLike, default=None
+            The directory to keep validated documents in. If None, documents
+            are validated every time they are loaded.
+        checks : dict[str, type[Check]], default=None
+            The checks documents can refer to, by name. Defaults to `CHECKS`;
+            extend a copy of it to allow your own.
+
+        """
+        self.cache_dir = None if cache_dir is None else os.fspath(cache_dir)
+        self.checks = dict(CHECKS if checks is None else checks)
+        self.hits = 0
+        self.misses = 0
+        # the cache is only valid for the same set of checks
+        names = ",".join(f"{k}={v.__module__}.{v.__qualname__}"
+                         for k, v in sorted(self.checks.items()))
+        self._salt = f"{FORMAT_VERSION};{names};".encode()
+        # shared by the checks of every document this loader validates or
+        # builds, so that each ID file is opened once
+        self._files: dict[str, _id_file.IdFile] = {}
+
+    def load(self, path: str | os.PathLike, /) -> Policy:
+        """Load a `.toml` or `.json` policy document.
+
+        """
+        path = os.fspath(path)
+        format = "json" if path.endswith(".json") else "toml"
+        with open(path, "rb") as f:
+            return self.loads(f.read(), format=format, source=path)
+
+    def loads(self, data: str | bytes, /, *,
+              format: typing.Literal["toml", "json"] = "toml",
+              source: str = "<policy>") -> Policy:
+        """Load a policy document from a string.
+
+        """
+        if isinstance(data, str):
+            data = data.encode()
+        if format not in ("toml", "json"):
+            raise ValueError(f"Invalid format: {format!r}")
+        digest = hashlib.sha256(self._salt + format.encode() + b";" + data
+                                ).hexdigest()
+        compiled = self._read_cache(digest)
+        if compiled is None:
+            self.misses += 1
+            compiled = self._compile(data, format, source)
+            self._write_cache(digest, compiled)
+        else:
+            self.hits += 1
+        return Policy(compiled, self.checks, source, self._files)
+
+    def _compile(self, data: bytes, format: str, source: str) -> dict:
+        try:
+            if format == "toml":
+                document = tomllib.loads(data.decode())
+            else:
+                document = json.loads(data)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise PolicyError(f"{source}: {exc}") from None
+        return _Compiler(self.checks, self._files).document(document,
+                                                            source)
+
+    def _read_cache(self, digest: str) -> dict | None:
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(os.path.join(self.cache_dir, f"{digest}.policy"),
+                      "rb") as f:
+                return marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+    def _write_cache(self, digest: str, compiled: dict) -> None:
+        if self.cache_dir is None:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir,
+                                       prefix=".dpycheck-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    marshal.dump(compiled, f)
+                os.replace(tmp, os.path.join(self.cache_dir,
+                                             f"{digest}.policy"))
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except (OSError, ValueError):
+            # the cache is an optimization; an unwritable directory is not
+            # an error
+            pass
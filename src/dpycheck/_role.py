@@ -11,69 +11,166 @@ __copyright__ = "Copyright (c) 2022-present Tanner B. Corcoran"
 
 import typing
 import discord
+from discord.ext import commands
 from . import types
 from . import exceptions
 from . import utils
 
 
-def _get_role(roles: typing.Iterable[discord.Role],
-              identifier: int | str) -> typing.Optional[discord.Role]:
-    if isinstance(identifier, int):
-        return discord.utils.get(roles, id=identifier)
-    return discord.utils.get(roles, name=identifier)
+class RoleIndex:
+    """An index of role names to role IDs for each guild.
 
-def _predicate(utx: types.utx, guild_id: int | None, role: int | str | typing.Iterable[int | str],
+    Guilds are indexed the first time a role check looks up a name in them, and
+    dropped again whenever one of their roles is created, updated or deleted.
+    Role checks attach an index to their bot automatically; it can be acquired
+    through `RoleIndex.get`.
+
+    A plain `discord.Client` cannot register listeners, so no index is
+    attached to it and role names are resolved from `guild.roles` on every
+    call. To index names there, `attach` an index yourself and call
+    `invalidate` from the client's `on_guild_role_create`,
+    `on_guild_role_update` and `on_guild_role_delete` events, or pass role
+    IDs instead of names.
+
+    """
+    def __init__(self) -> None:
+        self._names: dict[int, dict[str, int]] = {}
+
+    @staticmethod
+    def get(client: commands.Bot | discord.Client) -> "RoleIndex | None":
+        """Acquire the index attached to `client`, attaching a new one if
+        needed. Returns `None` if `client` cannot register event listeners
+        and has no index attached.
+
+        """
+        index = getattr(client, "__dpy_check_role_index__", None)
+        if index is None and hasattr(client, "add_listener"):
+            index = RoleIndex()
+            index.attach(client)
+        return index
+
+    def attach(self, client: commands.Bot | discord.Client) -> None:
+        """Attach this index to `client`, registering its listeners if
+        `client` supports them. Otherwise, `invalidate` must be called when a
+        guild's roles change.
+
+        """
+        setattr(client, "__dpy_check_role_index__", self)
+        if not hasattr(client, "add_listener"):
+            return
+        for name in dir(self):
+            if name.startswith("on_"):
+                client.add_listener(getattr(self, name), name)
+
+    def names(self, guild: discord.Guild) -> dict[str, int]:
+        """The role name to role ID map of `guild`. The returned map is
+        replaced, not mutated, when the guild's roles change.
+
+        """
+        names = self._names.get(guild.id)
+        if names is None:
+            names = {}
+            # if names are duplicated, the highest role wins, as it did with
+            # `discord.utils.get(guild.roles, name=...)`
+            for role in guild.roles:
+                names.setdefault(role.name, role.id)
+            self._names[guild.id] = names
+        return names
+
+    def invalidate(self, guild_id: int) -> None:
+        self._names.pop(guild_id, None)
+
+    async def on_guild_role_create(self, role: discord.Role) -> None:
+        self.invalidate(role.guild.id)
+
+    async def on_guild_role_update(self, before: discord.Role,
+                                   after: discord.Role) -> None:
+        self.invalidate(after.guild.id)
+
+    async def on_guild_role_delete(self, role: discord.Role) -> None:
+        self.invalidate(role.guild.id)
+
+    async def on_guild_remove(self, guild: discord.Guild) -> None:
+        self.invalidate(guild.id)
+
+
+def _split(role: int | str | typing.Iterable[int | str]
+           ) -> tuple[frozenset[int], tuple[str, ...]]:
+    roles = (role,) if isinstance(role, (int, str)) else tuple(role)
+    return (frozenset(r for r in roles if isinstance(r, int)),
+            tuple(r for r in roles if isinstance(r, str)))
+
+
+def _role_ids(self: "user_has_role | bot_has_role", utx: types.utx,
+              guild: discord.Guild) -> frozenset[int]:
+    if not self._names:
+        return self._ids
+    index = RoleIndex.get(utils.get_client(utx))
+    if index is None:
+        names = {}
+        for role in guild.roles:
+            names.setdefault(role.name, role.id)
+    else:
+        names = index.names(guild)
+        resolved = self._resolved.get(guild.id)
+        if resolved is not None and resolved[0] is names:
+            return resolved[1]
+    ids = self._ids.union(names[n] for n in self._names if n in names)
+    if index is not None:
+        self._resolved[guild.id] = (names, ids)
+    return ids
+
+
+def _predicate(self: "user_has_role | bot_has_role", utx: types.utx,
                user_id: int) -> bool:
-        if guild_id:
-            client = utils.get_client(utx)
-            guild = client.get_guild(guild_id)
-        else:
-            guild = utx.guild
-        if not guild:
-            return False
-
-        member = guild.get_member(user_id)
-        if not member:
-            return False
-
-        user_role_ids = [role.id for role in member.roles]
-        
-        if utils.isiterable(role):
-            roles = [_get_role(guild.roles, id) for id in role]
-            role_ids = [role.id for role in roles if role is not None]
-            if set(user_role_ids).intersection(role_ids):
-                return True
-            return False
-
-        _role = _get_role(guild.roles, role)
-        if not _role:
-            return False
-        if _role.id in user_role_ids:
-            return True
+    if self._guild_id:
+        client = utils.get_client(utx)
+        guild = client.get_guild(self._guild_id)
+    else:
+        guild = utx.guild
+    if not guild:
+        return False
+
+    member = guild.get_member(user_id)
+    if not member:
         return False
+    ids = _role_ids(self, utx, guild)
+    # `_roles` holds the IDs `member.roles` is built from, without the
+    # @everyone role, whose ID is the guild's
+    return guild.id in ids or not ids.isdisjoint(member._roles)
 
 
 class user_has_role(types.Check):
+    is_sync = True
+
     def __init__(self, role: int | str | typing.Iterable[int | str],
                  guild_id: typing.Optional[int] = None, /) -> None:
         self._exc = exceptions.UserMissingRole
         self._args = (role, guild_id)
-        self._role: int = role
+        self._ids, self._names = _split(role)
         self._guild_id: typing.Optional[int] = guild_id
+        # guild ID -> (name map it was resolved against, role IDs)
+        self._resolved: dict[int, tuple[dict[str, int], frozenset[int]]] = {}
     
-    async def predicate(self, utx: types.utx, /) -> bool:
-        return _predicate(utx, self._guild_id, self._role,
-                          utils.get_author(utx).id)
+    def sync_predicate(self, utx: types.utx, /) -> types.CheckResult:
+        return self.result(_predicate(self, utx, utils.get_author(utx).id))
+
+    def bulk_predicate(self, members: typing.Any) -> typing.Any:
+        members.check_guild(self._guild_id)
+        return members.has_any_role(self._ids, self._names)
 
 
 class bot_has_role(types.Check):
+    is_sync = True
+
     def __init__(self, role: int | str | typing.Iterable[int | str],
                  guild_id: typing.Optional[int] = None, /) -> None:
         self._exc = exceptions.BotMissingRole
         self._args = (role, guild_id)
-        self._role: int = role
+        self._ids, self._names = _split(role)
         self._guild_id: typing.Optional[int] = guild_id
+        # guild ID -> (name map it was resolved against, role IDs)
+        self._resolved: dict[int, tuple[dict[str, int], frozenset[int]]] = {}
 
-    async def predicate(self, utx: types.utx, /) -> bool:
-        return _predicate(utx, self._guild_id, self._role,
-                          utils.get_me(utx).id)
+    def sync_predicate(self, utx: types.utx, /) -> types.CheckResult:
+        return self.result(_predicate(self, utx, utils.get_me(utx).id))
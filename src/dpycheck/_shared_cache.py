@@ -0,0 +1,326 @@
+"""Caching of check results in memory shared between processes.
+
+:copyright: (c) 2022-present Tanner B. Corcoran
+:license: MIT, see LICENSE for more details.
+"""
+
+__author__ = "Tanner B. Corcoran"
+__license__ = "MIT License"
+__copyright__ = "Copyright (c) 2022-present Tanner B. Corcoran"
+
+
+from . import types
+from . import exceptions
+from . import utils
+from . import _modifiers
+from . import _compiler
+from . import _shm
+import hashlib
+import inspect
+import marshal
+import struct
+import typing
+import array
+import time
+import re
+
+
+# the exceptions a shared result may carry, by index
+_EXCEPTIONS = tuple(sorted(
+    (v for v in vars(exceptions).values()
+     if isinstance(v, type) and issubclass(v, exceptions.Generic)),
+    key=lambda exc: exc.__name__
+))
+_EXCEPTION_INDEX = {exc: i for i, exc in enumerate(_EXCEPTIONS)}
+
+_MAGIC = b"dpycrc\x00\x01"
+# magic, slot count, slot size
+_HEADER = struct.Struct("<8sQQ")
+_HEADER_SIZE = 64
+# sequence, key hash, expiry time, exception index, arguments length, passed
+_SLOT = struct.Struct("<QQdHHBxxx")
+_SEQUENCE = struct.Struct("<Q")
+SLOT_SIZE = 256
+ARGS_SIZE = SLOT_SIZE - _SLOT.size
+
+
+def _qualname(obj: typing.Any) -> str:
+    # `multiprocessing` imports the main module of spawned processes under
+    # another name
+    module = obj.__module__
+    if module == "__mp_main__":
+        module = "__main__"
+    return f"{module}.{obj.__qualname__}"
+
+
+def _describe(value: typing.Any) -> str:
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        return repr(value)
+    if isinstance(value, (tuple, list)):
+        return f"({','.join(map(_describe, value))})"
+    if isinstance(value, (set, frozenset)):
+        return f"{{{','.join(sorted(map(_describe, value)))}}}"
+    if isinstance(value, dict):
+        items = sorted(f"{_describe(k)}:{_describe(v)}"
+                       for k, v in value.items())
+        return f"{{{','.join(items)}}}"
+    if isinstance(value, type):
+        return _qualname(value)
+    if inspect.isfunction(value):
+        # functions made by the same code differ by the values they close over
+        code = hashlib.blake2b(marshal.dumps(value.__code__),
+                               digest_size=16).hexdigest()
+        cells = tuple(cell.cell_contents for cell in value.__closure__ or ())
+        return (f"{_qualname(value)}:{code}"
+                f"{_describe(cells)}{_describe(value.__defaults__)}")
+    if inspect.ismethod(value):
+        return f"{_describe(value.__func__)}@{_describe(value.__self__)}"
+    if inspect.isbuiltin(value):
+        return _qualname(value)
+    if isinstance(value, types.CheckResult):
+        return (f"CheckResult({value.passed},{_describe(value.exc)},"
+                f"{_describe(value.args)})")
+    if isinstance(value, (_modifiers.Not, _modifiers.All, _modifiers.Any)):
+        # modifiers are described by the tree they compile to
+        return _describe(_compiler.compile_all(value).root)
+    if isinstance(value, types.Check):
+        return (f"{_describe(type(value))}({_describe(value._exc)},"
+                f"{_describe(value._args)},{_describe(value._fingerprint)})")
+    if isinstance(value, re.Pattern):
+        return f"re({value.pattern!r},{value.flags})"
+    if isinstance(value, utils.SortedIds):
+        return f"SortedIds({_describe(value._ids)})"
+    if isinstance(value, array.array):
+        digest = hashlib.blake2b(value.tobytes(), digest_size=16).hexdigest()
+        return f"array({value.typecode},{digest})"
+    if isinstance(value, _compiler.Program):
+        return _describe(value.root)
+    if isinstance(value, _compiler._Leaf):
+        return f"Leaf({value.negated},{_describe(value.check)})"
+    if isinstance(value, _compiler._Node):
+        return f"Node({value.is_any},{_describe(value.children)})"
+    if isinstance(value, _compiler._Const):
+        return f"Const({value.value})"
+    raise TypeError(f"cannot fingerprint {type(value).__name__!r} values")
+
+
+def fingerprint(obj: typing.Any) -> bytes:
+    """A digest of a check or compiled program's type and configuration, which
+    is the same in every process running the same code. A check's
+    configuration is its `_exc`, `_args` and `_fingerprint`.
+
+    Raises TypeError if the configuration holds values that cannot be
+    described the same way in every process.
+
+    """
+    return hashlib.blake2b(_describe(obj).encode(), digest_size=16).digest()
+
+
+class SharedResultCache:
+    """A cache of check results in a fixed-size hash table in shared memory,
+    shared by every process on the host opening the same `name`, with the
+    `get` and `put` methods of `ResultCache`. Requires a POSIX system.
+
+    Checks are identified by their `fingerprint`, or by the name given to
+    `cached`. Results are read without locking: each slot carries a sequence
+    number that writers make odd while writing, and a read that sees it odd or
+    changed is a miss. Writers take a lock shared by every process with a
+    blocking `flock`, on the calling thread (usually the event loop's). It is
+    only held while one slot is written, and released by the kernel if its
+    holder dies, so `put` waits for at most a few slot writes.
+
+    Only results whose exception is one of `dpycheck.exceptions` and whose
+    arguments can be `marshal`-ed into `ARGS_SIZE` bytes are stored. Entries
+    are not invalidated by gateway events, so `ttl` should be short. The
+    `hits`, `misses`, `stores`, `evictions` and `conflicts` counters are
+    cumulative for this process.
+
+    """
+    def __init__(self, name: str = "dpycheck-results", /, *,
+                 slots: int = 1 << 16, ttl: float = 30.0,
+                 probes: int = 8) -> None:
+        """
+        Arguments
+        ---------
+        name : str, default="dpycheck-results"
+            The name of the shared memory segment.
+        slots : int, default=1 << 16
+            The number of results the table can hold, at `SLOT_SIZE` bytes
+            each. Must be the same in every process.
+        ttl : float, default=30.0
+            The number of seconds a result is kept for.
+        probes : int, default=8
+            The number of slots searched for a key.
+
+        """
+        self._lock = _shm.HostLock(name)
+        self.name = name
+        self.slots = slots
+        self.ttl = ttl
+        self.probes = min(probes, slots)
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.conflicts = 0
+        self._shm = _shm.open_segment(
+            name, _HEADER_SIZE + slots * SLOT_SIZE)
+        self._buf = self._shm.buf
+        with self._lock:
+            header = _HEADER.unpack_from(self._buf, 0)
+            if header[0] == bytes(8):
+                _HEADER.pack_into(self._buf, 0, _MAGIC, slots, SLOT_SIZE)
+                header = (_MAGIC, slots, SLOT_SIZE)
+        if header != (_MAGIC, slots, SLOT_SIZE):
+            self.close()
+            raise ValueError(f"shared memory {name!r} already exists with a "
+                             f"different layout")
+        # id of check -> (check, fingerprint); the check is kept so that its
+        # id is not reused
+        self._fingerprints: dict[int, tuple[typing.Any, bytes]] = {}
+
+    def __len__(self) -> int:
+        now = time.time()
+        return sum(
+            1 for i in range(self.slots)
+            if _SLOT.unpack_from(self._buf, _HEADER_SIZE + i * SLOT_SIZE)[2]
+            > now
+        )
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "conflicts": self.conflicts
+        }
+
+    def register(self, obj: typing.Any) -> bytes:
+        """Compute the fingerprint identifying the results of `obj` (a check,
+        compiled program or name) now, rather than on its first `get` or
+        `put`. `cached` and the `ctx`/`itx` decorators call this, so that a
+        check that cannot be fingerprinted raises TypeError when it is
+        declared.
+
+        """
+        entry = self._fingerprints.get(id(obj))
+        if entry is None:
+            entry = self._fingerprints[id(obj)] = (obj, fingerprint(obj))
+        return entry[1]
+
+    def _hash(self, key: typing.Any) -> int:
+        obj, user_id, channel_id, guild_id = key
+        digest = hashlib.blake2b(self.register(obj), digest_size=8)
+        digest.update(struct.pack("<QQQ", user_id, channel_id or 0,
+                                  guild_id or 0))
+        # 0 marks an empty slot
+        return int.from_bytes(digest.digest(), "little") or 1
+
+    def get(self, key: typing.Any) -> types.CheckResult | None:
+        hash = self._hash(key)
+        buf = self._buf
+        now = time.time()
+        slot = hash % self.slots
+        for _ in range(self.probes):
+            offset = _HEADER_SIZE + slot * SLOT_SIZE
+            sequence, h, expires, exc, length, passed = _SLOT.unpack_from(
+                buf, offset)
+            if h == hash:
+                start = offset + _SLOT.size
+                args = bytes(buf[start:start + min(length, ARGS_SIZE)])
+                if (sequence & 1
+                        or _SEQUENCE.unpack_from(buf, offset)[0] != sequence):
+                    self.conflicts += 1
+                    break
+                if expires <= now:
+                    break
+                try:
+                    result = types.CheckResult(bool(passed), _EXCEPTIONS[exc],
+                                               marshal.loads(args))
+                except (IndexError, ValueError, EOFError, TypeError):
+                    break
+                self.hits += 1
+                return result
+            if h == 0:
+                break
+            slot = (slot + 1) % self.slots
+        self.misses += 1
+        return None
+
+    def _find(self, hash: int, now: float) -> int:
+        # must be called with the lock held
+        buf = self._buf
+        slot = hash % self.slots
+        reusable = -1
+        evict = slot
+        evict_expires = float("inf")
+        for _ in range(self.probes):
+            _, h, expires, *_ = _SLOT.unpack_from(
+                buf, _HEADER_SIZE + slot * SLOT_SIZE)
+            if h == hash:
+                return slot
+            if h == 0:
+                return slot if reusable < 0 else reusable
+            if expires <= now:
+                if reusable < 0:
+                    reusable = slot
+            elif expires < evict_expires:
+                evict = slot
+                evict_expires = expires
+            slot = (slot + 1) % self.slots
+        if reusable < 0:
+            self.evictions += 1
+            return evict
+        return reusable
+
+    def put(self, key: typing.Any, result: types.CheckResult) -> None:
+        exc = _EXCEPTION_INDEX.get(result.exc)
+        if exc is None:
+            return
+        try:
+            args = marshal.dumps(result.args)
+        except ValueError:
+            return
+        if len(args) > ARGS_SIZE:
+            return
+        hash = self._hash(key)
+        buf = self._buf
+        with self._lock:
+            now = time.time()
+            offset = _HEADER_SIZE + self._find(hash, now) * SLOT_SIZE
+            # a writer that died mid-write leaves the sequence odd
+            sequence = _SEQUENCE.unpack_from(buf, offset)[0] | 1
+            _SEQUENCE.pack_into(buf, offset, sequence)
+            start = offset + _SLOT.size
+            buf[start:start + len(args)] = args
+            _SLOT.pack_into(buf, offset, sequence, hash, now + self.ttl, exc,
+                            len(args), result.passed)
+            _SEQUENCE.pack_into(buf, offset, sequence + 1)
+        self.stores += 1
+
+    def clear(self) -> None:
+        """Drop every result, in every process.
+
+        """
+        with self._lock:
+            for i in range(self.slots):
+                offset = _HEADER_SIZE + i * SLOT_SIZE
+                sequence = _SEQUENCE.unpack_from(self._buf, offset)[0] | 1
+                _SLOT.pack_into(self._buf, offset, sequence + 1, 0, 0.0, 0, 0,
+                                False)
+
+    def close(self) -> None:
+        self._buf.release()
+        self._shm.close()
+        self._lock.close()
+
+    def unlink(self) -> None:
+        """Remove the shared memory segment once every process has closed
+        it.
+
+        """
+        _shm.unlink_segment(self._shm)
+        self._lock.unlink()
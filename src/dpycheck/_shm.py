@@ -0,0 +1,90 @@
+"""Shared memory segments and locks shared by every process on a host.
+
+:copyright: (c) 2022-present Tanner B. Corcoran
+:license: MIT, see LICENSE for more details.
+"""
+
+__author__ = "Tanner B. Corcoran"
+__license__ = "MIT License"
+__copyright__ = "Copyright (c) 2022-present Tanner B. Corcoran"
+
+
+from multiprocessing import shared_memory
+import threading
+import tempfile
+import typing
+import sys
+import os
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def open_segment(name: str, size: int) -> shared_memory.SharedMemory:
+    """Open the shared memory segment `name`, creating it with `size` bytes
+    if it does not exist. The segment outlives this process.
+
+    """
+    kwargs = {"track": False} if sys.version_info >= (3, 13) else {}
+    try:
+        shm = shared_memory.SharedMemory(name, create=True, size=size,
+                                         **kwargs)
+    except FileExistsError:
+        shm = shared_memory.SharedMemory(name, **kwargs)
+    if not kwargs:
+        # before 3.13, the resource tracker would unlink the segment when
+        # this process exits, even though other processes still use it
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def unlink_segment(shm: shared_memory.SharedMemory) -> None:
+    """Remove a segment opened with `open_segment` once every process has
+    closed it.
+
+    """
+    if sys.version_info < (3, 13):
+        # unlinking unregisters the segment, which was done on opening
+        from multiprocessing import resource_tracker
+        resource_tracker.register(shm._name, "shared_memory")
+    shm.unlink()
+
+
+class HostLock:
+    """A lock held by one thread of one process on the host at a time, on a
+    file named after a shared memory segment.
+
+    """
+    __slots__ = ("path", "_fd", "_thread_lock")
+
+    def __init__(self, name: str) -> None:
+        if fcntl is None:
+            raise OSError("locks shared between processes require a POSIX "
+                          "system")
+        self.path = os.path.join(tempfile.gettempdir(), f"{name}.lock")
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        # `flock` does not exclude threads sharing the file descriptor
+        self._thread_lock = threading.Lock()
+
+    def __enter__(self) -> None:
+        self._thread_lock.acquire()
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+
+    def __exit__(self, *exc_info: typing.Any) -> None:
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+    def unlink(self) -> None:
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
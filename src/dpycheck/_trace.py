@@ -0,0 +1,425 @@
+"""Traces of check tree evaluations, for explaining why a check failed.
+
+:copyright: (c) 2022-present Tanner B. Corcoran
+:license: MIT, see LICENSE for more details.
+"""
+
+__author__ = "Tanner B. Corcoran"
+__license__ = "MIT License"
+__copyright__ = "Copyright (c) 2022-present Tanner B. Corcoran"
+
+
+from discord.ext import commands
+from discord import app_commands
+from . import types
+from . import utils
+from . import exceptions
+from . import _compiler
+from . import _metrics
+import collections
+import datetime
+import random
+import typing
+import time
+
+
+# check -> (result or raised exception, duration, whether it was evaluated)
+Results = dict[types.Check, tuple[types.CheckResult | Exception, int, bool]]
+
+
+class TraceNode:
+    """One node of an evaluated check tree.
+
+    `kind` is `"all"`, `"any"`, `"check"` or `"const"`. `status` is
+    `"passed"`, `"failed"`, `"error"`, or `"skipped"` for nodes that were
+    short-circuited. `exc` and `args` describe the failure a failed node
+    reports, and `duration_ns` is the time spent evaluating the node.
+    `evaluated` is False for stateful checks that `explain` assumed to pass
+    instead of evaluating.
+
+    """
+    __slots__ = ("kind", "check", "negated", "status", "exc", "args",
+                 "duration_ns", "children", "evaluated")
+
+    def __init__(self, kind: str, check: types.Check | None, negated: bool,
+                 status: str, exc: type[Exception] | None, args: tuple,
+                 duration_ns: int, children: list["TraceNode"],
+                 evaluated: bool = True) -> None:
+        self.kind = kind
+        self.check = check
+        self.negated = negated
+        self.status = status
+        self.exc = exc
+        self.args = args
+        self.duration_ns = duration_ns
+        self.children = children
+        self.evaluated = evaluated
+
+    @property
+    def name(self) -> str:
+        name = (type(self.check).__name__ if self.check is not None
+                else self.kind.capitalize())
+        return f"Not({name})" if self.negated else name
+
+    @property
+    def short_circuited(self) -> bool:
+        return self.status == "skipped"
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {
+            "type": self.kind,
+            "check": self.name,
+            "args": [repr(a) for a in self.args],
+            "result": self.status,
+            "exception": None if self.exc is None else self.exc.__name__,
+            "duration_ns": self.duration_ns,
+            "short_circuited": self.short_circuited,
+            "evaluated": self.evaluated,
+            "children": [c.to_dict() for c in self.children]
+        }
+
+
+class Trace:
+    """The trace of one evaluation of a compiled check tree, in declaration
+    order.
+
+    """
+    def __init__(self, root: TraceNode, result: types.CheckResult | None,
+                 command: str, author_id: int) -> None:
+        self.root = root
+        self.result = result
+        self.command = command
+        self.author_id = author_id
+        self.created_at = datetime.datetime.now(datetime.timezone.utc)
+
+    def __repr__(self) -> str:
+        return (f"<Trace command={self.command!r} author_id={self.author_id} "
+                f"status={self.root.status!r}>")
+
+    def __str__(self) -> str:
+        return self.format()
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {
+            "command": self.command,
+            "author_id": self.author_id,
+            "created_at": self.created_at.isoformat(),
+            "passed": None if self.result is None else self.result.passed,
+            "exception": (None if self.result is None
+                          or self.result.passed else
+                          self.result.exc.__name__),
+            "root": self.root.to_dict()
+        }
+
+    def format(self, *, width: int = 40) -> str:
+        """The trace as an indented tree, one node per line.
+
+        """
+        lines = []
+        def walk(node: TraceNode, prefix: str, last: bool, top: bool
+                 ) -> None:
+            branch = "" if top else ("└─ " if last else "├─ ")
+            label = node.name
+            if node.args:
+                args = ", ".join(map(repr, node.args))
+                if len(args) > width:
+                    args = args[:width - 3] + "..."
+                label += f"({args})"
+            exc = (node.exc.__name__ if node.exc is not None
+                   and node.status in ("failed", "error") else "")
+            if node.status == "skipped":
+                duration = ""
+            elif not node.evaluated:
+                duration = "(stateful, not evaluated)"
+            else:
+                duration = f"{node.duration_ns / 1000:.1f}µs"
+            lines.append(f"{prefix}{branch}{label}  {node.status}"
+                         f"{'  ' + exc if exc else ''}"
+                         f"{'  ' + duration if duration else ''}")
+            child_prefix = prefix + ("" if top else
+                                     ("   " if last else "│  "))
+            for i, child in enumerate(node.children):
+                walk(child, child_prefix, i == len(node.children) - 1, False)
+        walk(self.root, "", True, True)
+        return "\n".join(lines)
+
+
+def _unwrap(check: types.Check) -> types.Check:
+    # traces bypass the leaves instrumented by `Metrics`
+    return check._check if isinstance(check, _metrics.timed) else check
+
+
+def _leaf(node: _compiler._Leaf, results: Results) -> TraceNode:
+    record = results.get(node.check)
+    check = _unwrap(node.check)
+    if record is None:
+        return TraceNode("check", check, node.negated, "skipped", None,
+                         check._args, 0, [])
+    result, ns, evaluated = record
+    if isinstance(result, Exception):
+        return TraceNode("check", check, node.negated, "error",
+                         type(result), check._args, ns, [])
+    if result.passed is not node.negated:
+        return TraceNode("check", check, node.negated, "passed", None,
+                         result.args, ns, [], evaluated)
+    exc = (result.exc if not node.negated
+           else exceptions.get_reverse(check._exc))
+    return TraceNode("check", check, node.negated, "failed", exc,
+                     result.args, ns, [], evaluated)
+
+
+def _node(node: _compiler._Leaf | _compiler._Node | _compiler._Const,
+          results: Results) -> TraceNode:
+    if isinstance(node, _compiler._Leaf):
+        return _leaf(node, results)
+    origin = node.origin
+    args = origin._args if origin is not None else ()
+    if isinstance(node, _compiler._Const):
+        return TraceNode("const", origin, False,
+                         "passed" if node.value else "failed",
+                         None if node.value or origin is None
+                         else origin._exc, args, 0, [])
+
+    children = [_node(c, results) for c in node.children]
+    status = "failed" if node.is_any else "passed"
+    reported = None
+    for i, child in enumerate(children):
+        if child.status in ("skipped", "error"):
+            status = child.status
+        elif (child.status == "passed") is node.is_any:
+            status = child.status
+            reported = child
+        else:
+            continue
+        # the children after the deciding one were short-circuited
+        for later in children[i + 1:]:
+            _skip(later)
+        break
+    exc = None
+    if status == "failed":
+        if origin is not None:
+            exc = origin._exc
+        elif reported is not None:
+            exc = reported.exc
+        else:
+            exc = children[-1].exc if children else exceptions.Generic
+    elif status == "error":
+        exc = next(c.exc for c in children if c.status == "error")
+    return TraceNode("any" if node.is_any else "all", origin, False, status,
+                     exc, args, sum(c.duration_ns for c in children),
+                     children)
+
+
+def _skip(node: TraceNode) -> None:
+    node.status = "skipped"
+    node.exc = None
+    node.duration_ns = 0
+    for child in node.children:
+        _skip(child)
+
+
+def get_program(program: typing.Any) -> _compiler.Program:
+    """The compiled program under the `CachedProgram` and `MeteredProgram`
+    wrappers of `program`.
+
+    """
+    while not isinstance(program, _compiler.Program):
+        program = program.program
+    return program
+
+
+async def run(program: typing.Any, utx: types.utx, /, *,
+              stateful: bool = True) -> tuple[types.CheckResult, Trace]:
+    """Evaluate `program` as a plain program in declaration order, recording
+    the result and duration of every leaf, and return its result with the
+    trace. Caches and metrics are bypassed. If a check raises, the trace is
+    set on the exception as `__dpy_check_trace__`.
+
+    If `stateful` is False, stateful checks are assumed to pass instead of
+    being evaluated, so that their state (such as a cooldown's tokens) is
+    left untouched.
+
+    """
+    program = get_program(program)
+    results: Results = {}
+    code = program.code
+    pc = program.entry
+    result = None
+    try:
+        while pc >= 0:
+            check, sync, on_true, on_false = code[pc]
+            if not stateful and check.is_stateful:
+                result = check.result(True)
+                results[check] = (result, 0, False)
+                pc = on_true
+                continue
+            inner = _unwrap(check)
+            start = time.perf_counter_ns()
+            try:
+                if sync:
+                    result = inner.sync_predicate(utx)
+                else:
+                    result = await inner.predicate(utx)
+            except Exception as exc:
+                results[check] = (exc, time.perf_counter_ns() - start, True)
+                raise
+            if result.__class__ is bool:
+                result = inner.result(result)
+            results[check] = (result, time.perf_counter_ns() - start,
+                              True)
+            pc = on_true if result.passed else on_false
+        result = program._finish(pc, result)
+    except Exception as exc:
+        exc.__dpy_check_trace__ = _make_trace(program, results, None, utx)
+        raise
+    return result, _make_trace(program, results, result, utx)
+
+
+def _make_trace(program: _compiler.Program, results: Results,
+                result: types.CheckResult | None, utx: types.utx) -> Trace:
+    command = getattr(utx, "command", None)
+    return Trace(_node(program.root, results), result,
+                 command.qualified_name if command is not None
+                 else "<unknown>", utils.get_author(utx).id)
+
+
+class TracedResult(types.CheckResult):
+    """A result carrying the trace of the evaluation that produced it.
+
+    """
+    __slots__ = ("trace",)
+    trace: Trace
+
+    def __init__(self, result: types.CheckResult, trace: Trace) -> None:
+        super().__init__(result.passed, result.exc, result.args)
+        object.__setattr__(self, "trace", trace)
+
+
+class TracedProgram:
+    """A compiled program whose invocations are sampled by a `Tracer`.
+    Traced invocations return a `TracedResult`.
+
+    """
+    __slots__ = ("program", "tracer", "is_stateful")
+
+    def __init__(self, program: typing.Any, tracer: "Tracer") -> None:
+        self.program = program
+        self.tracer = tracer
+        self.is_stateful = program.is_stateful
+
+    def run(self, utx: types.utx, /) -> typing.Awaitable[types.CheckResult]:
+        if not self.tracer.should_trace(utx):
+            return self.program.run(utx)
+        return self._run(utx)
+
+    async def _run(self, utx: types.utx, /) -> types.CheckResult:
+        result, trace = await self.tracer.run(self.program, utx)
+        return TracedResult(result, trace)
+
+
+def attach(exc: BaseException, result: types.CheckResult) -> BaseException:
+    """Set the trace of `result`, if it has one, on `exc`, and return `exc`.
+
+    """
+    trace = getattr(result, "trace", None)
+    if trace is not None:
+        exc.__dpy_check_trace__ = trace
+    return exc
+
+
+def get_trace(exc: BaseException) -> Trace | None:
+    """The trace set on `exc` (or the exception it wraps) by a traced
+    invocation, if any.
+
+    """
+    trace = getattr(exc, "__dpy_check_trace__", None)
+    if trace is None:
+        original = getattr(exc, "original", None)
+        if original is not None:
+            trace = getattr(original, "__dpy_check_trace__", None)
+    return trace
+
+
+async def explain(utx: types.utx, /, command: commands.Command
+                  | app_commands.Command | None = None) -> list[Trace]:
+    """Evaluate the `...Check.all` and `...Check.any` decorators of `command`
+    (by default, the invoked command) against `utx` and return the trace of
+    each, in the order they are evaluated. Stateful checks, such as
+    cooldowns, are not evaluated, so that explaining a command does not use
+    them up; they are assumed to pass and marked as not evaluated in the
+    trace.
+
+    """
+    if command is None:
+        command = utx.command
+    traces = []
+    for program in utils.get_programs(command):
+        traces.append((await run(program, utx, stateful=False))[1])
+    return traces
+
+
+class Tracer:
+    """Traces a sample of the invocations of the `ctx.Check`/`itx.Check`
+    decorators it is passed to.
+
+    Traced invocations are evaluated in declaration order, one check at a
+    time, bypassing caches and metrics. The trace of a failing invocation is
+    set on the raised exception, where `ErrorHandler` can report it. The most
+    recent `maxlen` traces are kept in `traces`.
+
+    """
+    def __init__(self, rate: float = 0.0, *, maxlen: int = 100,
+                 failures_only: bool = False,
+                 hook: typing.Callable[[Trace], None] | None = None) -> None:
+        """
+        Arguments
+        ---------
+        rate : float, default=0.0
+            The fraction of invocations to trace, between 0 and 1.
+        maxlen : int, default=100
+            The number of traces to keep.
+        failures_only : bool, default=False
+            If True, only the traces of failing invocations are kept and
+            passed to `hook`.
+        hook : callable, default=None
+            Called with every kept trace.
+
+        """
+        if not 0 <= rate <= 1:
+            raise ValueError("rate must be between 0 and 1")
+        self.rate = rate
+        self.failures_only = failures_only
+        self.hook = hook
+        self.traces: collections.deque[Trace] = collections.deque(
+            maxlen=maxlen)
+        self._watched: set[int] = set()
+
+    def watch(self, *user_ids: int) -> None:
+        """Trace every invocation by the given users.
+
+        """
+        self._watched.update(user_ids)
+
+    def unwatch(self, *user_ids: int) -> None:
+        self._watched.difference_update(user_ids)
+
+    def should_trace(self, utx: types.utx, /) -> bool:
+        if self._watched and utils.get_author(utx).id in self._watched:
+            return True
+        return self.rate > 0 and random.random() < self.rate
+
+    async def run(self, program: typing.Any, utx: types.utx, /
+                  ) -> tuple[types.CheckResult, Trace]:
+        try:
+            result, trace = await run(program, utx)
+        except Exception as exc:
+            self._keep(exc.__dpy_check_trace__)
+            raise
+        if not (self.failures_only and result.passed):
+            self._keep(trace)
+        return result, trace
+
+    def _keep(self, trace: Trace) -> None:
+        self.traces.append(trace)
+        if self.hook is not None:
+            self.hook(trace)
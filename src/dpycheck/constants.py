@@ -11,3 +11,11 @@ __copyright__ = "Copyright (c) 2022-present Tanner B. Corcoran"
 
 EMBED_COLOR__NEG = 0xeb4747
 CREATOR_REFERENCE = "https://github.com/tanrbobanr/dpy-check"
+# ID sets with more IDs than this are kept sorted in an array rather than hashed
+LARGE_ID_SET = 100_000
+# Discord's limits on a single message
+MESSAGE_EMBEDS = 10
+MESSAGE_FILES = 10
+MESSAGE_EMBED_CHARS = 6000
+MESSAGE_CHARS = 2000
+EMBED_TITLE_CHARS = 256
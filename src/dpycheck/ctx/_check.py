@@ -11,24 +11,77 @@ __copyright__ = "Copyright (c) 2022-present Tanner B. Corcoran"
 
 from .. import types
 from .. import exceptions
+from .. import _compiler
 from discord.ext import commands
+import typing
+# the cache, metrics and tracing modules are imported when they are used,
+# since the shared result cache needs `multiprocessing` and `mmap`
+if typing.TYPE_CHECKING:
+    from .. import _cache
+    from .. import _shared_cache
+    from .. import _metrics
+    from .. import _trace
 
 
 class Check:
     @staticmethod
-    def any(*checks: types.Check):
+    def any(*checks: types.Check, adaptive: bool = False,
+            concurrent: bool = False,
+            cache: "_cache.ResultCache | _shared_cache.SharedResultCache"
+            = None,
+            metrics: "_metrics.Metrics" = None,
+            tracer: "_trace.Tracer" = None):
+        program = _compiler.compile_any(*checks, adaptive=adaptive,
+                                        concurrent=concurrent)
+        if metrics is not None:
+            from .. import _metrics
+            program = metrics.instrument_program(program)
+        if cache is not None:
+            from .. import _cache
+            program = _cache.CachedProgram(program, cache)
+        if metrics is not None:
+            program = _metrics.MeteredProgram(program, metrics)
+        if tracer is not None:
+            from .. import _trace
+            program = _trace.TracedProgram(program, tracer)
         async def predicate(ctx: types.ctx) -> bool:
-            for c in checks:
-                if await c.predicate(ctx) is True:
-                    return True
-            raise exceptions.Generic()
+            result = await program.run(ctx)
+            if not result.passed:
+                exc = exceptions.Generic()
+                if tracer is not None:
+                    _trace.attach(exc, result)
+                raise exc
+            return True
+        predicate.__dpy_check_program__ = program
         return commands.check(predicate)
 
     @staticmethod
-    def all(*checks: types.Check):
+    def all(*checks: types.Check, adaptive: bool = False,
+            concurrent: bool = False,
+            cache: "_cache.ResultCache | _shared_cache.SharedResultCache"
+            = None,
+            metrics: "_metrics.Metrics" = None,
+            tracer: "_trace.Tracer" = None):
+        program = _compiler.compile_all(*checks, adaptive=adaptive,
+                                        concurrent=concurrent)
+        if metrics is not None:
+            from .. import _metrics
+            program = metrics.instrument_program(program)
+        if cache is not None:
+            from .. import _cache
+            program = _cache.CachedProgram(program, cache)
+        if metrics is not None:
+            program = _metrics.MeteredProgram(program, metrics)
+        if tracer is not None:
+            from .. import _trace
+            program = _trace.TracedProgram(program, tracer)
         async def predicate(ctx: types.ctx) -> bool:
-            for c in checks:
-                if await c.predicate(ctx) is False:
-                    raise c._exc(None, c._args)
+            result = await program.run(ctx)
+            if not result.passed:
+                exc = result.exc(None, result.args)
+                if tracer is not None:
+                    _trace.attach(exc, result)
+                raise exc
             return True
+        predicate.__dpy_check_program__ = program
         return commands.check(predicate)
@@ -60,6 +60,11 @@ class IsGuildOwner(Generic): ...
 class UsernameDoesNotContain(Generic): ...
 class UsernameContains(Generic): ...
 
+class NotInIdFile(Generic): ...
+class InIdFile(Generic): ...
+
+class RateLimited(Generic): ...
+
 class MembershipGT(Generic): ...
 class MembershipLT(Generic): ...
 class MembershipGE(Generic): ...
@@ -98,6 +103,8 @@ reverse_map = {
     "IsGuildOwner": IsNotGuildOwner,
     "UsernameDoesNotContain": UsernameContains,
     "UsernameContains": UsernameDoesNotContain,
+    "NotInIdFile": InIdFile,
+    "InIdFile": NotInIdFile,
     "MembershipGT": MembershipLE,
     "MembershipLT": MembershipGE,
     "MembershipGE": MembershipLT,
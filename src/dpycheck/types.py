@@ -20,11 +20,83 @@ utx = ctx | itx
 VT = typing.TypeVar("VT")
 
 
+class CheckResult:
+    """The outcome of evaluating a check once.
+
+    Results are immutable, so they can be shared between concurrent
+    invocations. `exc` and `args` describe the failure (or, for a passing
+    result, what `Not` would report).
+
+    """
+    __slots__ = ("passed", "exc", "args")
+    passed: bool
+    exc: type[Exception]
+    args: tuple
+
+    def __init__(self, passed: bool, exc: type[Exception], args: tuple = ()
+                 ) -> None:
+        object.__setattr__(self, "passed", passed)
+        object.__setattr__(self, "exc", exc)
+        object.__setattr__(self, "args", args)
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError("CheckResult is immutable")
+
+    def __bool__(self) -> bool:
+        return self.passed
+
+    def __repr__(self) -> str:
+        return (f"CheckResult(passed={self.passed}, exc={self.exc.__name__}, "
+                f"args={self.args!r})")
+
+
 class Check:
+    """The base class of all checks.
+
+    Checks that never need to await anything should set `is_sync` to True and
+    implement `sync_predicate`, which modifiers and the `ctx`/`itx` decorators
+    will call directly. `predicate` is always awaitable. Both return a
+    `CheckResult` and must not store per-invocation state on the check.
+
+    Checks whose evaluation has side effects (such as using up a cooldown)
+    should set `is_stateful` to True, so that they are never reordered,
+    evaluated ahead of time, or cached.
+
+    Checks configured by more than their `_args` (such as the permissions of a
+    permission check) should set `_fingerprint` to a tuple of that
+    configuration, so that `SharedResultCache` can tell them apart.
+
+    """
     _exc: Exception
     _args: tuple
-    def predicate(self, utx: utx) -> bool:
-        ...
+    _fingerprint: tuple = ()
+    is_sync: bool = False
+    is_stateful: bool = False
+
+    def result(self, passed: bool, /) -> CheckResult:
+        """The result of this check, carrying its `_exc` and `_args`.
+
+        """
+        try:
+            return self._results[passed]
+        except AttributeError:
+            self._results = (CheckResult(False, self._exc, self._args),
+                             CheckResult(True, self._exc, self._args))
+            return self._results[passed]
+
+    def sync_predicate(self, utx: utx) -> CheckResult:
+        raise NotImplementedError
+
+    async def predicate(self, utx: utx) -> CheckResult:
+        return self.sync_predicate(utx)
+
+    def bulk_predicate(self, members: typing.Any) -> typing.Any:
+        """Evaluate this check against every member of a `MemberSnapshot` at
+        once, returning a boolean numpy array over `members.ids`.
+
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot be evaluated "
+                                  f"in bulk")
 
 class PartialErrorHandler:
     def __init__(self, channel_id: int, *mention_ids: int,
@@ -10,8 +10,12 @@ __copyright__ = "Copyright (c) 2022-present Tanner B. Corcoran"
 
 
 from . import types
+from . import constants
 from discord.ext import commands
 import discord
+import typing
+import bisect
+import array
 
 
 def get_author(utx: types.utx) -> discord.User | discord.Member:
@@ -34,6 +38,97 @@ def get_sender(utx: types.utx):
     return utx.response.send_message
 
 
+def get_programs(command: commands.Command | discord.app_commands.Command
+                 ) -> list:
+    """Get the compiled programs of the `...Check.all` and `...Check.any`
+    decorators applied to `command`, in the order they are evaluated. The
+    `stats` of adaptive programs show the order each one has chosen.
+
+    """
+    return [getattr(c, "__dpy_check_program__") for c in command.checks
+            if hasattr(c, "__dpy_check_program__")]
+
+
+def compile_perms(perms: dict[str, bool]) -> tuple[int, int]:
+    """Compile permission flags into a `(mask, expected)` pair, such that a
+    `discord.Permissions` value matches `perms` if `value & mask == expected`.
+
+    """
+    on = off = 0
+    for name, value in perms.items():
+        flag = discord.Permissions.VALID_FLAGS[name]
+        if value:
+            on |= flag
+        else:
+            off |= flag
+    if on & off:
+        # aliased flags were required both on and off, which nothing matches
+        return on | off, -1
+    return on | off, on
+
+
+def missing_perms(perms: dict[str, bool], value: int) -> list[str]:
+    """The flags in `perms` that a `discord.Permissions` value does not match,
+    in the order they were given.
+
+    """
+    flags = discord.Permissions.VALID_FLAGS
+    return [p for p, v in perms.items() if bool(value & flags[p]) != v]
+
+
+class SortedIds:
+    """An immutable, sorted set of IDs stored as unsigned 64-bit integers,
+    searched with `bisect`. Uses 8 bytes per ID, where a `frozenset` of `int`
+    uses around 60.
+
+    """
+    __slots__ = ("_ids",)
+
+    def __init__(self, ids: typing.Iterable[int]) -> None:
+        self._ids = array.array("Q", sorted(set(ids)))
+
+    def __contains__(self, id: int) -> bool:
+        i = bisect.bisect_left(self._ids, id)
+        return i < len(self._ids) and self._ids[i] == id
+
+    def __iter__(self) -> typing.Iterator[int]:
+        return iter(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __repr__(self) -> str:
+        return f"SortedIds(<{len(self._ids)} IDs>)"
+
+
+def freeze_ids(ids: int | typing.Iterable[int]
+               ) -> int | tuple[int, ...] | SortedIds:
+    """Normalize an ID or iterable of IDs once, so that it can be reported in
+    errors and iterated any number of times. Iterables become a tuple of their
+    unique IDs in the given order, or a `SortedIds` if there are more than
+    `constants.LARGE_ID_SET` of them.
+
+    """
+    if isinstance(ids, (int, SortedIds)):
+        return ids
+    ids = tuple(dict.fromkeys(ids))
+    if len(ids) > constants.LARGE_ID_SET:
+        return SortedIds(ids)
+    return ids
+
+
+def id_lookup(ids: int | tuple[int, ...] | SortedIds
+              ) -> frozenset[int] | SortedIds:
+    """A container to test membership of `freeze_ids(...)` with `in`.
+
+    """
+    if isinstance(ids, int):
+        return frozenset((ids,))
+    if isinstance(ids, SortedIds):
+        return ids
+    return frozenset(ids)
+
+
 def isiterable(obj: object) -> bool:
     try:
         iter(obj)
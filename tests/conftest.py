@@ -0,0 +1,61 @@
+# fakes and fixtures shared by the tests; the package and the fakes of
+# `benchmarks/fakes.py` are importable through the `pythonpath` of
+# `pyproject.toml`
+from benchmarks import fakes
+from dpycheck import exceptions
+import dpycheck
+import asyncio
+import pytest
+
+
+class Flag(dpycheck.types.Check):
+    """Passes or fails as told, or raises if told neither, counting its
+    evaluations.
+
+    """
+    def __init__(self, passed: bool | None = True,
+                 exc: type[Exception] = exceptions.Generic, *,
+                 sync: bool = True, delay: float = 0.0) -> None:
+        self._exc = exc
+        self._args = (passed,)
+        self._passed = passed
+        self._delay = delay
+        self.is_sync = sync
+        self.calls = 0
+
+    def sync_predicate(self, utx: dpycheck.types.utx, /
+                       ) -> dpycheck.types.CheckResult:
+        self.calls += 1
+        if self._passed is None:
+            raise RuntimeError("boom")
+        return self.result(self._passed)
+
+    async def predicate(self, utx: dpycheck.types.utx, /
+                        ) -> dpycheck.types.CheckResult:
+        if self._delay:
+            await asyncio.sleep(self._delay)
+        return self.sync_predicate(utx)
+
+
+@pytest.fixture
+def flag() -> type[Flag]:
+    return Flag
+
+
+@pytest.fixture
+def world() -> tuple[fakes.FakeClient, fakes.FakeGuild, fakes.FakeChannel]:
+    # member 1 owns the guild and the bot, and is an administrator
+    return fakes.make_world(members=10)
+
+
+@pytest.fixture
+def contexts(world: tuple) -> list[fakes.FakeContext]:
+    # the context of member `i` is at index `i - 1`
+    client, guild, channel = world
+    return [fakes.FakeContext(client, m, channel, guild)
+            for m in guild.members if not m.bot]
+
+
+@pytest.fixture
+def ctx(contexts: list[fakes.FakeContext]) -> fakes.FakeContext:
+    return contexts[1]
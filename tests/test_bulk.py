@@ -0,0 +1,103 @@
+# evaluation of checks over a member snapshot
+from benchmarks import fakes
+from dpycheck import utils
+from dpycheck import constants
+import dpycheck
+import discord
+import pytest
+
+
+Not, Any, All = dpycheck.Not, dpycheck.Any, dpycheck.All
+
+
+@pytest.fixture(scope="module")
+def world() -> tuple[fakes.FakeClient, fakes.FakeGuild, fakes.FakeChannel]:
+    client, guild, channel = fakes.make_world(members=120)
+    embed = discord.Permissions.embed_links.flag
+    send = discord.Permissions.send_messages.flag
+    channel.overwrites = {guild.id: (send, embed), 2003: (embed, 0),
+                          7: (0, send)}
+    # a member whose join time is unknown
+    guild.get_member(4).joined_at = None
+    return client, guild, channel
+
+
+def per_member(check: dpycheck.types.Check, world: tuple) -> list[int]:
+    client, guild, channel = world
+    return [m.id for m in guild.members
+            if check.sync_predicate(fakes.FakeContext(
+                client, m, channel, guild)).passed]
+
+
+def bulk(check: dpycheck.types.Check, world: tuple) -> list[int]:
+    client, guild, channel = world
+    snapshot = dpycheck.MemberSnapshot.from_guild(guild, channel)
+    return snapshot.select(check).tolist()
+
+
+# the membership bounds are half a day off the join times, which are whole
+# days apart
+CHECKS = {
+    "role": dpycheck.user_has_role([2003, "role-7", 2011]),
+    "missing role": dpycheck.user_has_role("no such role"),
+    "guild perms": dpycheck.user_has_guild_perms(ban_members=True),
+    "denied guild perms": dpycheck.user_has_guild_perms(administrator=False,
+                                                        view_channel=True),
+    "aliased guild perms": dpycheck.user_has_guild_perms(
+        manage_roles=True, manage_permissions=False),
+    "channel perms": dpycheck.user_has_channel_perms(embed_links=True),
+    "denied channel perms": dpycheck.user_has_channel_perms(
+        send_messages=True, administrator=False),
+    "is_user": dpycheck.is_user([3, 5, 8, 13, 10 ** 6]),
+    "is_user range": dpycheck.is_user(range(0, 120, 3)),
+    "membership": dpycheck.membership("h") >= 30 * 24 + 12,
+    "membership range": (12 * 24 < dpycheck.membership("h")) < 40 * 24 + 12,
+    "membership tiers": (dpycheck.membership("d", tiers=(7.5, 30.5)) >= 1
+                         ) < 2,
+    "not": Not(dpycheck.user_has_role(2003)),
+    "any": Any(dpycheck.is_user([1, 2]),
+               dpycheck.user_has_channel_perms(embed_links=True),
+               dpycheck.membership("h") <= 5 * 24 + 12),
+    "all": All(dpycheck.user_has_guild_perms(view_channel=True),
+               Not(dpycheck.is_user(range(0, 120, 2)))),
+    "nested": Any(All(dpycheck.user_has_role(["role-3", 2010]),
+                      Not(dpycheck.user_has_guild_perms(ban_members=True))),
+                  All(dpycheck.membership("d") >= 50.5,
+                      Not(Any(dpycheck.is_user(range(60, 90)),
+                              dpycheck.user_has_channel_perms(
+                                  send_messages=False)))),
+                  Not(All())),
+    "cached": dpycheck.cached(dpycheck.user_has_role(2003),
+                              dpycheck.ResultCache()),
+}
+
+
+@pytest.mark.parametrize("name", CHECKS)
+def test_bulk_matches_per_member(world: tuple, name: str) -> None:
+    check = CHECKS[name]
+    expected = per_member(check, world)
+    assert bulk(check, world) == expected
+    # the checks do not all pass or all fail
+    if name not in ("missing role", "aliased guild perms"):
+        assert 0 < len(expected) < len(world[1].members) - 1
+
+
+def test_large_id_sets_are_searched_in_bulk(world: tuple) -> None:
+    ids = range(1, constants.LARGE_ID_SET + 2)
+    check = dpycheck.is_user(ids)
+    assert isinstance(check._ids, utils.SortedIds)
+    assert bulk(check, world) == per_member(check, world)
+
+
+def test_snapshots_refuse_other_guilds_and_channels(world: tuple) -> None:
+    client, guild, channel = world
+    snapshot = dpycheck.MemberSnapshot.from_guild(guild)
+    with pytest.raises(ValueError):
+        snapshot.select(dpycheck.user_has_guild_perms(1, ban_members=True))
+    with pytest.raises(ValueError):
+        snapshot.select(dpycheck.user_has_channel_perms(embed_links=True))
+    snapshot = dpycheck.MemberSnapshot.from_guild(guild, channel)
+    with pytest.raises(ValueError):
+        snapshot.select(dpycheck.user_has_channel_perms(1, embed_links=True))
+    with pytest.raises(NotImplementedError):
+        snapshot.select(dpycheck.in_dm())
@@ -0,0 +1,69 @@
+# behaviour of the in-process result cache
+from benchmarks import fakes
+from dpycheck import _cache
+from dpycheck import _compiler
+import dpycheck
+import asyncio
+import time
+
+
+def test_results_are_cached_per_author(
+        flag: type[dpycheck.types.Check],
+        contexts: list[fakes.FakeContext]) -> None:
+    a, b = contexts[:2]
+    check = flag()
+    wrapped = dpycheck.cached(check, dpycheck.ResultCache())
+    for ctx in (a, a, b, b, a):
+        assert wrapped.sync_predicate(ctx).passed
+    assert check.calls == 2
+
+
+def test_lru_eviction(
+        flag: type[dpycheck.types.Check],
+        contexts: list[fakes.FakeContext]) -> None:
+    cache = dpycheck.ResultCache(maxsize=2)
+    contexts = contexts[:3]
+    check = flag()
+    wrapped = dpycheck.cached(check, cache)
+    for ctx in contexts:
+        wrapped.sync_predicate(ctx)
+    assert len(cache) == 2 and cache.evictions == 1
+    wrapped.sync_predicate(contexts[0])
+    assert check.calls == 4
+
+
+def test_expiry(flag: type[dpycheck.types.Check],
+                ctx: fakes.FakeContext) -> None:
+    cache = dpycheck.ResultCache(ttl=0.0)
+    check = flag()
+    wrapped = dpycheck.cached(check, cache)
+    wrapped.sync_predicate(ctx)
+    time.sleep(0.001)
+    wrapped.sync_predicate(ctx)
+    assert check.calls == 2 and cache.expirations == 1
+
+
+def test_invalidation_by_id(
+        flag: type[dpycheck.types.Check],
+        contexts: list[fakes.FakeContext]) -> None:
+    cache = dpycheck.ResultCache()
+    a, b = contexts[:2]
+    check = flag()
+    wrapped = dpycheck.cached(check, cache)
+    wrapped.sync_predicate(a)
+    wrapped.sync_predicate(b)
+    cache.invalidate(user_id=a.author.id)
+    assert len(cache) == 1
+    cache.invalidate(guild_id=a.guild.id)
+    assert len(cache) == 0
+
+
+def test_cached_program(flag: type[dpycheck.types.Check],
+                        ctx: fakes.FakeContext) -> None:
+    cache = dpycheck.ResultCache()
+    check = flag()
+    program = _cache.CachedProgram(
+        _compiler.compile_all(check, dpycheck.Not(dpycheck.in_dm())), cache)
+    for _ in range(3):
+        assert asyncio.run(program.run(ctx)).passed
+    assert check.calls == 1 and cache.hits == 2
@@ -0,0 +1,97 @@
+# behaviour of compiled check trees against the hand-written modifiers they
+# replace
+from benchmarks import fakes
+from dpycheck import _compiler
+from dpycheck import exceptions
+import dpycheck
+import itertools
+import asyncio
+import pytest
+
+
+def trees(a: dpycheck.types.Check, b: dpycheck.types.Check,
+          c: dpycheck.types.Check) -> list[dpycheck.types.Check]:
+    Not, All, Any = dpycheck.Not, dpycheck.All, dpycheck.Any
+    return [
+        All(a, b, c),
+        Any(a, b, c),
+        Not(All(a, Not(b))),
+        Any(All(a, b), Not(c)),
+        All(Any(a, Not(b)), Any(Not(a), c)),
+        Not(Any(Not(a), All(b, Not(c)))),
+    ]
+
+
+def test_program_matches_modifiers(
+        flag: type[dpycheck.types.Check], ctx: fakes.FakeContext) -> None:
+    excs = (exceptions.UserMissingRole, exceptions.NotInDM,
+            exceptions.IsNotUser)
+    for values in itertools.product((True, False), repeat=3):
+        leaves = [flag(v, e) for v, e in zip(values, excs)]
+        for tree in trees(*leaves):
+            expected = tree.sync_predicate(ctx)
+            result = asyncio.run(_compiler.compile_all(tree).run(ctx))
+            assert (result.passed, result.exc, result.args) == (
+                expected.passed, expected.exc, expected.args), (values, tree)
+
+
+def test_all_reports_first_failure_in_declaration_order(
+        flag: type[dpycheck.types.Check], ctx: fakes.FakeContext) -> None:
+    first = flag(False, exceptions.NotInDM)
+    second = flag(False, exceptions.IsNotUser)
+    for options in ({}, {"adaptive": True}, {"concurrent": True}):
+        program = _compiler.compile_all(flag(True), first, second, **options)
+        for _ in range(100):
+            result = asyncio.run(program.run(ctx))
+            assert result.exc is exceptions.NotInDM, options
+
+
+def test_short_circuit(
+        flag: type[dpycheck.types.Check], ctx: fakes.FakeContext) -> None:
+    last = flag(True)
+    result = asyncio.run(_compiler.compile_all(flag(False), last).run(ctx))
+    assert not result.passed and last.calls == 0
+    result = asyncio.run(_compiler.compile_any(flag(True), last).run(ctx))
+    assert result.passed and last.calls == 0
+
+
+def test_concurrent_cancels_undecided_checks(
+        flag: type[dpycheck.types.Check], ctx: fakes.FakeContext) -> None:
+    # a failure decides All once every check declared before it has passed
+    fast = flag(False, exceptions.IsNotUser, sync=False)
+    slow = flag(True, sync=False, delay=10.0)
+    program = _compiler.compile_all(fast, slow, concurrent=True)
+
+    async def run() -> dpycheck.types.CheckResult:
+        return await asyncio.wait_for(program.run(ctx), 1.0)
+    result = asyncio.run(run())
+    assert result.exc is exceptions.IsNotUser
+
+
+def test_constant_nodes(ctx: fakes.FakeContext) -> None:
+    assert asyncio.run(_compiler.compile_all().run(ctx)).passed
+    assert not asyncio.run(_compiler.compile_any().run(ctx)).passed
+
+
+def test_duplicate_leaves_are_evaluated_once(
+        flag: type[dpycheck.types.Check], ctx: fakes.FakeContext) -> None:
+    a = flag(True)
+    asyncio.run(_compiler.compile_all(a, a, dpycheck.All(a)).run(ctx))
+    assert a.calls == 1
+
+
+def test_duplicate_stateful_leaves_are_each_evaluated(
+        ctx: fakes.FakeContext) -> None:
+    cooldown = dpycheck.cooldown(2, 60.0)
+    program = _compiler.compile_all(cooldown, cooldown)
+    # both take a token, as the uncompiled tree would
+    assert asyncio.run(program.run(ctx)).passed
+    assert not asyncio.run(program.run(ctx)).passed
+
+
+def test_stateful_checks_are_not_reordered(
+        flag: type[dpycheck.types.Check]) -> None:
+    program = _compiler.compile_all(flag(True), dpycheck.cooldown(1, 60.0))
+    assert program.is_stateful
+    with pytest.raises(ValueError):
+        dpycheck.cached(dpycheck.cooldown(1, 60.0), dpycheck.ResultCache())
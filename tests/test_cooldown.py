@@ -0,0 +1,164 @@
+# behaviour of the cooldown check and its backends
+from benchmarks import fakes
+import dpycheck
+import sqlite3
+import threading
+import asyncio
+import time
+import os
+import pytest
+
+
+def test_bucket_table() -> None:
+    table = dpycheck.BucketTable(3, 30.0)
+    assert [table.acquire("a", 0.0) for _ in range(3)] == [0.0] * 3
+    assert table.acquire("a", 0.0) == pytest.approx(10.0)
+    assert table.acquire("b", 0.0) == 0.0
+    # one token refills every 10 seconds
+    assert table.acquire("a", 10.0) == 0.0
+    assert table.acquire("a", 10.0) > 0
+    table.reset("a")
+    assert table.acquire("a", 10.0) == 0.0
+    # full buckets are dropped by a sweep
+    assert table.sweep(100.0) == 2 and len(table) == 0
+
+
+def test_cooldown_check(contexts: list[fakes.FakeContext]) -> None:
+    check = dpycheck.cooldown(2, 60.0)
+    results = [check.sync_predicate(contexts[0]).passed for _ in range(3)]
+    assert results == [True, True, False]
+    assert check.sync_predicate(contexts[1]).passed
+    result = check.sync_predicate(contexts[0])
+    assert result.exc is dpycheck.exceptions.RateLimited
+    assert result.args[1:] == (2, 60.0) and 0 < result.args[0] <= 30.0
+    # not cached, reordered or evaluated ahead of time
+    assert check.is_stateful
+
+
+def test_sqlite_backend_shares_buckets(tmp_path) -> None:
+    path = tmp_path / "cooldowns.db"
+    first = dpycheck.SQLiteBackend(path)
+    second = dpycheck.SQLiteBackend(path)
+    try:
+        a = first.buckets("x", 2, 60.0)
+        b = second.buckets("x", 2, 60.0)
+        assert a.acquire(1) == 0.0 and b.acquire(1) == 0.0
+        assert a.acquire(1) > 0 and b.acquire(1) > 0
+        assert b.acquire(2) == 0.0
+        a.reset(1)
+        assert b.acquire(1) == 0.0
+    finally:
+        first.close()
+        second.close()
+
+
+class DeletingConnection:
+    """A connection on which another process deletes every bucket just before
+    the first lookup of a bucket's state.
+
+    """
+    def __init__(self, db: sqlite3.Connection) -> None:
+        self.db = db
+        self.deleted = False
+
+    def execute(self, sql: str, *args: object) -> sqlite3.Cursor:
+        if sql.startswith("SELECT") and not self.deleted:
+            self.deleted = True
+            self.db.execute("DELETE FROM cooldowns")
+        return self.db.execute(sql, *args)
+
+    def close(self) -> None:
+        self.db.close()
+
+
+def test_sqlite_backend_records_a_bucket_deleted_mid_acquisition(
+        tmp_path) -> None:
+    backend = dpycheck.SQLiteBackend(tmp_path / "cooldowns.db")
+    try:
+        buckets = backend.buckets("x", 1, 60.0)
+        assert buckets.acquire(1) == 0.0
+        backend._db = DeletingConnection(backend._db)
+        # the bucket was empty, then deleted; the token taken is recorded
+        assert buckets.acquire(1) == 0.0 and backend._db.deleted
+        assert buckets.acquire(1) > 0
+    finally:
+        backend.close()
+
+
+def test_sqlite_backend_uses_one_thread(tmp_path) -> None:
+    backend = dpycheck.SQLiteBackend(tmp_path / "cooldowns.db")
+    threads = set()
+    db = backend._db
+
+    class Recording:
+        def execute(self, *args: object) -> sqlite3.Cursor:
+            threads.add(threading.get_ident())
+            return db.execute(*args)
+
+        def close(self) -> None:
+            db.close()
+    backend._db = Recording()
+    try:
+        buckets = backend.buckets("x", 1, 60.0)
+        buckets.acquire(1)
+        asyncio.run(buckets.acquire_async(2))
+        buckets.reset(1)
+        backend.sweep()
+        assert len(threads) == 1 and threading.get_ident() not in threads
+    finally:
+        backend.close()
+
+
+def test_sqlite_backend_does_not_block_the_event_loop(
+        tmp_path, ctx: fakes.FakeContext) -> None:
+    path = tmp_path / "cooldowns.db"
+    backend = dpycheck.SQLiteBackend(path, timeout=0.3)
+    check = dpycheck.cooldown(1, 60.0, backend=backend, name="x")
+    assert not check.is_sync
+    # another process holding the write lock
+    blocker = sqlite3.connect(os.fspath(path), isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+
+    async def run() -> None:
+        ticks = 0
+
+        async def tick() -> None:
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+        ticker = asyncio.create_task(tick())
+        start = time.perf_counter()
+        with pytest.raises(sqlite3.OperationalError):
+            await check.predicate(ctx)
+        assert time.perf_counter() - start < 2.0
+        # the loop kept running while the acquisition waited for the lock
+        assert ticks >= 10
+        blocker.execute("ROLLBACK")
+        assert (await check.predicate(ctx)).passed
+        assert not (await check.predicate(ctx)).passed
+        ticker.cancel()
+    try:
+        asyncio.run(run())
+    finally:
+        blocker.close()
+        backend.close()
+
+
+def test_shared_memory_backend() -> None:
+    name = f"dpycheck-test-{os.getpid()}"
+    first = dpycheck.SharedMemoryBackend(name, slots=64)
+    second = dpycheck.SharedMemoryBackend(name, slots=64)
+    try:
+        a = first.buckets("x", 1, 60.0)
+        b = second.buckets("x", 1, 60.0)
+        assert a.acquire("k") == 0.0
+        assert b.acquire("k") > 0
+        b.reset("k")
+        assert a.acquire("k") == 0.0
+        with pytest.raises(ValueError):
+            a.reset()
+    finally:
+        second.close()
+        first.close()
+        first.unlink()
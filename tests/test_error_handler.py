@@ -0,0 +1,161 @@
+# packing of error reports into messages
+from benchmarks import fakes
+from dpycheck import _error_handler
+from dpycheck import constants
+import dpycheck
+import asyncio
+import discord
+import io
+
+
+class RecordingChannel:
+    def __init__(self) -> None:
+        self.messages: list[dict] = []
+
+    async def send(self, **kwargs: object) -> None:
+        self.messages.append(kwargs)
+
+
+class RecordingClient:
+    def __init__(self) -> None:
+        self.channel = RecordingChannel()
+
+    def get_channel(self, id: int) -> RecordingChannel:
+        return self.channel
+
+
+class FakeAttachment(discord.Attachment):
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+
+    async def read(self) -> bytes:
+        return b"data"
+
+
+def make_files(n: int) -> list[discord.File]:
+    return [discord.File(io.BytesIO(b""), filename=f"{i}.txt")
+            for i in range(n)]
+
+
+def test_pack_labels_every_file() -> None:
+    files = make_files(12)
+    labels = [f"label {i}" for i in range(12)]
+    messages = _error_handler._pack("<@1>", [discord.Embed()], files, labels)
+    assert [len(m["files"]) for m in messages] == [10, 2]
+    assert messages[0]["content"].splitlines() == ["<@1>"] + labels[:10]
+    assert messages[1]["content"].splitlines() == labels[10:]
+
+
+def test_pack_respects_content_limit() -> None:
+    labels = ["x" * 1500, "y" * 1500]
+    messages = _error_handler._pack(None, [], make_files(2), labels)
+    assert [m["content"] for m in messages] == labels
+
+
+def test_pack_counts_the_first_label() -> None:
+    mentions = "<@1> " * 300
+    labels = ["x" * 1000, "y" * 10]
+    messages = _error_handler._pack(mentions, [discord.Embed()],
+                                    make_files(2), labels)
+    assert all(len(m["content"]) <= constants.MESSAGE_CHARS
+               for m in messages)
+    assert messages[0]["content"] == mentions and not messages[0]["files"]
+    assert messages[1]["content"].splitlines() == labels
+    assert len(messages[1]["files"]) == 2
+
+
+def test_report_truncates_titles_and_labels_attachments() -> None:
+    client = RecordingClient()
+    handler = dpycheck.ErrorHandler([[1]])
+    long = discord.Embed(title="t" * 300)
+    short = discord.Embed(title="short")
+    asyncio.run(handler._report(client, discord.Embed(title="info"),
+                                [long, FakeAttachment("log.txt"), short]))
+    (message,) = client.channel.messages
+    titles = [e.title for e in message["embeds"]]
+    assert titles[0] == "info"
+    assert len(titles[1]) == constants.EMBED_TITLE_CHARS
+    assert titles[1].startswith("Additional information 1 of 3: ttt")
+    assert titles[2] == "Additional information 3 of 3: short"
+    assert message["content"] == "Additional information 2 of 3: log.txt"
+    assert [f.filename for f in message["files"]] == ["log.txt"]
+
+
+class BrokenFormatter(dpycheck.Formatter):
+    def __digest__(self, incidents, window):
+        raise RuntimeError("broken")
+
+
+def make_error() -> Exception:
+    try:
+        raise ValueError("boom")
+    except ValueError as exc:
+        return exc
+
+
+def test_digest_counts_the_first_occurrence(
+        contexts: list[fakes.FakeContext]) -> None:
+    contexts = [contexts[0], contexts[1], contexts[1]]
+    recording = RecordingClient()
+    handler = dpycheck.ErrorHandler([[1]], dedup_window=60.0)
+    exc = make_error()
+
+    async def run() -> None:
+        assert [handler._fold(ctx, exc) for ctx in contexts] == [
+            False, True, True]
+        handler._digest_task.cancel()
+        await handler.send_digest(recording)
+    asyncio.run(run())
+    (message,) = recording.channel.messages
+    assert message["embeds"][0].description.startswith(
+        "Occurred **3** times from **2** users")
+
+
+def test_single_errors_are_not_digested(ctx: fakes.FakeContext) -> None:
+    recording = RecordingClient()
+    handler = dpycheck.ErrorHandler([[1]], dedup_window=60.0)
+
+    async def run() -> None:
+        assert not handler._fold(ctx, make_error())
+        await handler.send_digest(recording)
+    asyncio.run(run())
+    assert recording.channel.messages == []
+
+
+def test_digest_loop_survives_failures(ctx: fakes.FakeContext) -> None:
+    exc = make_error()
+
+    async def run(handler: dpycheck.ErrorHandler) -> None:
+        handler._fold(ctx, exc)
+        handler._fold(ctx, exc)
+        task = handler._digest_task
+        await asyncio.sleep(0.05)
+        # the failure was logged, and the loop ended once nothing repeated
+        assert task.done() and task.exception() is None
+        assert not any(i.repeats for i in handler._incidents.values())
+
+    # a formatter raising, and a channel that cannot be found
+    asyncio.run(run(dpycheck.ErrorHandler([[1]], formatter=BrokenFormatter(),
+                                          dedup_window=0.01)))
+    asyncio.run(run(dpycheck.ErrorHandler([[404]], dedup_window=0.01)))
+
+
+def test_forgotten_repeats_are_digested(ctx: fakes.FakeContext) -> None:
+    recording = RecordingClient()
+    handler = dpycheck.ErrorHandler([[1]], dedup_window=60.0,
+                                    max_fingerprints=1)
+    repeated = make_error()
+
+    async def run() -> None:
+        assert [handler._fold(ctx, repeated) for _ in range(3)] == [
+            False, True, True]
+        # a new error evicts the repeated one
+        assert not handler._fold(ctx, KeyError("other"))
+        assert list(handler._incidents) != [handler.fingerprint(repeated)]
+        handler._digest_task.cancel()
+        await handler.send_digest(recording)
+    asyncio.run(run())
+    (message,) = recording.channel.messages
+    (embed,) = message["embeds"]
+    assert embed.description.startswith("Occurred **3** times")
+    assert handler._evicted == []
@@ -0,0 +1,56 @@
+# behaviour of ID files
+from benchmarks import fakes
+from dpycheck import _id_file
+import dpycheck
+import random
+import os
+import pytest
+
+
+def test_membership(tmp_path) -> None:
+    path = tmp_path / "ids"
+    ids = random.Random(0).sample(range(1, 2 ** 63), 10_000)
+    dpycheck.IdFile.write(path, ids + ids[:100])
+    for bloom_bits in (0, 10):
+        file = dpycheck.IdFile(path, bloom_bits=bloom_bits, interval=0)
+        assert len(file) == 10_000
+        assert all(i in file for i in ids)
+        assert not any(i in file for i in range(1, 1000) if i not in ids)
+
+
+def test_reload_keeps_last_good_version(tmp_path) -> None:
+    path = tmp_path / "ids"
+    dpycheck.IdFile.write(path, [1, 2, 3])
+    file = dpycheck.IdFile(path, interval=0)
+    dpycheck.IdFile.write(path, [4])
+    file.reload()
+    assert 4 in file and 1 not in file and file.reloads == 1
+    # a file that is not a whole number of IDs is rejected
+    broken = tmp_path / "broken"
+    broken.write_bytes(b"\x00" * 7)
+    os.replace(broken, path)
+    file.reload()
+    assert 4 in file and file.last_error is not None
+
+
+def test_check_targets(tmp_path, contexts: list[fakes.FakeContext]) -> None:
+    path = tmp_path / "ids"
+    dpycheck.IdFile.write(path, [2, contexts[0].guild.id])
+    file = dpycheck.IdFile(path)
+    for user_id, ctx in zip((1, 2), contexts):
+        assert dpycheck.in_id_file(file).sync_predicate(ctx).passed is (
+            user_id == 2)
+        assert dpycheck.in_id_file(file, "guild").sync_predicate(ctx).passed
+        assert not dpycheck.in_id_file(file, "channel").sync_predicate(
+            ctx).passed
+    with pytest.raises(ValueError):
+        dpycheck.in_id_file(file, "role")
+
+
+def test_numpy_bloom_filter_matches_python(tmp_path) -> None:
+    path = tmp_path / "ids"
+    dpycheck.IdFile.write(path,
+                          random.Random(1).sample(range(1, 2 ** 63), 5000))
+    file = dpycheck.IdFile(path, interval=0)
+    state = file._state
+    assert state.bloom == _id_file._bloom_python(state.ids, state.bloom_shift)
@@ -0,0 +1,28 @@
+# the modules loaded by decorating a command
+import dpycheck
+import subprocess
+import sys
+import os
+
+
+SCRIPT = """
+import dpycheck
+import sys
+dpycheck.ctx.Check.all(dpycheck.in_dm())(lambda ctx: None)
+dpycheck.itx.Check.any(dpycheck.in_dm())(lambda itx: None)
+print(" ".join(sys.modules))
+"""
+
+
+def test_decorators_do_not_load_optional_modules() -> None:
+    # the directory the package was imported from
+    path = os.path.dirname(os.path.dirname(dpycheck.__file__))
+    modules = set(subprocess.run([sys.executable, "-c", SCRIPT],
+                                 capture_output=True, text=True, check=True,
+                                 env={**os.environ, "PYTHONPATH": path}
+                                 ).stdout.split())
+    assert "dpycheck" in modules
+    for name in ("sqlite3", "mmap", "multiprocessing.shared_memory",
+                 "dpycheck._cache", "dpycheck._shared_cache",
+                 "dpycheck._metrics", "dpycheck._trace"):
+        assert name not in modules, name
@@ -0,0 +1,66 @@
+# behaviour of the membership check
+from benchmarks import fakes
+import dpycheck
+import pytest
+
+
+@pytest.fixture(scope="module")
+def world() -> tuple:
+    # member `i` joined `i` days ago
+    return fakes.make_world(members=100)
+
+
+def passes(world: tuple, check: dpycheck.membership, user_id: int) -> bool:
+    client, guild, channel = world
+    ctx = fakes.FakeContext(client, guild.get_member(user_id), channel, guild)
+    return check.sync_predicate(ctx).passed
+
+
+def test_interval(world: tuple) -> None:
+    # bounds between whole days, as members joined whole days before the
+    # world was made
+    check = (dpycheck.membership("d") > 10.5) < 19.5
+    assert [i for i in range(1, 31) if passes(world, check, i)] == list(
+        range(11, 20))
+    # the tighter of two bounds on the same side is kept
+    check = (dpycheck.membership("d") >= 5) >= 15
+    assert not passes(world, check, 10) and passes(world, check, 16)
+
+
+def test_tiers(world: tuple) -> None:
+    tiers = (7, 30, 90)
+    assert [dpycheck.membership("d", tiers).tier(fakes.FakeContext(
+        world[0], world[1].get_member(i), world[2], world[1]))
+        for i in (1, 8, 31, 91)] == [0, 1, 2, 3]
+    check = dpycheck.membership("d", tiers) >= 2
+    assert not passes(world, check, 29) and passes(world, check, 31)
+    check = dpycheck.membership("d", tiers) <= 1
+    assert passes(world, check, 29) and not passes(world, check, 31)
+    # comparisons every tier satisfies add no bound
+    for check in (dpycheck.membership("d", tiers) >= 0,
+                  dpycheck.membership("d", tiers) <= 3,
+                  (dpycheck.membership("d", tiers) >= 0) <= 3):
+        assert check._args == ()
+        assert passes(world, check, 1) and passes(world, check, 99)
+    check = (dpycheck.membership("d", tiers) >= 0) < 3
+    assert check._args == (90 * 86400,)
+
+
+@pytest.mark.parametrize("op, tier", [
+    (">=", 4), (">", 3), ("<", 0), ("<=", -1), (">=", -1), ("<", 4),
+    (">=", 1.5)
+])
+def test_invalid_tiers(op: str, tier: float) -> None:
+    check = dpycheck.membership("d", tiers=(7, 30, 90))
+    with pytest.raises(ValueError):
+        {">=": check.__ge__, ">": check.__gt__, "<": check.__lt__,
+         "<=": check.__le__}[op](tier)
+
+
+def test_error_message_has_finite_durations(world: tuple) -> None:
+    check = (dpycheck.membership("d", (7, 30)) >= 1) <= 2
+    result = check.sync_predicate(fakes.FakeContext(
+        world[0], world[1].get_member(2), world[2], world[1]))
+    assert not result.passed
+    message = getattr(dpycheck.Formatter(), result.exc.__name__)(*result.args)
+    assert "nan" not in message and "inf" not in message
@@ -0,0 +1,146 @@
+# behaviour of check metrics
+from benchmarks import fakes
+from dpycheck import _compiler
+from dpycheck import exceptions
+import dpycheck
+import itertools
+import asyncio
+
+
+def decorate(*checks: dpycheck.types.Check, **options: object):
+    func = dpycheck.ctx.Check.all(*checks, **options)(lambda ctx: None)
+    return func.__commands_checks__[-1]
+
+
+def invoke(predicate, ctx: fakes.FakeContext) -> bool:
+    try:
+        return asyncio.run(predicate(ctx))
+    except dpycheck.exceptions.Generic:
+        return False
+
+
+def test_timed_records_outcomes(
+        flag: type[dpycheck.types.Check], ctx: fakes.FakeContext) -> None:
+    metrics = dpycheck.Metrics()
+    for passed in (True, False, None):
+        check = dpycheck.timed(flag(passed, exceptions.NotInDM), metrics,
+                               name="flag")
+        try:
+            check.sync_predicate(ctx)
+        except RuntimeError:
+            pass
+    series = metrics.checks["flag"]
+    assert (series.count, series.passed, series.failed, series.errors) == (
+        3, 1, 1, 1)
+    assert series.exceptions == {"NotInDM": 1, "RuntimeError": 1}
+    assert sum(series.buckets) == 3 and series.quantile(1.0) > 0
+
+
+def test_disabled_metrics_record_nothing(ctx: fakes.FakeContext) -> None:
+    metrics = dpycheck.Metrics(enabled=False)
+    assert invoke(decorate(dpycheck.Not(dpycheck.in_dm()), metrics=metrics),
+                  ctx)
+    assert metrics.snapshot() == {"checks": {}, "commands": {}}
+
+
+def test_commands_and_checks_are_recorded(
+        flag: type[dpycheck.types.Check], ctx: fakes.FakeContext) -> None:
+    seen = []
+    metrics = dpycheck.Metrics(hook=lambda *args: seen.append(args[:2]))
+    predicate = decorate(flag(True), flag(False), metrics=metrics)
+    assert not invoke(predicate, ctx)
+    snapshot = metrics.snapshot()
+    assert snapshot["commands"]["<unknown>"]["failed"] == 1
+    # checks are named after their class
+    assert snapshot["checks"]["Flag"]["passed"] == 1
+    assert snapshot["checks"]["Flag"]["failed"] == 1
+    assert seen == [("check", "Flag"), ("check", "Flag"),
+                    ("command", "<unknown>")]
+
+
+def test_negated_leaves_record_the_outcome_of_not(
+        ctx: fakes.FakeContext) -> None:
+    metrics = dpycheck.Metrics()
+    predicate = decorate(dpycheck.Not(dpycheck.in_dm()), metrics=metrics)
+    assert invoke(predicate, ctx)
+    series = metrics.checks["Not(in_dm)"]
+    assert (series.passed, series.failed) == (1, 0)
+    assert "in_dm" not in metrics.checks
+
+
+def test_instrumented_programs_report_the_same_failures(
+        flag: type[dpycheck.types.Check], ctx: fakes.FakeContext) -> None:
+    Not, All, Any = dpycheck.Not, dpycheck.All, dpycheck.Any
+    excs = (exceptions.UserMissingRole, exceptions.NotInDM,
+            exceptions.IsNotUser)
+    metrics = dpycheck.Metrics()
+    for values in itertools.product((True, False), repeat=3):
+        a, b, c = (flag(v, e) for v, e in zip(values, excs))
+        for tree in (All(a, Not(b), c), Any(Not(a), b), Not(Any(a, Not(c))),
+                     All(Any(a, Not(b)), Not(c))):
+            for options in ({}, {"adaptive": True}, {"concurrent": True}):
+                program = _compiler.compile_all(tree, **options)
+                instrumented = metrics.instrument_program(program)
+                assert type(instrumented) is type(program)
+                expected = asyncio.run(program.run(ctx))
+                result = asyncio.run(instrumented.run(ctx))
+                assert (result.passed, result.exc, result.args) == (
+                    expected.passed, expected.exc, expected.args)
+
+
+def test_metrics_do_not_change_what_is_evaluated(
+        flag: type[dpycheck.types.Check], ctx: fakes.FakeContext) -> None:
+    for enabled in (True, False):
+        metrics = dpycheck.Metrics(enabled=enabled)
+        # duplicate stateful leaves each take a token
+        cooldown = dpycheck.cooldown(2, 60.0)
+        predicate = decorate(cooldown, cooldown, metrics=metrics)
+        assert invoke(predicate, ctx) and not invoke(predicate, ctx)
+        # duplicate stateless leaves are evaluated once
+        check = flag(True)
+        invoke(decorate(check, dpycheck.All(check), metrics=metrics), ctx)
+        assert check.calls == 1
+
+
+def test_adaptive_counters_are_shared(
+        flag: type[dpycheck.types.Check], ctx: fakes.FakeContext) -> None:
+    metrics = dpycheck.Metrics()
+    predicate = decorate(flag(True), flag(True), adaptive=True,
+                         metrics=metrics)
+    for enabled in (True, False, True):
+        metrics.enabled = enabled
+        invoke(predicate, ctx)
+    program = predicate.__dpy_check_program__.program
+    assert [s["calls"] for s in program.stats()] == [3, 3]
+
+
+def test_traces_bypass_metrics(ctx: fakes.FakeContext) -> None:
+    metrics = dpycheck.Metrics()
+    command = decorate(dpycheck.Not(dpycheck.in_dm()), metrics=metrics)
+    result, trace = asyncio.run(dpycheck.Tracer().run(
+        command.__dpy_check_program__, ctx))
+    assert result.passed and trace.root.name == "Not(in_dm)"
+    assert metrics.snapshot() == {"checks": {}, "commands": {}}
+
+
+def test_prometheus(
+        flag: type[dpycheck.types.Check], ctx: fakes.FakeContext) -> None:
+    metrics = dpycheck.Metrics()
+    check = dpycheck.timed(flag(False, exceptions.NotInDM), metrics,
+                           name='say "hi"')
+    for _ in range(2):
+        check.sync_predicate(ctx)
+    lines = metrics.prometheus().splitlines()
+    label = 'check="say \\"hi\\""'
+    buckets = [line for line in lines
+               if line.startswith(f"dpycheck_check_duration_seconds_bucket"
+                                  f"{{{label},")]
+    assert len(buckets) == len(dpycheck._metrics.BUCKETS) + 1
+    counts = [int(line.rsplit(" ", 1)[1]) for line in buckets]
+    assert counts == sorted(counts) and counts[-1] == 2
+    assert f"dpycheck_check_duration_seconds_count{{{label}}} 2" in lines
+    assert (f'dpycheck_check_results_total{{{label},outcome="failed"}} 2'
+            in lines)
+    assert (f'dpycheck_check_exceptions_total{{{label},'
+            f'exception="NotInDM"}} 2' in lines)
+    assert "# TYPE dpycheck_command_duration_seconds histogram" in lines
@@ -0,0 +1,118 @@
+# behaviour of the bot owner cache
+from benchmarks import fakes
+import dpycheck
+import discord
+import asyncio
+import logging
+import types
+
+
+class Client(fakes.FakeClient):
+    """A client without owner IDs, whose application info fails as told.
+
+    """
+    def __init__(self, failures: list[BaseException]) -> None:
+        super().__init__(owner_id=0)
+        self.failures = failures
+        self.calls = 0
+
+    async def application_info(self) -> types.SimpleNamespace:
+        self.calls += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        return types.SimpleNamespace(team=None,
+                                     owner=types.SimpleNamespace(id=42))
+
+
+def test_refresh_survives_any_error(caplog) -> None:
+    async def run() -> None:
+        client = Client([AttributeError("owner"), RuntimeError("boom")])
+        cache = dpycheck.OwnerCache(interval=0.01)
+        with caplog.at_level(logging.ERROR):
+            # `attach` starts refreshing as the client is ready
+            cache.attach(client)
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if cache.ids is not None:
+                    break
+        assert cache.ids == frozenset((42,))
+        assert cache.last_error is None
+        assert not cache._task.done()
+        assert len([r for r in caplog.records
+                    if "owner IDs" in r.getMessage()]) == 2
+        cache._task.cancel()
+    asyncio.run(run())
+
+
+def test_failed_first_refresh_on_ready() -> None:
+    async def run() -> None:
+        client = Client([ValueError("not ready")])
+        client.is_ready = lambda: False
+        cache = dpycheck.OwnerCache(interval=0.01)
+        cache.attach(client)
+        await cache.on_ready()
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if cache.ids is not None:
+                break
+        assert cache.ids == frozenset((42,))
+        cache._task.cancel()
+    asyncio.run(run())
+
+
+def test_is_bot_owner() -> None:
+    async def run() -> None:
+        client, guild, channel = fakes.make_world(members=3)
+        check = dpycheck.is_bot_owner()
+        results = []
+        for user_id in (1, 2):
+            ctx = fakes.FakeContext(client, guild.get_member(user_id),
+                                    channel, guild)
+            results.append((await check.predicate(ctx)).passed)
+        assert results == [True, False]
+        dpycheck.OwnerCache.get(client)._task.cancel()
+    asyncio.run(run())
+
+
+class TeamClient(fakes.FakeClient):
+    """A client owned by a team of an admin, a read-only member and an
+    invited member.
+
+    """
+    def __init__(self) -> None:
+        super().__init__(owner_id=0)
+
+    async def application_info(self) -> types.SimpleNamespace:
+        accepted = discord.TeamMembershipState.accepted
+        members = [
+            types.SimpleNamespace(id=1, membership_state=accepted,
+                                  role=discord.TeamMemberRole.admin),
+            types.SimpleNamespace(id=2, membership_state=accepted,
+                                  role=discord.TeamMemberRole.read_only),
+            types.SimpleNamespace(id=3,
+                                  membership_state=discord
+                                  .TeamMembershipState.invited,
+                                  role=discord.TeamMemberRole.developer),
+        ]
+        return types.SimpleNamespace(team=types.SimpleNamespace(
+            members=members))
+
+
+def test_team_owners_by_role() -> None:
+    cache = dpycheck.OwnerCache()
+    cache._client = TeamClient()
+    assert asyncio.run(cache._fetch()) == frozenset((1, 3))
+
+
+def test_team_owners_without_roles(monkeypatch) -> None:
+    client = TeamClient()
+    info = asyncio.run(client.application_info())
+    # discord.py before 2.4
+    monkeypatch.delattr(discord, "TeamMemberRole")
+
+    async def application_info() -> types.SimpleNamespace:
+        return info
+    client.application_info = application_info
+    cache = dpycheck.OwnerCache()
+    cache._client = client
+    assert asyncio.run(cache._fetch()) == frozenset((1, 2))
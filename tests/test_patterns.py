@@ -0,0 +1,61 @@
+# behaviour of `username_contains` and the pattern sets it matches with
+from benchmarks import fakes
+from dpycheck._patterns import PatternSet
+import dpycheck
+import re
+
+
+def test_literals_are_casefolded() -> None:
+    patterns = PatternSet(["Foo", "STRASSE"])
+    assert patterns.search("xxfOO") == 0
+    assert patterns.search("Straße") == 1
+    assert patterns.search("bar") is None
+
+
+def test_earliest_match_wins() -> None:
+    patterns = PatternSet(["bar", re.compile("o+"), "foo"])
+    assert patterns.search("foobar") == 2
+    assert patterns.search("boobar") == 1
+    # ties go to the pattern given first
+    assert PatternSet(["ab", re.compile("a")]).search("ab") == 0
+    assert PatternSet([re.compile("a"), "ab"]).search("ab") == 0
+
+
+def test_positions_after_expanding_casefolds() -> None:
+    # "ß" casefolds to "ss" and "İ" to two characters
+    patterns = PatternSet(["x", re.compile("y")])
+    assert patterns.search("ßßx y") == 0
+    assert patterns.search("ßßy x") == 1
+    assert patterns.search("İİx y") == 0
+
+
+def test_groups_and_backreferences() -> None:
+    patterns = PatternSet(["foo", re.compile(r"(a)\1"),
+                           re.compile(r"(?P<c>b)(?P=c)"),
+                           re.compile(r"(?P<c>c)d")])
+    assert patterns.search("xaa") == 1
+    assert patterns.search("xbb") == 2
+    assert patterns.search("cd") == 3
+    assert patterns.search("ab") is None
+
+
+def test_expressions_keep_their_flags() -> None:
+    patterns = PatternSet([re.compile("Admin"), re.compile("mod", re.I),
+                           re.compile("^x$", re.M)])
+    assert patterns.search("the Admin") == 0
+    assert patterns.search("the admin") is None
+    assert patterns.search("MOD") == 1
+    assert patterns.search("a\nx\nb") == 2
+
+
+def test_username_contains(ctx: fakes.FakeContext) -> None:
+    ctx.author.display_name = "Real Admin"
+    check = dpycheck.username_contains("foo", re.compile(r"(a)\1"),
+                                       re.compile("Admin"))
+    result = check.sync_predicate(ctx)
+    assert result.passed and result.args == ("Admin",)
+    assert not dpycheck.username_contains(re.compile("admin")
+                                          ).sync_predicate(ctx).passed
+    result = dpycheck.Not(check).sync_predicate(ctx)
+    assert result.exc is dpycheck.exceptions.UsernameContains
+    assert result.args == ("Admin",)
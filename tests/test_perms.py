@@ -0,0 +1,136 @@
+# permission checks compiled into integer masks
+from benchmarks import fakes
+from dpycheck import exceptions
+from dpycheck import utils
+import dpycheck
+import itertools
+import random
+import discord
+
+
+FLAGS = ("send_messages", "ban_members", "administrator", "embed_links",
+         "manage_roles", "view_channel")
+# names of the same flag
+ALIASES = (("manage_roles", "manage_permissions"),
+           ("view_channel", "read_messages"))
+
+
+def make_world() -> tuple[fakes.FakeClient, fakes.FakeGuild,
+                          fakes.FakeChannel]:
+    client, guild, channel = fakes.make_world(members=30)
+    embed = discord.Permissions.embed_links.flag
+    send = discord.Permissions.send_messages.flag
+    # @everyone can send messages but not embed links, role 2001 can embed
+    # links, and member 5 cannot send messages
+    channel.overwrites = {guild.id: (send, embed), 2001: (embed, 0),
+                          5: (0, send)}
+    return client, guild, channel
+
+
+def expected(perms: dict[str, bool], value: discord.Permissions) -> bool:
+    return all(getattr(value, p) == v for p, v in perms.items())
+
+
+def perm_sets() -> list[dict[str, bool]]:
+    rng = random.Random(0)
+    sets = [{}]
+    for _ in range(50):
+        names = rng.sample(FLAGS, rng.randint(1, 3))
+        sets.append({name: rng.random() < 0.5 for name in names})
+    for a, b in ALIASES:
+        sets += [{a: True, b: True}, {a: False, b: False},
+                 {a: True, b: False}, {b: True, a: False}]
+    return sets
+
+
+def test_compile_perms() -> None:
+    flags = discord.Permissions.VALID_FLAGS
+    assert utils.compile_perms({}) == (0, 0)
+    assert utils.compile_perms({"ban_members": True, "kick_members": False}
+                               ) == (flags["ban_members"]
+                                     | flags["kick_members"],
+                                     flags["ban_members"])
+    for a, b in ALIASES:
+        assert utils.compile_perms({a: True}) == utils.compile_perms({b: True})
+        # an alias required both on and off is never matched
+        mask, expected = utils.compile_perms({a: True, b: False})
+        assert mask == flags[a] and expected == -1
+        assert all(value & mask != expected for value in (
+            0, flags[a], discord.Permissions.all().value))
+
+
+def test_missing_perms_are_reported_in_order() -> None:
+    value = discord.Permissions(send_messages=True).value
+    perms = {"ban_members": True, "send_messages": True, "kick_members": True,
+             "administrator": False}
+    assert utils.missing_perms(perms, value) == ["ban_members",
+                                                 "kick_members"]
+    assert utils.missing_perms({"send_messages": False}, value) == [
+        "send_messages"]
+
+
+def test_guild_perms_match_guild_permissions() -> None:
+    client, guild, channel = make_world()
+    me = guild.me
+    for perms, member, guild_id in itertools.product(
+            perm_sets(), guild.members, (None, guild.id)):
+        ctx = fakes.FakeContext(client, member, channel, guild)
+        result = dpycheck.user_has_guild_perms(guild_id, **perms
+                                               ).sync_predicate(ctx)
+        passed = expected(perms, member.guild_permissions)
+        assert result.passed == passed, (perms, member.id)
+        if not passed:
+            assert result.exc is exceptions.UserMissingGuildPerms
+            assert result.args == (guild_id, *utils.missing_perms(
+                perms, member.guild_permissions.value))
+        bot = dpycheck.bot_has_guild_perms(guild_id, **perms
+                                           ).sync_predicate(ctx)
+        assert bot.passed == expected(perms, me.guild_permissions)
+
+
+def test_channel_perms_match_permissions_for() -> None:
+    client, guild, channel = make_world()
+    for perms, member in itertools.product(perm_sets(), guild.members):
+        ctx = fakes.FakeContext(client, member, channel, guild)
+        value = channel.permissions_for(member)
+        passed = expected(perms, value)
+        for channel_id in (None, channel.id):
+            result = dpycheck.user_has_channel_perms(channel_id, **perms
+                                                     ).sync_predicate(ctx)
+            assert result.passed == passed, (perms, member.id, channel_id)
+            if not passed:
+                assert result.exc is exceptions.UserMissingChannelPerms
+                assert result.args == (channel_id, *utils.missing_perms(
+                    perms, value.value))
+        bot = dpycheck.bot_has_channel_perms(channel.id, **perms
+                                             ).sync_predicate(ctx)
+        assert bot.passed == expected(perms,
+                                      channel.permissions_for(guild.me))
+
+
+def test_overwrites_are_applied() -> None:
+    client, guild, channel = make_world()
+    role = next(m for m in guild.members if 2001 in m._roles
+                and not m.guild_permissions.administrator)
+    # @everyone, a role and a member overwrite; administrators are exempt
+    for member, embed, send in ((guild.get_member(2), False, True),
+                                (guild.get_member(5), False, False),
+                                (role, True, True),
+                                (guild.get_member(1), True, True)):
+        ctx = fakes.FakeContext(client, member, channel, guild)
+        checks = (dpycheck.user_has_channel_perms(embed_links=True),
+                  dpycheck.user_has_channel_perms(send_messages=True))
+        assert [c.sync_predicate(ctx).passed for c in checks] == [
+            embed, send], member.id
+
+
+def test_contradictory_aliases_never_pass() -> None:
+    client, guild, channel = make_world()
+    # member 1 is an administrator
+    ctx = fakes.FakeContext(client, guild.get_member(1), channel, guild)
+    for a, b in ALIASES:
+        for check in (dpycheck.user_has_guild_perms(**{a: True, b: False}),
+                      dpycheck.user_has_channel_perms(**{a: True, b: False})):
+            result = check.sync_predicate(ctx)
+            assert not result.passed
+            assert result.args[1:] == (b,)
@@ -0,0 +1,107 @@
+# behaviour of the policy document loader
+from benchmarks import fakes
+from dpycheck import _compiler
+from dpycheck import _id_file
+import dpycheck
+import asyncio
+import pytest
+
+
+DOCUMENT = """
+[commands.ban]
+adaptive = true
+all = [
+    { not = { check = "in_dm" } },
+    { any = [
+        { check = "user_has_guild_perms", ban_members = true },
+        { check = "membership", args = ["d"], ge = 3 },
+    ] },
+]
+
+[app_commands."mod warn"]
+check = "is_guild_owner"
+"""
+
+
+def test_loads_and_builds() -> None:
+    policy = dpycheck.PolicyLoader().loads(DOCUMENT)
+    assert policy.command_names == ["ban"]
+    assert policy.app_command_names == ["mod warn"]
+    check = policy.build("ban")
+    assert isinstance(check, dpycheck.All)
+
+    client, guild, channel = fakes.make_world(members=20)
+    program = _compiler.compile_all(check)
+    # member 1 is an administrator, member 2 joined 2 days ago and member 5
+    # joined 5 days ago
+    for user_id, passed in ((1, True), (2, False), (5, True)):
+        ctx = fakes.FakeContext(client, guild.get_member(user_id), channel,
+                                guild)
+        assert asyncio.run(program.run(ctx)).passed is passed, user_id
+
+
+def test_json_matches_toml() -> None:
+    loader = dpycheck.PolicyLoader()
+    toml = loader.loads('[commands.x]\ncheck = "is_user"\nargs = [1]\n')
+    json = loader.loads('{"commands": {"x": {"check": "is_user", '
+                        '"args": [1]}}}', format="json")
+    assert toml._compiled == json._compiled
+
+
+@pytest.mark.parametrize("document, message", [
+    ('[commands.x]\ncheck = "nope"\n', "unknown check 'nope'"),
+    ('[commands.x]\ncheck = "is_user"\n', "invalid arguments for 'is_user'"),
+    ('[commands.x]\ncheck = "user_has_guild_perms"\nfly = true\n',
+     "Invalid permission"),
+    ('[commands.x]\nall = []\n', "expected a non-empty array"),
+    ('[commands.x]\nall = [{ check = "in_dm" }]\nany = []\n',
+     "expected exactly one"),
+    ('[commands.x]\ncheck = "in_dm"\nadaptive = 1\n', "expected bool"),
+    ('[other]\n', "unknown section 'other'"),
+    ('[commands.x\n', "<policy>"),
+])
+def test_invalid_documents(document: str, message: str) -> None:
+    with pytest.raises(dpycheck.PolicyError, match=message):
+        dpycheck.PolicyLoader().loads(document)
+
+
+def test_cache(tmp_path) -> None:
+    first = dpycheck.PolicyLoader(tmp_path)
+    first.loads(DOCUMENT)
+    second = dpycheck.PolicyLoader(tmp_path)
+    policy = second.loads(DOCUMENT)
+    assert (first.misses, second.hits) == (1, 1)
+    assert policy.command_names == ["ban"]
+    # the cache is not shared with loaders accepting other checks
+    checks = dict(second.checks, custom=dpycheck.custom)
+    third = dpycheck.PolicyLoader(tmp_path, checks=checks)
+    third.loads(DOCUMENT)
+    assert third.misses == 1
+
+
+def test_id_files_are_opened_once(tmp_path, monkeypatch) -> None:
+    path = tmp_path / "ids"
+    dpycheck.IdFile.write(path, [1, 2, 3])
+    opened = []
+
+    class State(_id_file._State):
+        def __init__(self, *args: object) -> None:
+            opened.append(args[0])
+            super().__init__(*args)
+    monkeypatch.setattr(_id_file, "_State", State)
+    document = f"""
+[commands.a]
+all = [
+    {{ check = "in_id_file", args = ["{path}"] }},
+    {{ not = {{ check = "in_id_file", args = ["{path}", "guild"] }} }},
+]
+
+[commands.b]
+check = "in_id_file"
+args = ["{tmp_path}/./ids"]
+"""
+    policy = dpycheck.PolicyLoader().loads(document)
+    for name in policy.command_names:
+        policy.decorator(name)(lambda ctx: None)
+        policy.build(name)
+    assert len(opened) == 1
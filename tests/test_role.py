@@ -0,0 +1,87 @@
+# behaviour of the role checks and the role name index
+from benchmarks import fakes
+import dpycheck
+import pytest
+
+
+class PlainClient(fakes.FakeClient):
+    # a `discord.Client`, which cannot register listeners
+    add_listener = property()
+
+
+def make_context(client: fakes.FakeClient | None = None
+                 ) -> fakes.FakeContext:
+    world_client, guild, channel = fakes.make_world(members=5, roles=10)
+    if client is not None:
+        client.guilds = world_client.guilds
+        client.channels = world_client.channels
+        client.user = world_client.user
+    else:
+        client = world_client
+    # `guild.roles` starts with @everyone, whose ID is the guild's
+    guild.roles.insert(0, fakes.FakeRole(guild.id, "@everyone", guild))
+    # member 2 holds two roles
+    return fakes.FakeContext(client, guild.get_member(2), channel, guild)
+
+
+def test_everyone() -> None:
+    ctx = make_context()
+    for role in (ctx.guild.id, "@everyone"):
+        assert dpycheck.user_has_role(role).sync_predicate(ctx).passed
+        assert not dpycheck.Not(dpycheck.user_has_role(role)
+                                ).sync_predicate(ctx).passed
+    assert dpycheck.bot_has_role("@everyone").sync_predicate(ctx).passed
+
+
+def test_names_and_ids() -> None:
+    ctx = make_context()
+    held = [r for r in ctx.guild.roles if r.id in ctx.author._roles]
+    other = [r for r in ctx.guild.roles[1:] if r not in held]
+    assert held and other
+    assert dpycheck.user_has_role(held[0].name).sync_predicate(ctx).passed
+    assert dpycheck.user_has_role([other[0].name, held[0].id]
+                                  ).sync_predicate(ctx).passed
+    assert not dpycheck.user_has_role(other[0].name).sync_predicate(ctx).passed
+    assert not dpycheck.user_has_role("missing").sync_predicate(ctx).passed
+
+
+def test_index_is_invalidated_on_role_events() -> None:
+    ctx = make_context()
+    check = dpycheck.user_has_role("renamed")
+    assert not check.sync_predicate(ctx).passed
+    index = dpycheck.RoleIndex.get(ctx.bot)
+    role = next(r for r in ctx.guild.roles if r.id in ctx.author._roles)
+    role.name = "renamed"
+    # still resolved against the indexed names
+    assert not check.sync_predicate(ctx).passed
+    index.invalidate(ctx.guild.id)
+    assert check.sync_predicate(ctx).passed
+
+
+def test_plain_client() -> None:
+    ctx = make_context(PlainClient(owner_id=1))
+    assert dpycheck.RoleIndex.get(ctx.bot) is None
+    role = next(r for r in ctx.guild.roles if r.id in ctx.author._roles)
+    check = dpycheck.user_has_role(role.name)
+    assert check.sync_predicate(ctx).passed
+    # without an index, names are resolved on every call
+    role.name = "renamed"
+    assert not check.sync_predicate(ctx).passed
+
+    index = dpycheck.RoleIndex()
+    index.attach(ctx.bot)
+    assert dpycheck.RoleIndex.get(ctx.bot) is index
+    check = dpycheck.user_has_role("renamed")
+    assert check.sync_predicate(ctx).passed
+    role.name = "again"
+    index.invalidate(ctx.guild.id)
+    assert not check.sync_predicate(ctx).passed
+
+
+def test_bulk_everyone() -> None:
+    pytest.importorskip("numpy")
+    ctx = make_context()
+    snapshot = dpycheck.MemberSnapshot.from_guild(ctx.guild)
+    for role in (ctx.guild.id, "@everyone"):
+        assert snapshot.select(dpycheck.user_has_role(role)).tolist() == [
+            m.id for m in ctx.guild.members]
@@ -0,0 +1,79 @@
+# fingerprints identifying checks in the shared result cache
+from dpycheck import _shared_cache
+import dpycheck
+import pytest
+import re
+import os
+
+
+def fingerprint(check: dpycheck.types.Check) -> bytes:
+    return _shared_cache.fingerprint(check)
+
+
+async def allow(utx) -> bool:
+    return True
+
+
+async def deny(utx) -> bool:
+    return False
+
+
+def test_equal_checks_share_a_fingerprint() -> None:
+    assert (fingerprint(dpycheck.user_has_guild_perms(ban_members=True))
+            == fingerprint(dpycheck.user_has_guild_perms(ban_members=True)))
+    assert (fingerprint(dpycheck.Not(dpycheck.in_dm()))
+            == fingerprint(dpycheck.Not(dpycheck.in_dm())))
+
+
+def test_permissions_are_part_of_the_fingerprint() -> None:
+    ban = dpycheck.user_has_guild_perms(ban_members=True)
+    kick = dpycheck.user_has_guild_perms(kick_members=True)
+    assert fingerprint(ban) != fingerprint(kick)
+    assert (fingerprint(dpycheck.bot_has_channel_perms(embed_links=True))
+            != fingerprint(dpycheck.bot_has_channel_perms(send_messages=True)))
+
+
+def test_custom_predicates_are_part_of_the_fingerprint() -> None:
+    assert (fingerprint(dpycheck.custom(allow))
+            != fingerprint(dpycheck.custom(deny)))
+
+
+def test_pattern_flags_are_part_of_the_fingerprint() -> None:
+    assert (fingerprint(dpycheck.username_contains(re.compile("spam")))
+            != fingerprint(dpycheck.username_contains(
+                re.compile("spam", re.IGNORECASE))))
+
+
+def test_runtime_attributes_do_not_change_the_fingerprint() -> None:
+    check = dpycheck.user_has_guild_perms(ban_members=True)
+    before = fingerprint(check)
+    check.result(True)
+    check._resolved = object()
+    assert fingerprint(check) == before
+
+
+def test_wrappers_are_fingerprinted_by_the_wrapped_check() -> None:
+    ban = dpycheck.user_has_guild_perms(ban_members=True)
+    kick = dpycheck.user_has_guild_perms(kick_members=True)
+    cache = dpycheck.ResultCache()
+    assert (fingerprint(dpycheck.cached(ban, cache))
+            != fingerprint(dpycheck.cached(kick, cache)))
+
+
+def test_unfingerprintable_checks_fail_when_declared() -> None:
+    cache = dpycheck.SharedResultCache(f"dpycheck-test-{os.getpid()}",
+                                       slots=16)
+    try:
+        state = object()
+
+        async def closure(utx) -> bool:
+            return state is not None
+        check = dpycheck.custom(closure)
+        with pytest.raises(TypeError):
+            dpycheck.cached(check, cache)
+        with pytest.raises(TypeError):
+            dpycheck.ctx.Check.all(check, cache=cache)
+        dpycheck.cached(dpycheck.custom(allow), cache)
+    finally:
+        cache.close()
+        cache.unlink()
@@ -0,0 +1,91 @@
+# runs 10k concurrent invocations of the same checks and verifies that every
+# invocation gets its own error message
+import dpycheck
+import discord
+import asyncio
+import random
+import types
+
+
+INVOCATIONS = 10_000
+PERMS = {"manage_guild": True, "ban_members": True}
+
+
+async def io_bound(itx: discord.Interaction) -> bool:
+    # stands in for a database lookup, so that invocations interleave
+    await asyncio.sleep(random.random() / 100)
+    return True
+
+
+def nickname(itx: discord.Interaction) -> tuple[str, bool]:
+    return f"user-{itx.user.id}", itx.user.id % 3 == 0
+
+
+@dpycheck.itx.Check.all(
+    dpycheck.custom(io_bound),
+    dpycheck.All(
+        dpycheck.user_has_guild_perms(**PERMS),
+        dpycheck.custom(io_bound),
+        dpycheck.username_contains(nickname)
+    )
+)
+async def command(itx: discord.Interaction) -> None: ...
+(predicate,) = command.__discord_app_commands_checks__
+
+
+def make_member(user_id: int) -> types.SimpleNamespace:
+    perms = discord.Permissions(manage_guild=user_id % 2 == 0,
+                                ban_members=user_id % 5 != 0)
+    return types.SimpleNamespace(id=user_id, guild_permissions=perms)
+
+members = {i: make_member(i) for i in range(INVOCATIONS)}
+guild = types.SimpleNamespace(id=1, get_member=members.get)
+
+
+def expected(user_id: int) -> str | None:
+    formatter = dpycheck.Formatter()
+    member = members[user_id]
+    missing = [p for p, v in PERMS.items()
+               if getattr(member.guild_permissions, p) != v]
+    if missing:
+        return formatter.UserMissingGuildPerms(None, *missing)
+    name, passed = nickname(types.SimpleNamespace(user=member))
+    if not passed:
+        return formatter.UsernameDoesNotContain(name)
+    return None
+
+
+async def invoke(handler: dpycheck.ErrorHandler, user_id: int) -> str | None:
+    sent = []
+    async def send_message(embed: discord.Embed) -> None:
+        sent.append(embed.description)
+    itx = types.SimpleNamespace(
+        user=types.SimpleNamespace(id=user_id),
+        client=None,
+        guild=guild,
+        response=types.SimpleNamespace(is_done=lambda: False,
+                                       send_message=send_message)
+    )
+    try:
+        await predicate(itx)
+    except dpycheck.exceptions.Generic as exc:
+        # called as if from within a cog, so `itx` need not be an Interaction
+        await handler.error(None, itx, exc)
+        (message,) = sent
+        prefix = handler.formatter.error_prefix
+        postfix = handler.formatter.error_postfix
+        return message[len(prefix):-len(postfix)]
+    return None
+
+
+async def run() -> None:
+    handler = dpycheck.ErrorHandler([])
+    user_ids = list(range(INVOCATIONS))
+    random.shuffle(user_ids)
+    messages = await asyncio.gather(*(invoke(handler, i) for i in user_ids))
+    wrong = [i for i, m in zip(user_ids, messages) if m != expected(i)]
+    assert not wrong, f"{len(wrong)} invocations got the wrong message"
+
+
+def test_concurrent_invocations() -> None:
+    asyncio.run(run())
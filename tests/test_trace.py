@@ -0,0 +1,44 @@
+# traces of check tree evaluations
+from benchmarks import fakes
+from discord.ext import commands
+import dpycheck
+import asyncio
+
+
+def make_command(*checks: dpycheck.types.Check) -> commands.Command:
+    @commands.command()
+    @dpycheck.ctx.Check.all(*checks)
+    async def command(ctx: commands.Context) -> None: ...
+    return command
+
+
+def test_explain_traces_every_check(ctx: fakes.FakeContext) -> None:
+    command = make_command(dpycheck.Not(dpycheck.in_dm()), dpycheck.in_dm())
+    (trace,) = asyncio.run(dpycheck.explain(ctx, command))
+    assert trace.root.status == "failed"
+    assert [c.status for c in trace.root.children] == ["passed", "failed"]
+    assert trace.result.exc is dpycheck.exceptions.NotInDM
+
+
+def test_explain_does_not_use_up_cooldowns(ctx: fakes.FakeContext) -> None:
+    cooldown = dpycheck.cooldown(1, 60.0)
+    command = make_command(dpycheck.Not(dpycheck.in_dm()), cooldown)
+    for _ in range(3):
+        (trace,) = asyncio.run(dpycheck.explain(ctx, command))
+        node = trace.root.children[1]
+        assert node.status == "passed" and not node.evaluated
+        assert "not evaluated" in trace.format()
+        assert trace.to_dict()["root"]["children"][1]["evaluated"] is False
+    # the single token is still there for a real invocation
+    assert cooldown.sync_predicate(ctx).passed
+    assert not cooldown.sync_predicate(ctx).passed
+
+
+def test_tracer_evaluates_stateful_checks(ctx: fakes.FakeContext) -> None:
+    tracer = dpycheck.Tracer(1.0)
+    cooldown = dpycheck.cooldown(1, 60.0)
+    command = make_command(dpycheck.Not(dpycheck.in_dm()), cooldown)
+    (program,) = dpycheck.utils.get_programs(command)
+    result, trace = asyncio.run(tracer.run(program, ctx))
+    assert result.passed and trace.root.children[1].evaluated
+    assert not cooldown.sync_predicate(ctx).passed
@@ -0,0 +1,88 @@
+# ID set and permission helpers of `dpycheck.utils`
+from benchmarks import fakes
+from dpycheck import constants
+from dpycheck import utils
+import dpycheck
+import discord
+import random
+
+
+LARGE = constants.LARGE_ID_SET
+
+
+def test_freeze_ids_keeps_small_sets_in_order() -> None:
+    assert utils.freeze_ids(5) == 5
+    assert utils.freeze_ids([3, 1, 3, 2, 1]) == (3, 1, 2)
+    assert utils.freeze_ids(iter([4, 4])) == (4,)
+    assert utils.freeze_ids([]) == ()
+    ids = utils.freeze_ids(range(LARGE))
+    assert isinstance(ids, tuple) and len(ids) == LARGE
+    # duplicates do not count towards the limit
+    assert isinstance(utils.freeze_ids([*range(LARGE), 0]), tuple)
+
+
+def test_freeze_ids_sorts_large_sets() -> None:
+    ids = utils.freeze_ids(range(LARGE, -1, -1))
+    assert isinstance(ids, utils.SortedIds) and len(ids) == LARGE + 1
+    assert list(ids) == list(range(LARGE + 1))
+    assert utils.freeze_ids(ids) is ids
+
+
+def test_id_lookup() -> None:
+    assert utils.id_lookup(5) == frozenset((5,))
+    assert utils.id_lookup((1, 2)) == frozenset((1, 2))
+    ids = utils.SortedIds([1])
+    assert utils.id_lookup(ids) is ids
+
+
+def test_sorted_ids_membership() -> None:
+    rng = random.Random(0)
+    values = rng.sample(range(1, 2 ** 63), 1000) + [0, 2 ** 64 - 1]
+    ids = utils.SortedIds(values * 2)
+    assert len(ids) == len(values)
+    assert list(ids) == sorted(values)
+    assert all(id in ids for id in values)
+    present = set(values)
+    assert not any(id in ids for id in rng.sample(range(1, 2 ** 63), 1000)
+                   if id not in present)
+    assert 2 not in utils.SortedIds([1, 3])
+    assert 4 not in utils.SortedIds([1, 3])
+    assert 1 not in utils.SortedIds([])
+    assert repr(ids) == "SortedIds(<1002 IDs>)"
+
+
+def test_compile_perms_matches_every_flag() -> None:
+    all_value = discord.Permissions.all().value
+    for name, flag in discord.Permissions.VALID_FLAGS.items():
+        assert utils.compile_perms({name: True}) == (flag, flag)
+        assert utils.compile_perms({name: False}) == (flag, 0)
+        assert discord.Permissions(**{name: True}).value == flag
+        assert utils.missing_perms({name: True}, all_value & ~flag) == [name]
+        assert utils.missing_perms({name: False}, all_value) == [name]
+        assert utils.missing_perms({name: True}, all_value) == []
+
+
+def test_id_checks_at_the_large_set_boundary(ctx: fakes.FakeContext
+                                             ) -> None:
+    channel, guild = ctx.channel, ctx.guild
+    for size in (LARGE, LARGE + 1):
+        # the context's IDs are the last of each set
+        for check, id in ((dpycheck.is_user, 2),
+                          (dpycheck.in_channel, channel.id),
+                          (dpycheck.in_guild, guild.id),
+                          (dpycheck.in_category, channel.category.id)):
+            ids = [*range(10 ** 7, 10 ** 7 + size - 1), id]
+            assert check(ids).sync_predicate(ctx).passed, (check, size)
+            result = check(ids[:-1]).sync_predicate(ctx)
+            assert not result.passed
+            # failures report every ID
+            (reported,) = result.args
+            assert sorted(reported) == sorted(ids[:-1])
+
+
+def test_formatter_lists_frozen_ids() -> None:
+    formatter = dpycheck.Formatter()
+    args = dpycheck.in_channel([3, 1, 3]).result(False).args
+    assert formatter.NotInChannel(*args).endswith("<#3>, <#1>.")
+    args = dpycheck.in_guild(range(LARGE + 1)).result(False).args
+    assert formatter.NotInGuild(*args).endswith(f", {LARGE}.")